@@ -6,7 +6,7 @@ import cv2
 import numpy as np
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 
 from src.utils import get_logger
 from src import config
@@ -34,25 +34,89 @@ class MotionAnalysis:
     activity_type: ActivityType
 
 
-def initialize_activity_detector() -> Dict:
+MOTION_ENGINES = ("farneback", "dis", "lucas_kanade", "frame_diff")
+
+
+def initialize_activity_detector(
+    engine: str = config.MOTION_ENGINE,
+    working_width: Optional[int] = config.MOTION_WORKING_WIDTH,
+) -> Dict:
     """
-    Initialize activity detector with thresholds
+    Initialize activity detector with thresholds and motion engine
+
+    Args:
+        engine: Motion engine ('farneback', 'dis', 'lucas_kanade', 'frame_diff')
+        working_width: Width frames are downscaled to before motion analysis
+            (None or 0 = full resolution)
 
     Returns:
         Dictionary with detector configuration
+
+    Raises:
+        ValueError: If the motion engine is unknown
     """
+    if engine not in MOTION_ENGINES:
+        raise ValueError(
+            f"Unknown motion engine: {engine}. Choose one of {', '.join(MOTION_ENGINES)}"
+        )
+
+    if engine == "frame_diff":
+        # Frame differencing measures intensity change, not pixel displacement
+        threshold_low = config.MOTION_DIFF_THRESHOLD_LOW
+        threshold_high = config.MOTION_DIFF_THRESHOLD_HIGH
+    else:
+        threshold_low = config.ACTIVITY_THRESHOLD_LOW
+        threshold_high = config.ACTIVITY_THRESHOLD_HIGH
+
     detector_config = {
-        "threshold_low": config.ACTIVITY_THRESHOLD_LOW,
-        "threshold_high": config.ACTIVITY_THRESHOLD_HIGH,
+        "threshold_low": threshold_low,
+        "threshold_high": threshold_high,
+        "engine": engine,
+        "working_width": working_width or None,
         "initialized": True,
     }
 
+    if engine == "dis":
+        detector_config["dis"] = cv2.DISOpticalFlow_create(
+            cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST
+        )
+
     logger.info(
-        f"Activity detector initialized with thresholds: low={config.ACTIVITY_THRESHOLD_LOW}, high={config.ACTIVITY_THRESHOLD_HIGH}"
+        f"Activity detector initialized with {engine} engine at width {working_width or 'full'}, "
+        f"thresholds: low={threshold_low}, high={threshold_high}"
     )
     return detector_config
 
 
+def prepare_motion_frame(
+    frame: np.ndarray, detector_config: Dict
+) -> Tuple[np.ndarray, float]:
+    """
+    Convert a frame to the grayscale working plane of the motion engine
+
+    Args:
+        frame: Frame (BGR or grayscale)
+        detector_config: Detector configuration
+
+    Returns:
+        Tuple with the working plane and the factor from working plane
+        pixels back to frame pixels
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    working_width = detector_config.get("working_width")
+    width = gray.shape[1]
+    if not working_width or width <= working_width:
+        return gray, 1.0
+
+    scale = working_width / width
+    working_height = max(1, int(round(gray.shape[0] * scale)))
+    plane = cv2.resize(
+        gray, (working_width, working_height), interpolation=cv2.INTER_AREA
+    )
+    return plane, width / working_width
+
+
 def calculate_optical_flow(
     prev_frame: np.ndarray, current_frame: np.ndarray
 ) -> np.ndarray:
@@ -60,15 +124,23 @@ def calculate_optical_flow(
     Calculate optical flow between two frames using Farneback method
 
     Args:
-        prev_frame: Previous frame (BGR)
-        current_frame: Current frame (BGR)
+        prev_frame: Previous frame (BGR or grayscale)
+        current_frame: Current frame (BGR or grayscale)
 
     Returns:
         Optical flow field (2-channel array)
     """
     # Convert to grayscale
-    prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-    curr_gray = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
+    prev_gray = (
+        cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
+        if prev_frame.ndim == 3
+        else prev_frame
+    )
+    curr_gray = (
+        cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
+        if current_frame.ndim == 3
+        else current_frame
+    )
 
     # Calculate dense optical flow using Farneback method
     flow = cv2.calcOpticalFlowFarneback(
@@ -87,6 +159,67 @@ def calculate_optical_flow(
     return flow
 
 
+def calculate_dis_flow(
+    prev_gray: np.ndarray, curr_gray: np.ndarray, dis: cv2.DISOpticalFlow
+) -> np.ndarray:
+    """
+    Calculate dense optical flow with OpenCV's DIS method
+
+    Args:
+        prev_gray: Previous frame (grayscale)
+        curr_gray: Current frame (grayscale)
+        dis: DIS optical flow instance
+
+    Returns:
+        Optical flow field (2-channel array)
+    """
+    return dis.calc(prev_gray, curr_gray, None)
+
+
+def calculate_sparse_motion(prev_gray: np.ndarray, curr_gray: np.ndarray) -> np.ndarray:
+    """
+    Track corners with pyramidal Lucas-Kanade and return their displacement
+
+    Args:
+        prev_gray: Previous frame (grayscale)
+        curr_gray: Current frame (grayscale)
+
+    Returns:
+        Displacement magnitude of each tracked corner (empty if none)
+    """
+    corners = cv2.goodFeaturesToTrack(
+        prev_gray,
+        maxCorners=config.MOTION_LK_MAX_CORNERS,
+        qualityLevel=0.01,
+        minDistance=7,
+    )
+    if corners is None:
+        return np.zeros(0, dtype=np.float32)
+
+    moved, status, _ = cv2.calcOpticalFlowPyrLK(
+        prev_gray, curr_gray, corners, None, winSize=(15, 15), maxLevel=2
+    )
+    tracked = status.ravel() == 1
+    displacement = (moved - corners).reshape(-1, 2)[tracked]
+    return np.linalg.norm(displacement, axis=1)
+
+
+def calculate_frame_difference(
+    prev_gray: np.ndarray, curr_gray: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the absolute intensity difference between two frames
+
+    Args:
+        prev_gray: Previous frame (grayscale)
+        curr_gray: Current frame (grayscale)
+
+    Returns:
+        Per-pixel absolute difference
+    """
+    return cv2.absdiff(prev_gray, curr_gray)
+
+
 def extract_motion_features(
     optical_flow: np.ndarray, num_faces: int = 0, avg_face_area: float = 0.0
 ) -> Dict[str, float]:
@@ -104,17 +237,42 @@ def extract_motion_features(
     # Calculate magnitude and angle of flow vectors
     magnitude, angle = cv2.cartToPolar(optical_flow[..., 0], optical_flow[..., 1])
 
-    # Extract statistical features
-    features = {
-        "magnitude_mean": float(np.mean(magnitude)),
-        "magnitude_std": float(np.std(magnitude)),
-        "magnitude_max": float(np.max(magnitude)),
+    return extract_magnitude_features(magnitude, num_faces, avg_face_area)
+
+
+def extract_magnitude_features(
+    magnitude: np.ndarray,
+    num_faces: int = 0,
+    avg_face_area: float = 0.0,
+    scale: float = 1.0,
+) -> Dict[str, float]:
+    """
+    Extract motion features from per-pixel or per-point motion magnitudes
+
+    Args:
+        magnitude: Motion magnitudes
+        num_faces: Number of detected faces
+        avg_face_area: Average face area
+        scale: Factor applied to the statistics (e.g. back to frame pixels)
+
+    Returns:
+        Dictionary with motion features
+    """
+    if magnitude.size == 0:
+        mean = std = peak = 0.0
+    else:
+        mean, std = cv2.meanStdDev(magnitude)
+        mean, std = float(mean[0, 0]), float(std[0, 0])
+        peak = float(np.max(magnitude))
+
+    return {
+        "magnitude_mean": mean * scale,
+        "magnitude_std": std * scale,
+        "magnitude_max": peak * scale,
         "num_faces": num_faces,
         "avg_face_area": avg_face_area,
     }
 
-    return features
-
 
 def detect_activity(
     motion_features: Dict[str, float], detector_config: Optional[Dict] = None
@@ -149,16 +307,28 @@ def analyze_motion(
     num_faces: int = 0,
     avg_face_area: float = 0.0,
     detector_config: Optional[Dict] = None,
+    frame_width: Optional[int] = None,
+    frame_gap: int = 1,
 ) -> MotionAnalysis:
     """
-    Analyze motion between frames
+    Analyze motion between frames with the configured motion engine
+
+    Every engine reports the same statistics; flow based engines are scaled
+    back to full-resolution pixels per frame so the activity thresholds
+    still apply.
 
     Args:
-        prev_frame: Previous frame (None for first frame)
-        current_frame: Current frame
+        prev_frame: Previous frame or its motion plane (None for first frame)
+        current_frame: Current frame or its motion plane
         num_faces: Number of detected faces
         avg_face_area: Average face area
         detector_config: Detector configuration
+        frame_width: Width of the original frame, required when the frames
+            passed in are planes already prepared by prepare_motion_frame
+        frame_gap: Number of frames between prev_frame and current_frame;
+            displacements of the flow based engines are divided by it to
+            stay per-frame. Intensity differences of 'frame_diff' are not,
+            since they saturate instead of growing with the gap
 
     Returns:
         MotionAnalysis result
@@ -173,11 +343,38 @@ def analyze_motion(
             activity_type=ActivityType.STATIC,
         )
 
-    # Calculate optical flow
-    flow = calculate_optical_flow(prev_frame, current_frame)
+    if detector_config is None:
+        detector_config = initialize_activity_detector()
 
-    # Extract motion features
-    features = extract_motion_features(flow, num_faces, avg_face_area)
+    engine = detector_config.get("engine", "farneback")
+    prev_plane, _ = prepare_motion_frame(prev_frame, detector_config)
+    curr_plane, scale = prepare_motion_frame(current_frame, detector_config)
+    if frame_width:
+        scale = frame_width / curr_plane.shape[1]
+
+    flow = None
+    if engine == "frame_diff":
+        magnitude = calculate_frame_difference(prev_plane, curr_plane)
+        # Intensity differences scale neither with resolution nor with the
+        # frame gap: a pixel that changed once does not change more over
+        # more frames
+        scale = 1.0
+    else:
+        if engine == "lucas_kanade":
+            magnitude = calculate_sparse_motion(prev_plane, curr_plane)
+        else:
+            if engine == "dis":
+                flow = calculate_dis_flow(
+                    prev_plane, curr_plane, detector_config["dis"]
+                )
+            else:
+                flow = calculate_optical_flow(prev_plane, curr_plane)
+            magnitude = cv2.magnitude(flow[..., 0], flow[..., 1])
+        # Displacements grow with the frame gap; bring them back to per-frame
+        scale /= max(1, frame_gap)
+
+    # Extract motion features, in full-resolution pixels per frame
+    features = extract_magnitude_features(magnitude, num_faces, avg_face_area, scale)
 
     # Detect activity
     activity = detect_activity(features, detector_config)
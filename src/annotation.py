@@ -0,0 +1,89 @@
+"""
+Frame annotation module for the output video
+"""
+
+import cv2
+
+from src import config
+
+EMOTION_PT = {
+    "Angry": "Raiva",
+    "Disgust": "Nojo",
+    "Fear": "Medo",
+    "Happy": "Feliz",
+    "Sad": "Triste",
+    "Surprise": "Surpresa",
+    "Neutral": "Neutro",
+}
+
+ACTIVITY_PT = {
+    "Static": "Estatico",
+    "Moderate Movement": "Movimento Moderado",
+    "Rapid Movement": "Movimento Rapido",
+    "Unknown": "Desconhecido",
+}
+
+
+def annotate_frame_with_faces(frame, faces, emotions, activity_info, frame_count):
+    """
+    Draw face boxes, emotion labels and activity information on a frame
+
+    Args:
+        frame: Frame to draw on (BGR image, modified in place)
+        faces: Detected FaceRegion objects
+        emotions: EmotionClassification for each face
+        activity_info: Activity label of the frame
+        frame_count: Frame number shown on screen
+
+    Returns:
+        The annotated frame
+    """
+    for i, face in enumerate(faces):
+        bbox = face.bounding_box
+        x, y, w, h = bbox.x, bbox.y, bbox.width, bbox.height
+
+        cv2.rectangle(frame, (x, y), (x + w, y + h), config.BOX_COLOR, 2)
+
+        if emotions and i < len(emotions):
+            emotion = emotions[i]
+            emotion_pt = EMOTION_PT.get(
+                emotion.emotion_label.value, emotion.emotion_label.value
+            )
+            label = f"#{face.face_id} {emotion_pt}: {emotion.confidence:.2f}"
+        else:
+            label = f"Rosto {face.face_id}"
+
+        cv2.putText(
+            frame,
+            label,
+            (x, y - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            config.FONT_SCALE,
+            config.TEXT_COLOR,
+            config.FONT_THICKNESS,
+        )
+
+    if activity_info:
+        activity_pt = ACTIVITY_PT.get(activity_info, activity_info)
+        activity_text = f"Atividade: {activity_pt}"
+        cv2.putText(
+            frame,
+            activity_text,
+            (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.7,
+            (0, 255, 255),
+            2,
+        )
+
+    cv2.putText(
+        frame,
+        f"Quadro: {frame_count} | Rostos: {len(faces)}",
+        (10, 60),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.7,
+        (255, 255, 255),
+        2,
+    )
+
+    return frame
@@ -0,0 +1,572 @@
+"""
+Per-stage benchmark suite
+
+Times each stage of the analysis (decoding, face detection, emotion
+classification, motion analysis, annotation and video encoding) in isolation
+and the whole pipeline end to end, on generated clips at several resolutions
+and face counts and on any local sample video. Results are written as JSON
+and can be compared against a stored baseline to flag regressions.
+
+Usage:
+    python -m src.benchmark --output benchmark.json
+    python -m src.benchmark --compare baseline.json --output benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import cv2
+import numpy as np
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from src import config
+from src.utils import get_logger, setup_logging, EmotionAnalysisError
+from src.video_processor import (
+    load_video,
+    extract_frames,
+    create_video_writer,
+    EncoderSettings,
+)
+from src.face_detector import (
+    BoundingBox,
+    FaceRegion,
+    initialize_detector,
+    detect_faces,
+)
+from src.emotion_analyzer_deepface import (
+    batch_analyze_emotions,
+    classification_from_scores,
+)
+from src.activity_detector import (
+    MOTION_ENGINES,
+    initialize_activity_detector,
+    prepare_motion_frame,
+    analyze_motion,
+)
+from src.annotation import annotate_frame_with_faces
+from src.pipeline import (
+    EMOTION_BACKENDS,
+    initialize_analysis_state,
+    load_emotion_backend,
+    run_sequential,
+    create_annotating_encoder,
+)
+
+logger = get_logger(__name__)
+
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+
+@dataclass
+class StageTiming:
+    """Timing statistics of one stage on one input"""
+
+    input: str
+    stage: str
+    num_frames: int
+    frames_per_second: float
+    ms_per_frame_mean: float
+    ms_per_frame_p50: float
+    ms_per_frame_p95: float
+    ms_per_frame_p99: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.input}/{self.stage}"
+
+
+def summarize_timings(input_name: str, stage: str, seconds: List[float]) -> StageTiming:
+    """
+    Build the statistics of a list of per-frame durations
+
+    Args:
+        input_name: Name of the benchmarked input
+        stage: Name of the stage
+        seconds: Duration of each frame in seconds
+
+    Returns:
+        StageTiming with throughput and ms/frame percentiles
+    """
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    total = float(ms.sum())
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return StageTiming(
+        input=input_name,
+        stage=stage,
+        num_frames=len(ms),
+        frames_per_second=len(ms) / (total / 1000.0) if total > 0 else 0.0,
+        ms_per_frame_mean=float(ms.mean()),
+        ms_per_frame_p50=float(p50),
+        ms_per_frame_p95=float(p95),
+        ms_per_frame_p99=float(p99),
+    )
+
+
+def generate_synthetic_video(
+    output_path: str, width: int, height: int, num_frames: int, fps: float = 30.0
+) -> None:
+    """
+    Write a clip with a textured background and moving shapes
+
+    Args:
+        output_path: Path of the generated video
+        width: Frame width in pixels
+        height: Frame height in pixels
+        num_frames: Number of frames
+        fps: Frames per second
+    """
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(
+        rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3
+    )
+    radius = max(10, height // 12)
+
+    video_writer = create_video_writer(output_path, fps, width, height)
+    try:
+        for i in range(num_frames):
+            frame = background.copy()
+            for k in range(3):
+                cx = int((0.2 + 0.3 * k) * width + 0.1 * width * np.sin(i / 8 + k))
+                cy = int(height / 2 + 0.2 * height * np.cos(i / 10 + k))
+                cv2.circle(frame, (cx, cy), radius, (60 * k, 200, 255 - 60 * k), -1)
+            video_writer.write(frame)
+    finally:
+        video_writer.release()
+
+
+def synthetic_faces(
+    gray: np.ndarray, num_faces: int
+) -> Tuple[List[FaceRegion], List[object]]:
+    """
+    Lay out num_faces face boxes on a grid, with neutral emotions
+
+    Args:
+        gray: Grayscale frame the face crops are taken from
+        num_faces: Number of faces
+
+    Returns:
+        Tuple with the FaceRegion list and an EmotionClassification per face
+    """
+    height, width = gray.shape[:2]
+    size = max(30, min(width, height) // 6)
+    columns = max(1, width // (size * 2))
+
+    faces = []
+    for i in range(num_faces):
+        x = (i % columns) * size * 2 + size // 2
+        y = ((i // columns) * size * 2 + size // 2) % max(1, height - size)
+        bbox = BoundingBox(x=x, y=y, width=size, height=size)
+        crop = cv2.resize(gray[y : y + size, x : x + size], (48, 48))
+        faces.append(
+            FaceRegion(face_id=i, bounding_box=bbox, confidence=1.0, face_image=crop)
+        )
+
+    emotions = [
+        classification_from_scores(np.full(7, 1.0 / 7.0)) for _ in range(num_faces)
+    ]
+    return faces, emotions
+
+
+def time_per_item(items: Iterable, fn: Callable) -> List[float]:
+    """
+    Call fn on every item and return the duration of each call in seconds
+
+    Args:
+        items: Inputs of the calls
+        fn: Function under test
+
+    Returns:
+        Duration of each call
+    """
+    seconds = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def benchmark_video(
+    video_path: str,
+    input_name: str,
+    num_faces: int,
+    face_cascade: cv2.CascadeClassifier,
+    emotion_model: Optional[object],
+    motion_engine: str,
+    max_frames: int,
+) -> List[StageTiming]:
+    """
+    Time every stage and the end-to-end pipeline on one video
+
+    Args:
+        video_path: Video to benchmark
+        input_name: Name of the input in the results
+        num_faces: Number of synthetic faces for the emotion and annotation
+            stages
+        face_cascade: Haar cascade used by detect_faces
+        emotion_model: Loaded emotion model (None = emotion stage and
+            end-to-end measurement skipped)
+        motion_engine: Motion engine used by analyze_motion
+        max_frames: Maximum number of frames read from the video
+
+    Returns:
+        StageTiming list, one per stage
+    """
+    timings = []
+
+    # Decoding is timed on its own and the frames are kept for the other stages
+    video_capture = load_video(video_path)
+    frames = []
+    decode_seconds = []
+    iterator = extract_frames(video_capture, end_frame=max_frames)
+    while True:
+        start = time.perf_counter()
+        frame = next(iterator, None)
+        if frame is None:
+            break
+        decode_seconds.append(time.perf_counter() - start)
+        frames.append(frame)
+
+    if not frames:
+        logger.warning(f"No frames could be read from {video_path}")
+        return timings
+
+    timings.append(summarize_timings(input_name, "extract_frames", decode_seconds))
+    height, width = frames[0].image_data.shape[:2]
+
+    timings.append(
+        summarize_timings(
+            input_name,
+            "detect_faces",
+            time_per_item(
+                frames,
+                lambda f: detect_faces(f.image_data, face_cascade, gray=f.gray),
+            ),
+        )
+    )
+
+    faces, emotions = synthetic_faces(frames[0].gray, num_faces)
+    if emotion_model is not None and faces:
+        crops = [face.face_image for face in faces]
+        timings.append(
+            summarize_timings(
+                input_name,
+                "batch_analyze_emotions",
+                time_per_item(
+                    frames, lambda f: batch_analyze_emotions(crops, emotion_model)
+                ),
+            )
+        )
+
+    activity_config = initialize_activity_detector(motion_engine)
+    planes = [prepare_motion_frame(f.gray, activity_config)[0] for f in frames]
+    timings.append(
+        summarize_timings(
+            input_name,
+            "analyze_motion",
+            time_per_item(
+                range(1, len(planes)),
+                lambda i: analyze_motion(
+                    planes[i - 1],
+                    planes[i],
+                    detector_config=activity_config,
+                    frame_width=width,
+                ),
+            ),
+        )
+    )
+
+    timings.append(
+        summarize_timings(
+            input_name,
+            "annotate_frame_with_faces",
+            time_per_item(
+                frames,
+                lambda f: annotate_frame_with_faces(
+                    f.image_data.copy(), faces, emotions, "Static", f.frame_number
+                ),
+            ),
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Unbuffered, so the stage measures the encoder and not a queue put
+        video_writer = create_video_writer(
+            os.path.join(tmp_dir, "write.mp4"),
+            30.0,
+            width,
+            height,
+            EncoderSettings(buffer_size=0),
+        )
+        timings.append(
+            summarize_timings(
+                input_name,
+                "video_writer_write",
+                time_per_item(frames, lambda f: video_writer.write(f.image_data)),
+            )
+        )
+        video_writer.release()
+
+        if emotion_model is None:
+            # The pipeline would load the default emotion backend instead
+            logger.warning(f"End-to-end measurement of {input_name} skipped")
+            return timings
+
+        # End to end: decode, analyze, annotate and encode the whole clip
+        state = initialize_analysis_state(
+            face_cascade=face_cascade,
+            emotion_model=emotion_model,
+            activity_config=initialize_activity_detector(motion_engine),
+        )
+        video_writer = create_video_writer(
+            os.path.join(tmp_dir, "end_to_end.mp4"), 30.0, width, height
+        )
+        results = run_sequential(
+            extract_frames(load_video(video_path), end_frame=max_frames),
+            state,
+            create_annotating_encoder(video_writer, state.timer),
+        )
+        end_to_end_seconds = []
+        start = time.perf_counter()
+        for _ in results:
+            now = time.perf_counter()
+            end_to_end_seconds.append(now - start)
+            start = now
+        video_writer.release()
+
+    timings.append(summarize_timings(input_name, "end_to_end", end_to_end_seconds))
+    return timings
+
+
+def compare_with_baseline(
+    current: List[StageTiming], baseline: List[StageTiming], tolerance: float
+) -> List[str]:
+    """
+    Find stages whose median time per frame grew beyond the tolerance
+
+    Args:
+        current: Timings of this run
+        baseline: Timings of the stored baseline
+        tolerance: Allowed relative slowdown (0.1 = 10%)
+
+    Returns:
+        One message per regression
+    """
+    baseline_by_key = {timing.key: timing for timing in baseline}
+    regressions = []
+
+    for timing in current:
+        reference = baseline_by_key.get(timing.key)
+        if reference is None or reference.ms_per_frame_p50 <= 0:
+            continue
+        change = timing.ms_per_frame_p50 / reference.ms_per_frame_p50 - 1.0
+        logger.info(
+            f"{timing.key}: {reference.ms_per_frame_p50:.2f} -> "
+            f"{timing.ms_per_frame_p50:.2f} ms/frame (p50, {change:+.1%})"
+        )
+        if change > tolerance:
+            regressions.append(
+                f"{timing.key}: p50 {reference.ms_per_frame_p50:.2f} -> "
+                f"{timing.ms_per_frame_p50:.2f} ms/frame ({change:+.1%})"
+            )
+
+    return regressions
+
+
+def save_benchmark(timings: List[StageTiming], output_path: str) -> None:
+    """
+    Write the timings and the environment they were measured on as JSON
+
+    Args:
+        timings: Timings to save
+        output_path: Path of the JSON file
+    """
+    document = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "results": [asdict(timing) for timing in timings],
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    logger.info(f"Benchmark results saved to {output_path}")
+
+
+def load_benchmark(path: str) -> List[StageTiming]:
+    """
+    Read timings saved by save_benchmark
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        StageTiming list
+    """
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    return [StageTiming(**result) for result in document["results"]]
+
+
+def main():
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(
+        description="Medir o tempo de cada etapa da análise de vídeo"
+    )
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        default=list(RESOLUTIONS),
+        choices=list(RESOLUTIONS),
+        help="Resoluções dos vídeos gerados (padrão: todas)",
+    )
+    parser.add_argument(
+        "--faces",
+        nargs="+",
+        type=int,
+        default=[1, 4],
+        help="Quantidades de rostos usadas nas etapas de emoção e anotação",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=60,
+        help="Número de frames de cada vídeo medido",
+    )
+    parser.add_argument(
+        "--videos",
+        nargs="*",
+        default=None,
+        help="Vídeos locais a medir (padrão: o vídeo de entrada, se existir)",
+    )
+    parser.add_argument(
+        "--motion-engine",
+        type=str,
+        default=config.MOTION_ENGINE,
+        choices=MOTION_ENGINES,
+        help="Método de análise de movimento medido",
+    )
+    parser.add_argument(
+        "--emotion-backend",
+        type=str,
+        default=config.EMOTION_BACKEND,
+        choices=EMOTION_BACKENDS,
+        help="Executor do classificador de emoções medido",
+    )
+    parser.add_argument(
+        "--emotion-model",
+        type=str,
+        default=None,
+        help="Modelo convertido do classificador de emoções (dnn ou tflite)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmark.json",
+        help="Arquivo JSON com os resultados",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="Arquivo JSON de referência para detectar regressões",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Aumento relativo tolerado do tempo mediano por frame (0.10 = 10%%)",
+    )
+    args = parser.parse_args()
+
+    face_cascade = initialize_detector()
+    try:
+        emotion_model = load_emotion_backend(args.emotion_backend, args.emotion_model)
+    except EmotionAnalysisError as e:
+        logger.warning(f"Emotion stage skipped: {e}")
+        emotion_model = None
+
+    videos = args.videos
+    if videos is None:
+        videos = [str(config.INPUT_VIDEO_PATH)]
+    videos = [video for video in videos if os.path.isfile(video)]
+
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for resolution in args.resolutions:
+            width, height = RESOLUTIONS[resolution]
+            video_path = os.path.join(tmp_dir, f"synthetic_{resolution}.mp4")
+            generate_synthetic_video(video_path, width, height, args.frames)
+
+            for num_faces in args.faces:
+                input_name = f"synthetic_{resolution}_{num_faces}faces"
+                logger.info(f"Benchmarking {input_name}")
+                timings.extend(
+                    benchmark_video(
+                        video_path,
+                        input_name,
+                        num_faces,
+                        face_cascade,
+                        emotion_model,
+                        args.motion_engine,
+                        args.frames,
+                    )
+                )
+
+    for video in videos:
+        input_name = os.path.basename(video)
+        logger.info(f"Benchmarking {input_name}")
+        timings.extend(
+            benchmark_video(
+                video,
+                input_name,
+                max(args.faces),
+                face_cascade,
+                emotion_model,
+                args.motion_engine,
+                args.frames,
+            )
+        )
+
+    for timing in timings:
+        logger.info(
+            f"{timing.key}: {timing.frames_per_second:.1f} frames/s, "
+            f"p50 {timing.ms_per_frame_p50:.2f} ms, "
+            f"p95 {timing.ms_per_frame_p95:.2f} ms, "
+            f"p99 {timing.ms_per_frame_p99:.2f} ms"
+        )
+
+    save_benchmark(timings, args.output)
+
+    if args.compare:
+        regressions = compare_with_baseline(
+            timings, load_benchmark(args.compare), args.tolerance
+        )
+        if regressions:
+            logger.error(f"{len(regressions)} regressions found:")
+            for regression in regressions:
+                logger.error(f"  {regression}")
+            return 1
+        logger.info("No regressions found")
+
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Checkpoint and resume of long-running analyses
+
+A checkpoint holds everything needed to continue a run from a frame
+boundary: the summary counters, the checkpoint interval, the next frame to
+analyze, the next face track ID, the row counts of the results store, the
+completed parts of the output video and the stage timings. Checkpoints are
+pickled and replaced atomically, so a run killed at any moment leaves either
+the previous or the new checkpoint.
+"""
+
+import os
+import pickle
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.utils import get_logger, ensure_directory_exists, VideoProcessingError
+from src.video_processor import create_video_writer, EncoderSettings
+from src.summary_generator import SummaryAggregator
+from src.identity_clusterer import IdentityAggregator
+from src.performance import StageTimer
+
+logger = get_logger(__name__)
+
+CHECKPOINT_FILENAME = "checkpoint.pkl"
+CHECKPOINT_VERSION = 3
+
+
+@dataclass
+class Checkpoint:
+    """State of an interrupted analysis at a frame boundary"""
+
+    input_path: str
+    settings: Dict
+    interval: int
+    next_frame: int
+    elapsed_time: float
+    next_track_id: int
+    aggregator: SummaryAggregator
+    identities: Optional[IdentityAggregator] = None
+    results_rows: Optional[Dict[str, int]] = None
+    video_parts: List[str] = field(default_factory=list)
+    timer: Optional[StageTimer] = None
+    version: int = CHECKPOINT_VERSION
+
+
+def checkpoint_interval(checkpoint_every: int, frame_stride: int) -> int:
+    """
+    Round the checkpoint interval up to a multiple of the frame stride
+
+    Resuming must start on an analyzed frame, so checkpoints are only taken
+    where the stride pattern restarts.
+
+    Args:
+        checkpoint_every: Requested number of frames between checkpoints
+        frame_stride: Analyze one frame out of every frame_stride frames
+
+    Returns:
+        Interval in frames (0 = checkpoints disabled)
+    """
+    if checkpoint_every <= 0:
+        return 0
+    return -(-checkpoint_every // frame_stride) * frame_stride
+
+
+def save_checkpoint(output_dir: str, checkpoint: Checkpoint) -> None:
+    """
+    Write a checkpoint, replacing the previous one atomically
+
+    Args:
+        output_dir: Output directory of the run
+        checkpoint: Checkpoint to save
+    """
+    path = os.path.join(output_dir, CHECKPOINT_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logger.info(f"Checkpoint saved at frame {checkpoint.next_frame}")
+
+
+def load_checkpoint(
+    output_dir: str, input_path: str, settings: Dict
+) -> Optional[Checkpoint]:
+    """
+    Load the checkpoint of a previous run, if there is one
+
+    Args:
+        output_dir: Output directory of the run
+        input_path: Input video of the current run
+        settings: Settings of the current run that change the results
+
+    Returns:
+        Checkpoint, or None when the directory has no checkpoint
+
+    Raises:
+        VideoProcessingError: If the checkpoint belongs to another video or
+            to a run with different settings
+    """
+    path = os.path.join(output_dir, CHECKPOINT_FILENAME)
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "rb") as f:
+        checkpoint = pickle.load(f)
+
+    if getattr(checkpoint, "version", None) != CHECKPOINT_VERSION:
+        raise VideoProcessingError(f"Unsupported checkpoint format: {path}")
+    if os.path.abspath(checkpoint.input_path) != os.path.abspath(input_path):
+        raise VideoProcessingError(
+            f"Checkpoint belongs to another video: {checkpoint.input_path}"
+        )
+    if checkpoint.settings != settings:
+        raise VideoProcessingError(
+            f"Checkpoint was taken with different settings: {checkpoint.settings}"
+        )
+
+    logger.info(f"Checkpoint loaded, resuming at frame {checkpoint.next_frame}")
+    return checkpoint
+
+
+def remove_checkpoint(output_dir: str) -> None:
+    """
+    Delete the checkpoint of a finished run
+
+    Args:
+        output_dir: Output directory of the run
+    """
+    path = os.path.join(output_dir, CHECKPOINT_FILENAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class PartitionedVideoWriter:
+    """
+    Writes the output video as consecutive part files
+
+    A part is closed every frames_per_part frames, so each part before a
+    checkpoint is a complete, playable file that survives an interruption.
+    It has the write() / release() interface of cv2.VideoWriter.
+    """
+
+    def __init__(
+        self,
+        parts_dir: str,
+        fps: float,
+        width: int,
+        height: int,
+        frames_per_part: int,
+        completed_parts: Optional[List[str]] = None,
+        encoder: Optional[EncoderSettings] = None,
+    ):
+        ensure_directory_exists(parts_dir)
+        self.parts_dir = parts_dir
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frames_per_part = frames_per_part
+        self.encoder = encoder
+        self.completed_parts = list(completed_parts or [])
+        self._writer: Optional[object] = None
+        self._frames_in_part = 0
+        self._failed = False
+        self._condition = threading.Condition()
+
+        # Parts after the completed ones were interrupted and are rewritten
+        completed_names = {os.path.basename(path) for path in self.completed_parts}
+        for name in os.listdir(parts_dir):
+            if name not in completed_names:
+                os.remove(os.path.join(parts_dir, name))
+
+    def write(self, image: np.ndarray) -> None:
+        try:
+            if self._writer is None:
+                path = self._part_path(len(self.completed_parts))
+                self._writer = create_video_writer(
+                    path, self.fps, self.width, self.height, self.encoder
+                )
+            self._writer.write(image)
+            self._frames_in_part += 1
+            if self._frames_in_part == self.frames_per_part:
+                self._close_part()
+        except Exception:
+            with self._condition:
+                self._failed = True
+                self._condition.notify_all()
+            raise
+
+    def release(self) -> None:
+        if self._writer is not None:
+            self._close_part()
+
+    def wait_for_parts(self, num_parts: int) -> List[str]:
+        """
+        Block until num_parts parts are complete (e.g. while the encode
+        stage of the pipeline catches up)
+
+        Args:
+            num_parts: Number of parts that must be complete
+
+        Returns:
+            Paths of the completed parts
+
+        Raises:
+            VideoProcessingError: If writing a part failed
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._failed or len(self.completed_parts) >= num_parts
+            )
+            if self._failed:
+                raise VideoProcessingError("Writing the output video failed")
+            return list(self.completed_parts)
+
+    def _close_part(self) -> None:
+        self._writer.release()
+        with self._condition:
+            self.completed_parts.append(self._part_path(len(self.completed_parts)))
+            self._condition.notify_all()
+        self._writer = None
+        self._frames_in_part = 0
+
+    def _part_path(self, index: int) -> str:
+        return os.path.join(self.parts_dir, f"part_{index:05d}.mp4")
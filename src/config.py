@@ -20,3 +20,54 @@ TEXT_COLOR = (239, 70, 205)  # Pink in BGR
 FONT_SCALE = 0.6
 FONT_THICKNESS = 2
 LOG_EVERY_N_FRAMES = 5
+FACE_DETECT_EVERY_N_FRAMES = 5
+FACE_TRACK_MIN_SCORE = 0.6
+FACE_TRACK_SEARCH_MARGIN = 0.5
+FACE_TRACK_IOU_THRESHOLD = 0.3
+EMOTION_REFRESH_EVERY_N_FRAMES = 10
+EMOTION_REFRESH_PIXEL_DISTANCE = 12.0
+PIPELINE_QUEUE_SIZE = 8
+SEGMENT_TRACK_ID_STRIDE = 1_000_000
+# Scene cuts listed in the report; longer videos report only the count beyond it
+SUMMARY_MAX_SCENE_CUTS = 500
+MOTION_ENGINE = "farneback"
+MOTION_WORKING_WIDTH = 320
+MOTION_LK_MAX_CORNERS = 200
+MOTION_DIFF_THRESHOLD_LOW = 3.0
+MOTION_DIFF_THRESHOLD_HIGH = 15.0
+FACE_FULL_SCAN_EVERY_N_FRAMES = 15
+FACE_ROI_MARGIN = 0.5
+RESULTS_CHUNK_SIZE = 4096
+IDENTITY_EMBEDDING_MODEL = "Facenet"
+IDENTITY_SAMPLE_EVERY_N_FRAMES = 15
+IDENTITY_BATCH_SIZE = 32
+# Maximum distance between any two tracks of one person (complete linkage)
+IDENTITY_DISTANCE_THRESHOLD = 0.8
+CHECKPOINT_EVERY_N_FRAMES = 0
+METRICS_HOST = "127.0.0.1"
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_MAX_CONCURRENT_JOBS = 1
+SERVICE_MAX_QUEUED_JOBS = 16
+# Finished jobs are forgotten after this many seconds, or sooner when more
+# than SERVICE_MAX_FINISHED_JOBS of them are kept
+SERVICE_FINISHED_JOB_TTL = 3600
+SERVICE_MAX_FINISHED_JOBS = 100
+VIDEO_ENCODER = "auto"
+FFMPEG_BINARY = "ffmpeg"
+FFMPEG_CODEC = "libx264"
+FFMPEG_PRESET = "veryfast"
+FFMPEG_CRF = 23
+FFMPEG_THREADS = 0
+VIDEO_WRITER_BUFFER_SIZE = 16
+SCENE_CUT_THRESHOLD = 0.5
+SCENE_WORKING_WIDTH = 64
+SCENE_HISTOGRAM_BINS = 8
+SCENE_MIN_SHOT_FRAMES = 10
+ADAPTIVE_MOTION_THRESHOLD = 2.0
+ADAPTIVE_MAX_REUSE_FRAMES = 30
+EMOTION_BACKEND = "deepface"
+EMOTION_DNN_MODEL_PATH = PROJECT_ROOT / "models" / "emotion.onnx"
+EMOTION_TFLITE_MODEL_PATH = PROJECT_ROOT / "models" / "emotion.tflite"
+EMOTION_CALIBRATION_FACES = 200
@@ -0,0 +1,345 @@
+"""
+Accuracy check of reduced-precision emotion models
+
+Classifies the same face crops from a local clip with a full-precision
+reference model and with a candidate model (e.g. a float16 or int8 TFLite
+conversion) through batch_analyze_emotions, and reports how often the
+dominant emotions agree, how far the probability vectors deviate and how
+fast each model is. Results are written as JSON; --min-agreement turns the
+report into a gate.
+
+Usage:
+    python -m src.emotion_accuracy --input data/video.mp4 \\
+        --backend tflite --model models/emotion_int8.tflite
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import cv2
+import numpy as np
+from collections import Counter
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src import config
+from src.utils import get_logger, setup_logging
+from src.video_processor import load_video, extract_frames
+from src.face_detector import initialize_detector, detect_faces
+from src.emotion_analyzer_deepface import (
+    EmotionClassification,
+    batch_analyze_emotions,
+)
+from src.pipeline import EMOTION_BACKENDS, load_emotion_backend
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PrecisionReport:
+    """Agreement and speed of a candidate emotion model against a reference"""
+
+    reference: str
+    candidate: str
+    num_faces: int
+    label_agreement: float
+    max_probability_deviation: float
+    mean_probability_deviation: float
+    reference_ms_per_face: float
+    candidate_ms_per_face: float
+    disagreements: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def speedup(self) -> float:
+        if self.candidate_ms_per_face <= 0:
+            return 0.0
+        return self.reference_ms_per_face / self.candidate_ms_per_face
+
+
+def collect_face_crops(
+    video_path: str,
+    face_cascade: cv2.CascadeClassifier,
+    max_faces: int,
+    sample_every_n: int = config.FACE_DETECT_EVERY_N_FRAMES,
+) -> List[np.ndarray]:
+    """
+    Detect faces on sampled frames of a clip and keep their crops
+
+    Args:
+        video_path: Local video
+        face_cascade: Haar cascade used by detect_faces
+        max_faces: Stop after this many faces
+        sample_every_n: Run the detector on one frame out of every N
+
+    Returns:
+        48x48 grayscale face crops, in frame order
+    """
+    crops: List[np.ndarray] = []
+    video_capture = load_video(video_path)
+    try:
+        for frame in extract_frames(
+            video_capture, frame_stride=max(1, sample_every_n), decode_skipped=False
+        ):
+            if not frame.analyzed:
+                continue
+            for face in detect_faces(frame.image_data, face_cascade, gray=frame.gray):
+                crops.append(face.face_image.copy())
+            if len(crops) >= max_faces:
+                break
+    finally:
+        video_capture.release()
+    return crops[:max_faces]
+
+
+def classify_in_batches(
+    crops: List[np.ndarray], model: object, batch_size: int
+) -> Tuple[List[EmotionClassification], float]:
+    """
+    Classify face crops with batch_analyze_emotions
+
+    Args:
+        crops: Face crops
+        model: Emotion model with a predict() method
+        batch_size: Faces per batch_analyze_emotions call
+
+    Returns:
+        (classifications, seconds spent classifying)
+    """
+    classifications = []
+    elapsed = 0.0
+    for start in range(0, len(crops), batch_size):
+        batch = crops[start : start + batch_size]
+        begin = time.perf_counter()
+        classifications.extend(batch_analyze_emotions(batch, model))
+        elapsed += time.perf_counter() - begin
+    return classifications, elapsed
+
+
+def compare_emotion_models(
+    crops: List[np.ndarray],
+    reference_model: object,
+    candidate_model: object,
+    reference_name: str = "reference",
+    candidate_name: str = "candidate",
+    batch_size: int = 8,
+) -> PrecisionReport:
+    """
+    Compare the emotions of a candidate model with those of a reference
+
+    Each model classifies the crops once before timing, so loading and
+    warm-up costs are not counted.
+
+    Args:
+        crops: Face crops from collect_face_crops
+        reference_model: Full-precision emotion model
+        candidate_model: Reduced-precision emotion model
+        reference_name: Name of the reference in the report
+        candidate_name: Name of the candidate in the report
+        batch_size: Faces per batch_analyze_emotions call
+
+    Returns:
+        PrecisionReport of the candidate
+    """
+    classify_in_batches(crops[:batch_size], reference_model, batch_size)
+    classify_in_batches(crops[:batch_size], candidate_model, batch_size)
+
+    reference, reference_time = classify_in_batches(crops, reference_model, batch_size)
+    candidate, candidate_time = classify_in_batches(crops, candidate_model, batch_size)
+
+    disagreements: Counter = Counter()
+    deviations = []
+    for expected, actual in zip(reference, candidate):
+        if expected.emotion_label != actual.emotion_label:
+            disagreements[
+                f"{expected.emotion_label.value}->{actual.emotion_label.value}"
+            ] += 1
+        deviations.append(
+            max(
+                abs(expected.probabilities[emotion] - actual.probabilities[emotion])
+                for emotion in expected.probabilities
+            )
+        )
+
+    num_faces = len(crops)
+    return PrecisionReport(
+        reference=reference_name,
+        candidate=candidate_name,
+        num_faces=num_faces,
+        label_agreement=(
+            1.0 - sum(disagreements.values()) / num_faces if num_faces else 0.0
+        ),
+        max_probability_deviation=float(max(deviations, default=0.0)),
+        mean_probability_deviation=float(np.mean(deviations)) if deviations else 0.0,
+        reference_ms_per_face=(
+            reference_time / num_faces * 1000.0 if num_faces else 0.0
+        ),
+        candidate_ms_per_face=(
+            candidate_time / num_faces * 1000.0 if num_faces else 0.0
+        ),
+        disagreements=dict(disagreements.most_common()),
+    )
+
+
+def save_precision_report(report: PrecisionReport, output_path: str) -> None:
+    """
+    Write the report and the environment it was measured on as JSON
+
+    Args:
+        report: Report to save
+        output_path: Path of the JSON file
+    """
+    document = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "result": {**asdict(report), "speedup": report.speedup},
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    logger.info(f"Precision report saved to {output_path}")
+
+
+def describe_model(backend: str, model_path: Optional[str]) -> str:
+    """Name of a model in the report"""
+    if backend == "deepface":
+        return backend
+    return f"{backend}:{os.path.basename(model_path)}" if model_path else backend
+
+
+def main() -> int:
+    """
+    Run the accuracy check from the command line
+
+    Returns:
+        Exit code (1 if the agreement is below --min-agreement)
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara um modelo de emoções de precisão reduzida com o modelo de "
+            "precisão total nos rostos de um vídeo local"
+        )
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        default=str(config.INPUT_VIDEO_PATH),
+        help=f"Vídeo local com rostos (padrão: {config.INPUT_VIDEO_PATH})",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=EMOTION_BACKENDS,
+        default="tflite",
+        help="Executor do modelo avaliado (padrão: tflite)",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="Arquivo do modelo avaliado (padrão: o do executor)",
+    )
+    parser.add_argument(
+        "--reference-backend",
+        choices=EMOTION_BACKENDS,
+        default="deepface",
+        help="Executor do modelo de referência (padrão: deepface)",
+    )
+    parser.add_argument(
+        "--reference-model",
+        type=str,
+        default=None,
+        help="Arquivo do modelo de referência (padrão: o do executor)",
+    )
+    parser.add_argument(
+        "--max-faces",
+        type=int,
+        default=500,
+        help="Número máximo de rostos comparados (padrão: 500)",
+    )
+    parser.add_argument(
+        "--sample-every",
+        type=int,
+        default=config.FACE_DETECT_EVERY_N_FRAMES,
+        help=(
+            "Detectar rostos em um frame a cada N "
+            f"(padrão: {config.FACE_DETECT_EVERY_N_FRAMES})"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="Rostos classificados por chamada (padrão: 8)",
+    )
+    parser.add_argument(
+        "--min-agreement",
+        type=float,
+        default=0.0,
+        help=(
+            "Concordância mínima das emoções dominantes (0-1); abaixo dela o "
+            "comando termina com erro (padrão: 0 = sem verificação)"
+        ),
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="emotion_precision.json",
+        help="Arquivo JSON com o resultado",
+    )
+    args = parser.parse_args()
+
+    crops = collect_face_crops(
+        args.input, initialize_detector(), args.max_faces, args.sample_every
+    )
+    if not crops:
+        logger.error(f"No faces found in {args.input}")
+        return 1
+    logger.info(f"{len(crops)} faces collected from {args.input}")
+
+    reference_model = load_emotion_backend(args.reference_backend, args.reference_model)
+    candidate_model = load_emotion_backend(args.backend, args.model)
+
+    report = compare_emotion_models(
+        crops,
+        reference_model,
+        candidate_model,
+        describe_model(args.reference_backend, args.reference_model),
+        describe_model(args.backend, args.model),
+        max(1, args.batch_size),
+    )
+
+    logger.info(
+        f"{report.candidate} vs {report.reference} on {report.num_faces} faces: "
+        f"label agreement {report.label_agreement * 100:.1f}%, "
+        f"max probability deviation {report.max_probability_deviation:.4f}, "
+        f"mean {report.mean_probability_deviation:.4f}"
+    )
+    logger.info(
+        f"Emotion inference: {report.reference_ms_per_face:.2f} ms/face -> "
+        f"{report.candidate_ms_per_face:.2f} ms/face ({report.speedup:.2f}x)"
+    )
+    for change, count in report.disagreements.items():
+        logger.info(f"  {change}: {count}")
+
+    save_precision_report(report, args.output)
+
+    if report.label_agreement < args.min_agreement:
+        logger.error(
+            f"Label agreement {report.label_agreement:.3f} is below "
+            f"{args.min_agreement:.3f}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
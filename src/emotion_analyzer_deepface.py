@@ -3,9 +3,11 @@ Emotion analysis module using DeepFace library with RetinaFace backend
 Provides integrated face detection and emotion recognition in a single step
 """
 
+import time
+import threading
 import numpy as np
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Optional
 
 from src.utils import get_logger, EmotionAnalysisError
@@ -45,39 +47,153 @@ class EmotionClassification:
     bounding_box: Optional[BoundingBox] = None
 
 
-_emotion_model_initialized = False
+# Output order of DeepFace's facial expression classifier
+EMOTION_LABELS = [
+    EmotionType.ANGRY,
+    EmotionType.DISGUST,
+    EmotionType.FEAR,
+    EmotionType.HAPPY,
+    EmotionType.SAD,
+    EmotionType.SURPRISE,
+    EmotionType.NEUTRAL,
+]
 
+FACE_INPUT_SIZE = 48
 
-def load_emotion_model(detector_backend: str = "retinaface") -> str:
+_emotion_model = None
+_emotion_classifier = None
+_deepface = None
+
+
+@dataclass
+class EmotionModel:
+    """
+    Loaded emotion classifier, shared by every emotion analysis call
+
+    load_emotion_model returns the same instance to every caller, including
+    the worker threads of the analysis service, so predict() runs one batch
+    at a time.
+
+    Attributes:
+        classifier: Keras model mapping (N, 48, 48, 1) faces to 7 scores
+        detector_backend: Face detection backend of analyze_emotion_from_frame
+        lock: Serializes predict() calls between threads
+    """
+
+    classifier: object
+    detector_backend: str = "retinaface"
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the classifier on a batch from prepare_face_batch
+
+        Args:
+            batch: float32 array of shape (N, 48, 48)
+
+        Returns:
+            Array of shape (N, 7) with scores in EMOTION_LABELS order
+        """
+        with self.lock:
+            return np.asarray(self.classifier(batch[..., np.newaxis], training=False))
+
+
+def load_emotion_model(
+    detector_backend: str = "retinaface", warm_up: bool = True
+) -> EmotionModel:
     """
-    Initialize DeepFace emotion detection model
+    Load the emotion classifier eagerly and warm it up
+
+    The weights are loaded here instead of inside the first analysis call,
+    and one inference on a blank face builds the TensorFlow kernels, so the
+    first analyzed frame is as fast as the following ones.
 
     Args:
         detector_backend: Face detection backend ('retinaface', 'opencv', 'ssd', 'mtcnn')
+        warm_up: Run one inference on a dummy face after loading
 
     Returns:
-        String indicating the backend to use
+        EmotionModel reused by all calls
 
     Raises:
-        EmotionAnalysisError: If DeepFace library is not available
+        EmotionAnalysisError: If DeepFace is not available or the model
+            cannot be built
     """
-    global _emotion_model_initialized
+    global _emotion_model
 
-    if _emotion_model_initialized:
-        return detector_backend
+    if (
+        _emotion_model is not None
+        and _emotion_model.detector_backend == detector_backend
+    ):
+        return _emotion_model
 
-    try:
-        # Test if DeepFace is available
-        import importlib.util
-
-        if importlib.util.find_spec("deepface") is None:
-            raise ImportError("DeepFace not found")
+    model = EmotionModel(
+        classifier=load_emotion_classifier(), detector_backend=detector_backend
+    )
 
+    if warm_up:
+        start = time.perf_counter()
+        try:
+            model.predict(np.zeros((1, FACE_INPUT_SIZE, FACE_INPUT_SIZE), np.float32))
+        except Exception as e:
+            raise EmotionAnalysisError(f"Emotion model warm-up failed: {e}")
         logger.info(
-            f"Emotion model initialized successfully using DeepFace with {detector_backend} backend"
+            f"Emotion model warmed up in {(time.perf_counter() - start) * 1000:.0f} ms"
         )
-        _emotion_model_initialized = True
-        return detector_backend
+
+    logger.info(
+        f"Emotion model initialized successfully using DeepFace with {detector_backend} backend"
+    )
+    _emotion_model = model
+    return model
+
+
+def import_deepface() -> object:
+    """
+    Import DeepFace once and reuse the module afterwards
+
+    Returns:
+        The DeepFace module
+
+    Raises:
+        ImportError: If DeepFace is not installed
+    """
+    global _deepface
+
+    if _deepface is None:
+        from deepface import DeepFace
+
+        _deepface = DeepFace
+    return _deepface
+
+
+def load_emotion_classifier() -> object:
+    """
+    Build DeepFace's facial expression classifier without any face detector
+
+    Returns:
+        Keras model mapping (N, 48, 48, 1) grayscale faces to 7 emotion scores
+
+    Raises:
+        EmotionAnalysisError: If the classifier cannot be built
+    """
+    global _emotion_classifier
+
+    if _emotion_classifier is not None:
+        return _emotion_classifier
+
+    try:
+        DeepFace = import_deepface()
+
+        try:
+            client = DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+        except TypeError:
+            # Older DeepFace releases do not take a task argument
+            client = DeepFace.build_model("Emotion")
+
+        _emotion_classifier = getattr(client, "model", client)
+        logger.info("Emotion classifier built for batched inference")
+        return _emotion_classifier
 
     except ImportError:
         raise EmotionAnalysisError(
@@ -85,7 +201,56 @@ def load_emotion_model(detector_backend: str = "retinaface") -> str:
             "Install it with: pip install deepface"
         )
     except Exception as e:
-        raise EmotionAnalysisError(f"Error initializing DeepFace: {e}")
+        raise EmotionAnalysisError(f"Error building emotion classifier: {e}")
+
+
+def prepare_face_batch(face_images: List[np.ndarray]) -> np.ndarray:
+    """
+    Stack face crops into a single classifier input batch
+
+    Args:
+        face_images: Face crops (48x48 grayscale from the face detector,
+            other sizes and BGR crops are converted)
+
+    Returns:
+        Preallocated float32 array of shape (N, 48, 48) scaled to [0, 1]
+    """
+    batch = np.empty(
+        (len(face_images), FACE_INPUT_SIZE, FACE_INPUT_SIZE), dtype=np.float32
+    )
+
+    for i, face_image in enumerate(face_images):
+        if face_image.ndim == 3:
+            face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
+        if face_image.shape != (FACE_INPUT_SIZE, FACE_INPUT_SIZE):
+            face_image = cv2.resize(face_image, (FACE_INPUT_SIZE, FACE_INPUT_SIZE))
+        batch[i] = face_image
+
+    batch *= 1.0 / 255.0
+    return batch
+
+
+def classification_from_scores(scores: np.ndarray) -> EmotionClassification:
+    """
+    Convert one row of classifier scores into an EmotionClassification
+
+    Args:
+        scores: Array with 7 probabilities in EMOTION_LABELS order
+
+    Returns:
+        EmotionClassification for the dominant emotion
+    """
+    probabilities = {
+        emotion: float(score) for emotion, score in zip(EMOTION_LABELS, scores)
+    }
+    dominant = EMOTION_LABELS[int(np.argmax(scores))]
+
+    return EmotionClassification(
+        emotion_label=dominant,
+        confidence=probabilities[dominant],
+        probabilities=probabilities,
+        bounding_box=None,
+    )
 
 
 def analyze_emotion_from_frame(
@@ -106,7 +271,7 @@ def analyze_emotion_from_frame(
         EmotionAnalysisError: If emotion detection fails critically
     """
     try:
-        from deepface import DeepFace
+        DeepFace = import_deepface()
 
         # Convert BGR to RGB if needed (DeepFace expects RGB)
         # Check if frame is already in correct format
@@ -211,7 +376,8 @@ def analyze_emotion(
 
     Args:
         face_image: Face image (48x48 or larger, grayscale or BGR)
-        model: Detector backend string (if None, uses 'retinaface')
+        model: EmotionModel or detector backend string (if None, the
+            model is loaded)
 
     Returns:
         EmotionClassification with detected emotion
@@ -222,7 +388,10 @@ def analyze_emotion(
     if model is None:
         model = load_emotion_model()
 
-    detector_backend = model if isinstance(model, str) else "retinaface"
+    if isinstance(model, EmotionModel):
+        detector_backend = model.detector_backend
+    else:
+        detector_backend = model if isinstance(model, str) else "retinaface"
 
     # For small face images, we need to analyze them directly
     # DeepFace works better with full frames, but we'll try with the face ROI
@@ -246,24 +415,35 @@ def batch_analyze_emotions(
     face_images: List[np.ndarray], model: object = None
 ) -> List[EmotionClassification]:
     """
-    Analyze emotions for multiple faces in batch
+    Analyze emotions for multiple faces in a single forward pass
+
+    The crops were already localized by the face detector, so only the
+    emotion classifier runs here; no face detection is repeated per crop.
 
     Args:
         face_images: List of face images
-        model: Detector backend string (if None, uses 'retinaface')
+        model: EmotionModel from load_emotion_model, or any model with the
+            same predict() method (loaded if not given)
 
     Returns:
-        List of EmotionClassification results
+        List of EmotionClassification results, in the same order as face_images
+
+    Raises:
+        EmotionAnalysisError: If the classifier cannot be run
     """
-    if model is None:
+    if not face_images:
+        return []
+
+    if not hasattr(model, "predict"):
         model = load_emotion_model()
+    batch = prepare_face_batch(face_images)
 
-    results = []
-    for face_image in face_images:
-        emotion = analyze_emotion(face_image, model)
-        results.append(emotion)
+    try:
+        scores = model.predict(batch)
+    except Exception as e:
+        raise EmotionAnalysisError(f"Batched emotion inference failed: {e}")
 
-    return results
+    return [classification_from_scores(row) for row in scores]
 
 
 # Import cv2 for color conversion
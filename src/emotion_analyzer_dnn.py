@@ -0,0 +1,192 @@
+"""
+Emotion analysis with OpenCV's DNN module
+
+Runs DeepFace's 7-class 48x48 facial expression network through cv2.dnn
+from weights converted to ONNX, so emotion inference needs neither
+TensorFlow nor DeepFace at run time. Workers start in a fraction of a
+second and use far less memory. The weights are converted once with:
+
+    python -m src.emotion_analyzer_dnn --output models/emotion.onnx
+"""
+
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass
+
+from src import config
+from src.emotion_analyzer_deepface import EMOTION_LABELS, FACE_INPUT_SIZE
+from src.utils import get_logger, setup_logging, EmotionAnalysisError
+
+logger = get_logger(__name__)
+
+# Name of the network input in the converted model
+ONNX_INPUT_NAME = "face"
+ONNX_OPSET = 13
+
+
+@dataclass
+class DnnEmotionModel:
+    """
+    Emotion classifier loaded into a cv2.dnn network
+
+    It has the predict() interface of EmotionModel, so batch_analyze_emotions
+    and the emotion cache use it unchanged. A cv2.dnn network must not be
+    shared between threads; every load_dnn_emotion_model call reads its own.
+
+    Attributes:
+        net: cv2.dnn network mapping (N, 1, 48, 48) faces to 7 scores
+        model_path: Path of the converted weights
+    """
+
+    net: cv2.dnn.Net
+    model_path: str
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the classifier on a batch from prepare_face_batch
+
+        Args:
+            batch: float32 array of shape (N, 48, 48)
+
+        Returns:
+            Array of shape (N, 7) with scores in EMOTION_LABELS order
+        """
+        self.net.setInput(np.ascontiguousarray(batch[:, np.newaxis]))
+        return self.net.forward().reshape(len(batch), -1)
+
+
+def load_dnn_emotion_model(
+    model_path: str = config.EMOTION_DNN_MODEL_PATH, warm_up: bool = True
+) -> DnnEmotionModel:
+    """
+    Load the converted emotion classifier into cv2.dnn
+
+    Args:
+        model_path: Path of the ONNX weights written by export_emotion_model
+        warm_up: Run one inference on a dummy face after loading
+
+    Returns:
+        DnnEmotionModel ready for batch_analyze_emotions
+
+    Raises:
+        EmotionAnalysisError: If the weights are missing, cannot be read or
+            do not produce 7 emotion scores
+    """
+    model_path = str(model_path)
+    if not os.path.isfile(model_path):
+        raise EmotionAnalysisError(
+            f"Emotion model weights not found: {model_path}. Convert them with: "
+            f"python -m src.emotion_analyzer_dnn --output {model_path}"
+        )
+
+    start = time.perf_counter()
+    try:
+        net = cv2.dnn.readNet(model_path)
+    except cv2.error as e:
+        raise EmotionAnalysisError(f"Error loading emotion model {model_path}: {e}")
+
+    model = DnnEmotionModel(net=net, model_path=model_path)
+
+    if warm_up:
+        try:
+            scores = model.predict(
+                np.zeros((1, FACE_INPUT_SIZE, FACE_INPUT_SIZE), np.float32)
+            )
+        except cv2.error as e:
+            raise EmotionAnalysisError(f"Emotion model warm-up failed: {e}")
+        if scores.shape != (1, len(EMOTION_LABELS)):
+            raise EmotionAnalysisError(
+                f"Emotion model {model_path} returns {scores.shape[1:]} scores, "
+                f"expected {len(EMOTION_LABELS)}"
+            )
+
+    logger.info(
+        f"Emotion model initialized with OpenCV DNN from {model_path} "
+        f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+    return model
+
+
+def export_emotion_model(output_path: str = config.EMOTION_DNN_MODEL_PATH) -> str:
+    """
+    Convert DeepFace's facial expression classifier to ONNX
+
+    Needs DeepFace, TensorFlow and tf2onnx, but only here: the converted
+    file is all load_dnn_emotion_model reads. The input is converted to
+    channels-first (N, 1, 48, 48), the layout cv2.dnn expects.
+
+    Args:
+        output_path: Where to write the ONNX weights
+
+    Returns:
+        Path of the written file
+
+    Raises:
+        EmotionAnalysisError: If tf2onnx is missing or the conversion fails
+    """
+    from src.emotion_analyzer_deepface import load_emotion_classifier
+
+    try:
+        import tensorflow as tf
+        import tf2onnx
+    except ImportError:
+        raise EmotionAnalysisError(
+            "tf2onnx is required to convert the emotion model. "
+            "Install it with: pip install tf2onnx"
+        )
+
+    classifier = load_emotion_classifier()
+    output_path = str(output_path)
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Converting a tf.function also works for Keras 3 models, unlike from_keras
+    signature = (
+        tf.TensorSpec(
+            (None, FACE_INPUT_SIZE, FACE_INPUT_SIZE, 1),
+            tf.float32,
+            name=ONNX_INPUT_NAME,
+        ),
+    )
+    function = tf.function(lambda face: classifier(face, training=False))
+
+    try:
+        tf2onnx.convert.from_function(
+            function,
+            input_signature=signature,
+            opset=ONNX_OPSET,
+            inputs_as_nchw=[ONNX_INPUT_NAME],
+            output_path=output_path,
+        )
+    except Exception as e:
+        raise EmotionAnalysisError(f"Error converting emotion model: {e}")
+
+    logger.info(f"Emotion model converted to {output_path}")
+    return output_path
+
+
+def main() -> None:
+    """Convert the emotion classifier from the command line"""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Converte o classificador de emoções do DeepFace para ONNX, "
+            "usado por --emotion-backend dnn"
+        )
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=str(config.EMOTION_DNN_MODEL_PATH),
+        help=f"Arquivo ONNX de saída (padrão: {config.EMOTION_DNN_MODEL_PATH})",
+    )
+    args = parser.parse_args()
+
+    export_emotion_model(args.output)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,306 @@
+"""
+Reduced-precision emotion analysis with TensorFlow Lite
+
+Converts DeepFace's facial expression classifier to a TFLite model with
+reduced-precision weights and runs it through the TFLite interpreter:
+
+- float16: weights stored as float16 (half the size, float32 arithmetic)
+- int8: weights quantized to int8, activations quantized on the fly
+- int8_full: weights and activations quantized to int8, with activation
+  ranges calibrated on face crops from a local clip
+
+The interpreter comes from ai_edge_litert or tflite_runtime when one is
+installed, so analysis does not need to import TensorFlow; otherwise
+tf.lite is used. Measure the accuracy cost of a converted model with
+python -m src.emotion_accuracy before using it.
+
+Usage:
+    python -m src.emotion_analyzer_tflite --precision int8 --output models/emotion.tflite
+    python -m src.emotion_analyzer_tflite --precision int8_full \\
+        --calibration-video data/video.mp4 --output models/emotion_int8.tflite
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src import config
+from src.emotion_analyzer_deepface import (
+    EMOTION_LABELS,
+    FACE_INPUT_SIZE,
+    prepare_face_batch,
+)
+from src.utils import get_logger, setup_logging, EmotionAnalysisError
+
+logger = get_logger(__name__)
+
+PRECISIONS = ("float32", "float16", "int8", "int8_full")
+
+
+@dataclass
+class TfliteEmotionModel:
+    """
+    Emotion classifier loaded into a TFLite interpreter
+
+    It has the predict() interface of EmotionModel, so batch_analyze_emotions
+    and the emotion cache use it unchanged. An interpreter must not be shared
+    between threads; every load_tflite_emotion_model call creates its own.
+
+    Attributes:
+        interpreter: TFLite interpreter mapping (N, 48, 48, 1) faces to 7 scores
+        model_path: Path of the converted model
+        input_index: Tensor index of the input
+        output_index: Tensor index of the output
+        batch_size: Batch size the tensors are currently allocated for
+    """
+
+    interpreter: object
+    model_path: str
+    input_index: int
+    output_index: int
+    batch_size: int = 1
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the classifier on a batch from prepare_face_batch
+
+        Args:
+            batch: float32 array of shape (N, 48, 48)
+
+        Returns:
+            Array of shape (N, 7) with scores in EMOTION_LABELS order
+        """
+        if len(batch) != self.batch_size:
+            self.interpreter.resize_tensor_input(
+                self.input_index, (len(batch), FACE_INPUT_SIZE, FACE_INPUT_SIZE, 1)
+            )
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(batch)
+
+        self.interpreter.set_tensor(self.input_index, batch[..., np.newaxis])
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+def import_tflite_interpreter() -> type:
+    """
+    Find a TFLite interpreter, preferring the standalone runtimes
+
+    Returns:
+        The Interpreter class
+
+    Raises:
+        EmotionAnalysisError: If no TFLite runtime is installed
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+
+        return Interpreter
+    except ImportError:
+        pass
+
+    try:
+        from tflite_runtime.interpreter import Interpreter
+
+        return Interpreter
+    except ImportError:
+        pass
+
+    try:
+        import tensorflow as tf
+
+        return tf.lite.Interpreter
+    except ImportError:
+        raise EmotionAnalysisError(
+            "A TFLite runtime is required. Install it with: pip install ai-edge-litert"
+        )
+
+
+def load_tflite_emotion_model(
+    model_path: str = config.EMOTION_TFLITE_MODEL_PATH, warm_up: bool = True
+) -> TfliteEmotionModel:
+    """
+    Load a converted emotion classifier into a TFLite interpreter
+
+    Args:
+        model_path: Path of the .tflite model written by export_emotion_model
+        warm_up: Run one inference on a dummy face after loading
+
+    Returns:
+        TfliteEmotionModel ready for batch_analyze_emotions
+
+    Raises:
+        EmotionAnalysisError: If the model is missing, cannot be read or
+            does not produce 7 emotion scores
+    """
+    model_path = str(model_path)
+    if not os.path.isfile(model_path):
+        raise EmotionAnalysisError(
+            f"Emotion model not found: {model_path}. Convert it with: "
+            f"python -m src.emotion_analyzer_tflite --output {model_path}"
+        )
+
+    Interpreter = import_tflite_interpreter()
+    start = time.perf_counter()
+    try:
+        interpreter = Interpreter(model_path=model_path)
+        interpreter.allocate_tensors()
+    except (RuntimeError, ValueError) as e:
+        raise EmotionAnalysisError(f"Error loading emotion model {model_path}: {e}")
+
+    model = TfliteEmotionModel(
+        interpreter=interpreter,
+        model_path=model_path,
+        input_index=interpreter.get_input_details()[0]["index"],
+        output_index=interpreter.get_output_details()[0]["index"],
+    )
+
+    if warm_up:
+        try:
+            scores = model.predict(
+                np.zeros((1, FACE_INPUT_SIZE, FACE_INPUT_SIZE), np.float32)
+            )
+        except (RuntimeError, ValueError) as e:
+            raise EmotionAnalysisError(f"Emotion model warm-up failed: {e}")
+        if scores.shape != (1, len(EMOTION_LABELS)):
+            raise EmotionAnalysisError(
+                f"Emotion model {model_path} returns {scores.shape[1:]} scores, "
+                f"expected {len(EMOTION_LABELS)}"
+            )
+
+    logger.info(
+        f"Emotion model initialized with TFLite from {model_path} "
+        f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+    return model
+
+
+def export_emotion_model(
+    output_path: str = config.EMOTION_TFLITE_MODEL_PATH,
+    precision: str = "float16",
+    calibration_faces: Optional[List[np.ndarray]] = None,
+) -> str:
+    """
+    Convert DeepFace's facial expression classifier to TFLite
+
+    Needs DeepFace and TensorFlow, but only here. Inputs and outputs stay
+    float32 for every precision, so the converted model is a drop-in
+    replacement.
+
+    Args:
+        output_path: Where to write the .tflite model
+        precision: One of PRECISIONS
+        calibration_faces: Face crops used to calibrate the activation
+            ranges (required for 'int8_full')
+
+    Returns:
+        Path of the written file
+
+    Raises:
+        ValueError: If the precision is unknown or 'int8_full' has no
+            calibration faces
+        EmotionAnalysisError: If the conversion fails
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unknown precision '{precision}', expected one of {PRECISIONS}"
+        )
+    if precision == "int8_full" and not calibration_faces:
+        raise ValueError("int8_full precision needs calibration faces")
+
+    from src.emotion_analyzer_deepface import load_emotion_classifier
+
+    import tensorflow as tf
+
+    classifier = load_emotion_classifier()
+    converter = tf.lite.TFLiteConverter.from_keras_model(classifier)
+
+    if precision != "float32":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    if precision == "int8_full":
+        batch = prepare_face_batch(calibration_faces)[..., np.newaxis]
+        converter.representative_dataset = lambda: (
+            [face[np.newaxis]] for face in batch
+        )
+
+    try:
+        model_content = converter.convert()
+    except Exception as e:
+        raise EmotionAnalysisError(f"Error converting emotion model: {e}")
+
+    output_path = str(output_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(model_content)
+
+    logger.info(
+        f"Emotion model converted to {output_path} ({precision}, "
+        f"{len(model_content) / 1024:.0f} KB)"
+    )
+    return output_path
+
+
+def main() -> None:
+    """Convert the emotion classifier from the command line"""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Converte o classificador de emoções do DeepFace para TFLite com "
+            "precisão reduzida, usado por --emotion-backend tflite"
+        )
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=str(config.EMOTION_TFLITE_MODEL_PATH),
+        help=f"Arquivo TFLite de saída (padrão: {config.EMOTION_TFLITE_MODEL_PATH})",
+    )
+    parser.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default="float16",
+        help=(
+            "Precisão dos pesos: float16 (pesos em meia precisão), int8 (pesos "
+            "quantizados) ou int8_full (pesos e ativações quantizados, calibrados "
+            "com --calibration-video) (padrão: float16)"
+        ),
+    )
+    parser.add_argument(
+        "--calibration-video",
+        type=str,
+        default=None,
+        help="Vídeo local cujos rostos calibram a quantização int8_full",
+    )
+    parser.add_argument(
+        "--calibration-faces",
+        type=int,
+        default=config.EMOTION_CALIBRATION_FACES,
+        help=(
+            "Número de rostos usados na calibração "
+            f"(padrão: {config.EMOTION_CALIBRATION_FACES})"
+        ),
+    )
+    args = parser.parse_args()
+    if args.precision == "int8_full" and not args.calibration_video:
+        parser.error("--precision int8_full requer --calibration-video")
+
+    calibration_faces = None
+    if args.calibration_video:
+        from src.emotion_accuracy import collect_face_crops
+        from src.face_detector import initialize_detector
+
+        calibration_faces = collect_face_crops(
+            args.calibration_video, initialize_detector(), args.calibration_faces
+        )
+        logger.info(f"{len(calibration_faces)} faces collected for calibration")
+
+    export_emotion_model(args.output, args.precision, calibration_faces)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
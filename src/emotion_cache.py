@@ -0,0 +1,142 @@
+"""
+Per-track emotion result cache
+
+Reuses the emotion classification of a tracked face until it is old enough
+or its face crop changed enough to be worth classifying again.
+"""
+
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from src import config
+from src.face_detector import FaceRegion
+from src.emotion_analyzer_deepface import (
+    EmotionClassification,
+    batch_analyze_emotions,
+)
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CachedEmotion:
+    """Emotion classification stored for a face track"""
+
+    classification: EmotionClassification
+    face_image: np.ndarray
+    frame_number: int
+
+
+@dataclass
+class EmotionCache:
+    """Holds the cached emotions and the re-classification policy"""
+
+    refresh_every_n: int
+    max_pixel_distance: float
+    entries: Dict[int, CachedEmotion] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+
+def initialize_emotion_cache(
+    refresh_every_n: int = config.EMOTION_REFRESH_EVERY_N_FRAMES,
+    max_pixel_distance: float = config.EMOTION_REFRESH_PIXEL_DISTANCE,
+) -> EmotionCache:
+    """
+    Initialize an empty emotion cache
+
+    Args:
+        refresh_every_n: Re-classify a track at least every N frames (1 = always)
+        max_pixel_distance: Re-classify when the mean absolute difference
+            between the 48x48 crop and the cached crop exceeds this value
+
+    Returns:
+        EmotionCache with no entries
+    """
+    emotion_cache = EmotionCache(
+        refresh_every_n=max(1, refresh_every_n),
+        max_pixel_distance=max_pixel_distance,
+    )
+
+    logger.info(
+        f"Emotion cache initialized: refresh every {refresh_every_n} frames "
+        f"or above {max_pixel_distance} mean pixel difference"
+    )
+    return emotion_cache
+
+
+def analyze_tracked_emotions(
+    faces: List[FaceRegion],
+    frame_number: int,
+    emotion_cache: EmotionCache,
+    model: object = None,
+    batch_fn: Callable = batch_analyze_emotions,
+) -> List[EmotionClassification]:
+    """
+    Classify tracked faces, reusing cached results where still valid
+
+    Faces whose cached result is stale are classified together in a single
+    batch_fn call. Entries of tracks that are no longer present are dropped.
+
+    Args:
+        faces: Faces of the current frame (face_id must be a track ID)
+        frame_number: Index of the current frame
+        emotion_cache: Emotion cache, updated in place
+        model: Emotion model handed to batch_fn
+        batch_fn: Batched emotion classifier
+
+    Returns:
+        List of EmotionClassification results, in the same order as faces
+    """
+    stale = [
+        i
+        for i, face in enumerate(faces)
+        if _needs_refresh(face, frame_number, emotion_cache)
+    ]
+
+    if stale:
+        fresh = batch_fn([faces[i].face_image for i in stale], model)
+        for i, classification in zip(stale, fresh):
+            emotion_cache.entries[faces[i].face_id] = CachedEmotion(
+                classification=classification,
+                face_image=faces[i].face_image,
+                frame_number=frame_number,
+            )
+
+    emotion_cache.misses += len(stale)
+    emotion_cache.hits += len(faces) - len(stale)
+
+    present = {face.face_id for face in faces}
+    for track_id in list(emotion_cache.entries):
+        if track_id not in present:
+            del emotion_cache.entries[track_id]
+
+    return [emotion_cache.entries[face.face_id].classification for face in faces]
+
+
+def clear_emotion_cache(emotion_cache: EmotionCache) -> None:
+    """
+    Drop every cached result so all faces are classified again
+
+    Args:
+        emotion_cache: Emotion cache, updated in place
+    """
+    emotion_cache.entries.clear()
+
+
+def _needs_refresh(
+    face: FaceRegion, frame_number: int, emotion_cache: EmotionCache
+) -> bool:
+    """Check whether a face must go through the emotion classifier again"""
+    cached = emotion_cache.entries.get(face.face_id)
+
+    if cached is None:
+        return True
+    if frame_number - cached.frame_number >= emotion_cache.refresh_every_n:
+        return True
+
+    distance = float(cv2.absdiff(face.face_image, cached.face_image).mean())
+    return distance > emotion_cache.max_pixel_distance
@@ -3,11 +3,12 @@ Face detection module using OpenCV Haar Cascade
 """
 
 import cv2
-from typing import List, Tuple
-from dataclasses import dataclass
+from typing import List, Tuple, Optional
+from dataclasses import dataclass, field
 import numpy as np
 
 from src.utils import get_logger, FaceDetectionError
+from src import config
 
 logger = get_logger(__name__)
 
@@ -32,6 +33,31 @@ class FaceRegion:
     face_image: np.ndarray
 
 
+@dataclass
+class FaceTrack:
+    """Represents a face followed across frames"""
+
+    track_id: int
+    bounding_box: BoundingBox
+    template: np.ndarray
+
+
+@dataclass
+class FaceTrackerState:
+    """Holds the tracks and keyframe schedule of the face tracker"""
+
+    detect_every_n: int
+    min_track_score: float
+    search_margin: float
+    iou_threshold: float
+    full_scan_every_n: int
+    roi_margin: float
+    tracks: List[FaceTrack] = field(default_factory=list)
+    next_track_id: int = 0
+    frames_since_detection: Optional[int] = None
+    frames_since_full_scan: Optional[int] = None
+
+
 def initialize_detector() -> cv2.CascadeClassifier:
     """
     Initialize Haar Cascade face detector
@@ -62,6 +88,8 @@ def detect_faces(
     scale_factor: float = 1.1,
     min_neighbors: int = 5,
     min_size: Tuple[int, int] = (30, 30),
+    gray: Optional[np.ndarray] = None,
+    search_regions: Optional[List[BoundingBox]] = None,
 ) -> List[FaceRegion]:
     """
     Detect faces in a frame using Haar Cascade
@@ -72,31 +100,330 @@ def detect_faces(
         scale_factor: Scale factor for detection (default: 1.1)
         min_neighbors: Minimum neighbors for detection (default: 5)
         min_size: Minimum face size (default: 30x30)
+        gray: Grayscale version of frame, if already available
+        search_regions: Only scan these regions of the frame (default: the
+            whole frame); boxes are still returned in frame coordinates
 
     Returns:
         List of FaceRegion objects containing detected faces
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-    faces = face_cascade.detectMultiScale(
-        gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size
-    )
+    if search_regions is None:
+        faces = face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=scale_factor,
+            minNeighbors=min_neighbors,
+            minSize=min_size,
+        )
+        boxes = [
+            BoundingBox(x=int(x), y=int(y), width=int(w), height=int(h))
+            for (x, y, w, h) in faces
+        ]
+    else:
+        boxes = []
+        for region in _merge_regions(search_regions):
+            if region.width < min_size[0] or region.height < min_size[1]:
+                continue
+            roi = gray[
+                region.y : region.y + region.height,
+                region.x : region.x + region.width,
+            ]
+            faces = face_cascade.detectMultiScale(
+                roi,
+                scaleFactor=scale_factor,
+                minNeighbors=min_neighbors,
+                minSize=min_size,
+            )
+            for x, y, w, h in faces:
+                box = BoundingBox(
+                    x=int(x) + region.x,
+                    y=int(y) + region.y,
+                    width=int(w),
+                    height=int(h),
+                )
+                if all(_bbox_iou(box, other) < 0.5 for other in boxes):
+                    boxes.append(box)
 
     face_regions = []
 
-    for face_id, (x, y, w, h) in enumerate(faces):
-        bounding_box = BoundingBox(x=x, y=y, width=w, height=h)
-
-        face_roi = gray[y : y + h, x : x + w]
-        face_image_48x48 = cv2.resize(face_roi, (48, 48))
-
+    for face_id, bounding_box in enumerate(boxes):
         face_region = FaceRegion(
             face_id=face_id,
             bounding_box=bounding_box,
             confidence=1.0,
-            face_image=face_image_48x48,
+            face_image=_crop_face(gray, bounding_box),
         )
 
         face_regions.append(face_region)
 
     return face_regions
+
+
+def initialize_face_tracker(
+    detect_every_n: int = config.FACE_DETECT_EVERY_N_FRAMES,
+    first_track_id: int = 0,
+    full_scan_every_n: int = config.FACE_FULL_SCAN_EVERY_N_FRAMES,
+) -> FaceTrackerState:
+    """
+    Initialize the face tracker state
+
+    Args:
+        detect_every_n: Run the Haar cascade every N frames (1 = every frame)
+        first_track_id: First track ID to hand out
+        full_scan_every_n: Scan the whole frame at least every N frames;
+            other detections only search around the current tracks
+            (0 = always scan the whole frame)
+
+    Returns:
+        FaceTrackerState with no tracks
+    """
+    tracker_state = FaceTrackerState(
+        detect_every_n=max(1, detect_every_n),
+        min_track_score=config.FACE_TRACK_MIN_SCORE,
+        search_margin=config.FACE_TRACK_SEARCH_MARGIN,
+        iou_threshold=config.FACE_TRACK_IOU_THRESHOLD,
+        full_scan_every_n=max(0, full_scan_every_n),
+        roi_margin=config.FACE_ROI_MARGIN,
+        next_track_id=first_track_id,
+    )
+
+    logger.info(
+        f"Face tracker initialized: detection every {detect_every_n} frames, "
+        f"full-frame scan every {full_scan_every_n or 1} frames"
+    )
+    return tracker_state
+
+
+def track_faces(
+    frame: np.ndarray,
+    face_cascade: cv2.CascadeClassifier,
+    tracker_state: FaceTrackerState,
+    gray: Optional[np.ndarray] = None,
+) -> List[FaceRegion]:
+    """
+    Detect faces on keyframes and follow them with template matching in between
+
+    The Haar cascade runs every detect_every_n frames, or as soon as a track
+    is lost. Between periodic full-frame scans it only searches expanded
+    regions around the current tracks, falling back to a full scan when a
+    track is missed. Detections are matched to existing tracks by overlap,
+    so the face_id of each FaceRegion is a track ID that is stable across
+    frames.
+
+    Args:
+        frame: Input frame (BGR image)
+        face_cascade: Initialized face detector
+        tracker_state: Tracker state, updated in place
+        gray: Grayscale version of frame, if already available
+
+    Returns:
+        List of FaceRegion objects whose face_id is the track ID
+    """
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    if tracker_state.frames_since_full_scan is not None:
+        tracker_state.frames_since_full_scan += 1
+
+    is_keyframe = (
+        tracker_state.frames_since_detection is None
+        or tracker_state.frames_since_detection + 1 >= tracker_state.detect_every_n
+    )
+
+    if not is_keyframe:
+        propagated = [
+            _propagate_track(gray, track, tracker_state)
+            for track in tracker_state.tracks
+        ]
+        if all(propagated):
+            tracker_state.frames_since_detection += 1
+            return [_track_to_region(gray, track) for track in tracker_state.tracks]
+        # At least one track was lost: fall back to a detection on this frame
+
+    detections = None
+    if (
+        tracker_state.tracks
+        and tracker_state.frames_since_full_scan is not None
+        and tracker_state.frames_since_full_scan < tracker_state.full_scan_every_n
+    ):
+        search_regions = _expand_regions(
+            [track.bounding_box for track in tracker_state.tracks],
+            tracker_state.roi_margin,
+            gray.shape,
+        )
+        detections = detect_faces(
+            frame, face_cascade, gray=gray, search_regions=search_regions
+        )
+        if len(detections) < len(tracker_state.tracks):
+            # A face was missed around its track: rescan the whole frame
+            detections = None
+
+    if detections is None:
+        detections = detect_faces(frame, face_cascade, gray=gray)
+        tracker_state.frames_since_full_scan = 0
+
+    _update_tracks(gray, detections, tracker_state)
+    tracker_state.frames_since_detection = 0
+
+    return [_track_to_region(gray, track) for track in tracker_state.tracks]
+
+
+def reset_face_tracker(tracker_state: FaceTrackerState) -> None:
+    """
+    Drop all tracks and force a detection on the next frame
+
+    Track IDs keep increasing, so faces found afterwards get new IDs.
+
+    Args:
+        tracker_state: Tracker state, updated in place
+    """
+    tracker_state.tracks = []
+    tracker_state.frames_since_detection = None
+    tracker_state.frames_since_full_scan = None
+
+
+def _crop_face(gray: np.ndarray, bbox: BoundingBox) -> np.ndarray:
+    """Crop a face from a grayscale frame and resize it to 48x48"""
+    face_roi = gray[bbox.y : bbox.y + bbox.height, bbox.x : bbox.x + bbox.width]
+    return cv2.resize(face_roi, (48, 48))
+
+
+def _track_to_region(gray: np.ndarray, track: FaceTrack) -> FaceRegion:
+    """Build the FaceRegion reported for a track"""
+    return FaceRegion(
+        face_id=track.track_id,
+        bounding_box=track.bounding_box,
+        confidence=1.0,
+        face_image=_crop_face(gray, track.bounding_box),
+    )
+
+
+def _bbox_iou(a: BoundingBox, b: BoundingBox) -> float:
+    """Intersection over union of two bounding boxes"""
+    ix = max(0, min(a.x + a.width, b.x + b.width) - max(a.x, b.x))
+    iy = max(0, min(a.y + a.height, b.y + b.height) - max(a.y, b.y))
+    intersection = ix * iy
+    union = a.width * a.height + b.width * b.height - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def _expand_regions(
+    boxes: List[BoundingBox], margin: float, frame_shape: Tuple[int, ...]
+) -> List[BoundingBox]:
+    """Grow each box by margin times its size on every side, clipped to the frame"""
+    frame_h, frame_w = frame_shape[:2]
+    regions = []
+
+    for box in boxes:
+        margin_x = int(box.width * margin)
+        margin_y = int(box.height * margin)
+        x0 = max(0, box.x - margin_x)
+        y0 = max(0, box.y - margin_y)
+        x1 = min(frame_w, box.x + box.width + margin_x)
+        y1 = min(frame_h, box.y + box.height + margin_y)
+        regions.append(BoundingBox(x=x0, y=y0, width=x1 - x0, height=y1 - y0))
+
+    return regions
+
+
+def _merge_regions(regions: List[BoundingBox]) -> List[BoundingBox]:
+    """Merge overlapping regions so no area is scanned twice"""
+    merged = list(regions)
+    changed = True
+
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if _bbox_iou(a, b) == 0.0:
+                    continue
+                x0, y0 = min(a.x, b.x), min(a.y, b.y)
+                x1 = max(a.x + a.width, b.x + b.width)
+                y1 = max(a.y + a.height, b.y + b.height)
+                merged[i] = BoundingBox(x=x0, y=y0, width=x1 - x0, height=y1 - y0)
+                del merged[j]
+                changed = True
+                break
+            if changed:
+                break
+
+    return merged
+
+
+def _update_tracks(
+    gray: np.ndarray, detections: List[FaceRegion], tracker_state: FaceTrackerState
+) -> None:
+    """Match detections to existing tracks by IoU and replace the track list"""
+    pairs = sorted(
+        (
+            (_bbox_iou(track.bounding_box, det.bounding_box), t, d)
+            for t, track in enumerate(tracker_state.tracks)
+            for d, det in enumerate(detections)
+        ),
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+
+    matched_tracks = set()
+    det_to_track = {}
+    for iou, t, d in pairs:
+        if iou < tracker_state.iou_threshold:
+            break
+        if t in matched_tracks or d in det_to_track:
+            continue
+        matched_tracks.add(t)
+        det_to_track[d] = tracker_state.tracks[t].track_id
+
+    new_tracks = []
+    for d, det in enumerate(detections):
+        track_id = det_to_track.get(d)
+        if track_id is None:
+            track_id = tracker_state.next_track_id
+            tracker_state.next_track_id += 1
+
+        bbox = det.bounding_box
+        template = gray[
+            bbox.y : bbox.y + bbox.height, bbox.x : bbox.x + bbox.width
+        ].copy()
+        new_tracks.append(
+            FaceTrack(track_id=track_id, bounding_box=bbox, template=template)
+        )
+
+    tracker_state.tracks = new_tracks
+
+
+def _propagate_track(
+    gray: np.ndarray, track: FaceTrack, tracker_state: FaceTrackerState
+) -> bool:
+    """
+    Move a track to the best template match inside a window around its box
+
+    Returns:
+        True if the track was found, False if it was lost
+    """
+    bbox = track.bounding_box
+    frame_h, frame_w = gray.shape[:2]
+    margin_x = int(bbox.width * tracker_state.search_margin)
+    margin_y = int(bbox.height * tracker_state.search_margin)
+
+    x0 = max(0, bbox.x - margin_x)
+    y0 = max(0, bbox.y - margin_y)
+    x1 = min(frame_w, bbox.x + bbox.width + margin_x)
+    y1 = min(frame_h, bbox.y + bbox.height + margin_y)
+
+    if x1 - x0 < bbox.width or y1 - y0 < bbox.height:
+        return False
+
+    scores = cv2.matchTemplate(gray[y0:y1, x0:x1], track.template, cv2.TM_CCOEFF_NORMED)
+    _, max_score, _, max_loc = cv2.minMaxLoc(scores)
+
+    if max_score < tracker_state.min_track_score:
+        return False
+
+    track.bounding_box = BoundingBox(
+        x=x0 + max_loc[0], y=y0 + max_loc[1], width=bbox.width, height=bbox.height
+    )
+    return True
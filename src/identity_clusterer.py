@@ -0,0 +1,319 @@
+"""
+Identity clustering of face tracks across the whole video
+
+Face tracks are sampled every few frames and their crops are embedded in
+batches with a DeepFace recognition model. Each track keeps only the running
+sum of its embeddings and its emotion / activity counters, so memory grows
+with the number of tracks, not with the number of face crops. At the end the
+track prototypes are linked with a nearest-neighbour radius graph, and each
+connected component is split with complete linkage so that every pair of
+tracks of one person is within the distance threshold.
+"""
+
+import cv2
+import numpy as np
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src import config
+from src.utils import get_logger, ModelLoadError
+from src.pipeline import FrameAnalysis
+from src.summary_generator import PersonSummary
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class TrackProfile:
+    """Running statistics of one face track"""
+
+    track_id: int
+    first_frame: int
+    num_frames: int = 0
+    embedding_sum: Optional[np.ndarray] = None
+    num_embeddings: int = 0
+    last_sampled_frame: Optional[int] = None
+    emotion_counts: Counter = field(default_factory=Counter)
+    activity_counts: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class IdentityAggregator:
+    """
+    Accumulates face tracks frame by frame and clusters them into people
+
+    Crops waiting to be embedded are buffered until a full batch is ready.
+    """
+
+    sample_every_n: int = config.IDENTITY_SAMPLE_EVERY_N_FRAMES
+    batch_size: int = config.IDENTITY_BATCH_SIZE
+    distance_threshold: float = config.IDENTITY_DISTANCE_THRESHOLD
+    profiles: Dict[int, TrackProfile] = field(default_factory=dict)
+    pending_track_ids: List[int] = field(default_factory=list)
+    pending_crops: List[np.ndarray] = field(default_factory=list)
+
+    def update(self, result: FrameAnalysis, embedding_model: object) -> None:
+        """
+        Add the faces of one analyzed frame
+
+        Args:
+            result: FrameAnalysis of the frame
+            embedding_model: Model from load_embedding_model
+        """
+        frame_number = result.frame.frame_number
+        image = result.frame.image_data
+
+        for face, emotion in zip(result.faces, result.emotions):
+            profile = self.profiles.get(face.face_id)
+            if profile is None:
+                profile = TrackProfile(track_id=face.face_id, first_frame=frame_number)
+                self.profiles[face.face_id] = profile
+
+            profile.num_frames += 1
+            profile.emotion_counts[emotion.emotion_label.value] += 1
+            profile.activity_counts[result.activity] += 1
+
+            # Carried-forward frames repeat the last crop, nothing new to embed
+            if result.carried_forward or image is None:
+                continue
+            if (
+                profile.last_sampled_frame is not None
+                and frame_number - profile.last_sampled_frame < self.sample_every_n
+            ):
+                continue
+
+            bbox = face.bounding_box
+            crop = image[bbox.y : bbox.y + bbox.height, bbox.x : bbox.x + bbox.width]
+            if crop.size == 0:
+                continue
+
+            profile.last_sampled_frame = frame_number
+            self.pending_track_ids.append(face.face_id)
+            self.pending_crops.append(crop.copy())
+
+        if len(self.pending_crops) >= self.batch_size:
+            self.flush(embedding_model)
+
+    def flush(self, embedding_model: object) -> None:
+        """
+        Embed the buffered crops in a single batch
+
+        Args:
+            embedding_model: Model from load_embedding_model
+        """
+        if not self.pending_crops:
+            return
+
+        embeddings = batch_face_embeddings(self.pending_crops, embedding_model)
+        for track_id, embedding in zip(self.pending_track_ids, embeddings):
+            profile = self.profiles[track_id]
+            if profile.embedding_sum is None:
+                profile.embedding_sum = embedding.astype(np.float64)
+            else:
+                profile.embedding_sum += embedding
+            profile.num_embeddings += 1
+
+        self.pending_track_ids = []
+        self.pending_crops = []
+
+    def merge(self, other: "IdentityAggregator") -> None:
+        """
+        Add the tracks of another aggregator (e.g. of another segment)
+
+        Track IDs of different segments never overlap, so profiles are simply
+        combined. Both aggregators must have been flushed.
+
+        Args:
+            other: Aggregator to merge into this one
+        """
+        self.profiles.update(other.profiles)
+
+    def assign_people(self) -> List[PersonSummary]:
+        """
+        Cluster the face tracks into people
+
+        Returns:
+            PersonSummary list ordered by first appearance
+        """
+        if not self.profiles:
+            return []
+
+        profiles = sorted(self.profiles.values(), key=lambda p: p.first_frame)
+        labels = cluster_track_embeddings(
+            [
+                (p.embedding_sum / p.num_embeddings) if p.num_embeddings else None
+                for p in profiles
+            ],
+            self.distance_threshold,
+        )
+
+        # Labels are numbered in order of first appearance of each person
+        members: Dict[int, List[TrackProfile]] = {}
+        for profile, label in zip(profiles, labels):
+            members.setdefault(label, []).append(profile)
+
+        people = []
+        for person_id, tracks in enumerate(members.values(), start=1):
+            emotion_counts = sum((t.emotion_counts for t in tracks), Counter())
+            activity_counts = sum((t.activity_counts for t in tracks), Counter())
+            people.append(
+                PersonSummary(
+                    person_id=person_id,
+                    track_ids=[t.track_id for t in tracks],
+                    num_frames=sum(t.num_frames for t in tracks),
+                    emotion_distribution=dict(emotion_counts),
+                    activity_distribution=dict(activity_counts),
+                )
+            )
+
+        logger.info(f"{len(profiles)} face tracks grouped into {len(people)} people")
+        return people
+
+
+def load_embedding_model(model_name: str = config.IDENTITY_EMBEDDING_MODEL) -> object:
+    """
+    Build a DeepFace face recognition model for batched embeddings
+
+    Args:
+        model_name: DeepFace recognition model (e.g. "Facenet", "ArcFace")
+
+    Returns:
+        DeepFace recognition client with input_shape and forward()
+
+    Raises:
+        ModelLoadError: If the model cannot be built
+    """
+    try:
+        from deepface import DeepFace
+
+        try:
+            client = DeepFace.build_model(
+                model_name=model_name, task="facial_recognition"
+            )
+        except TypeError:
+            # Older DeepFace releases do not take a task argument
+            client = DeepFace.build_model(model_name)
+
+        logger.info(f"Face embedding model loaded: {model_name}")
+        return client
+
+    except ImportError:
+        raise ModelLoadError(
+            "DeepFace library is required but not installed. "
+            "Install it with: pip install deepface"
+        )
+    except Exception as e:
+        raise ModelLoadError(f"Error loading face embedding model: {e}")
+
+
+def batch_face_embeddings(
+    face_images: List[np.ndarray], embedding_model: object
+) -> np.ndarray:
+    """
+    Compute L2-normalized embeddings of BGR face crops in one forward pass
+
+    Args:
+        face_images: BGR face crops of any size
+        embedding_model: Model from load_embedding_model
+
+    Returns:
+        Array of shape (N, D) with one unit-length embedding per crop
+    """
+    height, width = embedding_model.input_shape
+    batch = np.empty((len(face_images), height, width, 3), dtype=np.float32)
+    for i, face_image in enumerate(face_images):
+        resized = cv2.resize(face_image, (width, height))
+        # DeepFace feeds its recognition models BGR in [0, 1], the channel
+        # order of OpenCV crops
+        batch[i] = resized / 255.0
+
+    embeddings = np.atleast_2d(
+        np.asarray(embedding_model.forward(batch), dtype=np.float32)
+    )
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def radius_graph_components(neighbours: List[np.ndarray]) -> List[List[int]]:
+    """
+    Connected components of a radius-neighbour graph
+
+    Args:
+        neighbours: Neighbour indices of each point, from
+            NearestNeighbors.radius_neighbors
+
+    Returns:
+        Point indices of each component
+    """
+    component_of = [-1] * len(neighbours)
+    components = []
+    for start in range(len(neighbours)):
+        if component_of[start] >= 0:
+            continue
+        component_of[start] = len(components)
+        component = [start]
+        for point in component:
+            for neighbour in neighbours[point]:
+                if component_of[neighbour] < 0:
+                    component_of[neighbour] = len(components)
+                    component.append(int(neighbour))
+        components.append(component)
+    return components
+
+
+def cluster_track_embeddings(
+    prototypes: List[Optional[np.ndarray]], distance_threshold: float
+) -> List[int]:
+    """
+    Group track prototypes whose embeddings are closer than the threshold
+
+    A radius-neighbour graph is built with a tree index, so the tracks are not
+    compared pairwise. Its connected components alone would be single
+    linkage, where a chain of close pairs merges two different people, so
+    each component with several tracks is split with complete linkage: every
+    pair of tracks in a cluster is within the threshold. Only the tracks of
+    one component are compared with each other. Tracks without embeddings
+    get a cluster of their own.
+
+    Args:
+        prototypes: Mean embedding of each track (None = never embedded)
+        distance_threshold: Maximum euclidean distance between unit-length
+            embeddings of the same person
+
+    Returns:
+        Cluster label of each track
+    """
+    from sklearn.cluster import AgglomerativeClustering
+    from sklearn.neighbors import NearestNeighbors
+
+    embedded = [i for i, p in enumerate(prototypes) if p is not None]
+    labels = [-1] * len(prototypes)
+    next_label = 0
+
+    if embedded:
+        points = np.stack([prototypes[i] for i in embedded])
+        points /= np.maximum(np.linalg.norm(points, axis=1, keepdims=True), 1e-12)
+
+        index = NearestNeighbors(radius=distance_threshold).fit(points)
+        neighbours = index.radius_neighbors(points, return_distance=False)
+
+        for component in radius_graph_components(neighbours):
+            if len(component) == 1:
+                clusters = np.zeros(1, dtype=int)
+            else:
+                clusters = AgglomerativeClustering(
+                    n_clusters=None,
+                    distance_threshold=distance_threshold,
+                    linkage="complete",
+                ).fit_predict(points[component])
+            for point, cluster in zip(component, clusters):
+                labels[embedded[point]] = next_label + int(cluster)
+            next_label += int(clusters.max()) + 1
+
+    for i, label in enumerate(labels):
+        if label < 0:
+            labels[i] = next_label
+            next_label += 1
+
+    return labels
@@ -4,7 +4,6 @@ Main entry point for Video Facial Analysis System
 
 import sys
 import argparse
-import cv2
 
 from src import config
 from src.utils import (
@@ -13,35 +12,60 @@ from src.utils import (
     validate_file_exists,
     ensure_directory_exists,
 )
-from src.video_processor import load_video, get_video_info, extract_frames
-from src.face_detector import initialize_detector, detect_faces
-from src.emotion_analyzer_deepface import load_emotion_model, batch_analyze_emotions
-from src.activity_detector import initialize_activity_detector, analyze_motion
-from src.summary_generator import create_summary, generate_text_report
+from src.video_processor import (
+    load_video,
+    get_video_info,
+    extract_frames,
+    compute_frame_stride,
+    create_video_writer,
+    EncoderSettings,
+    FramePool,
+    VIDEO_ENCODERS,
+)
+from src.face_detector import initialize_detector
+from src.activity_detector import initialize_activity_detector, MOTION_ENGINES
+from src.pipeline import (
+    EMOTION_BACKENDS,
+    initialize_analysis_state,
+    load_emotion_backend,
+    seed_motion_state,
+    run_sequential,
+    run_pipelined,
+    frame_record,
+    frame_pool_size,
+    create_annotating_encoder,
+)
+from src.segment_processor import process_video_segments, concatenate_segment_videos
+from src.summary_generator import (
+    SummaryAggregator,
+    generate_text_report,
+    save_performance_sidecar,
+    format_timestamp,
+)
+from src.performance import StageTimer, ThroughputMeter
+from src.metrics_server import ProcessingMetrics, start_metrics_server
+from src.results_store import ResultsWriter, merge_stores, set_processing_time
+from src.identity_clusterer import IdentityAggregator, load_embedding_model
+from src.checkpoint import (
+    Checkpoint,
+    PartitionedVideoWriter,
+    checkpoint_interval,
+    save_checkpoint,
+    load_checkpoint,
+    remove_checkpoint,
+)
 
 setup_logging()
 logger = get_logger(__name__)
 
-EMOTION_PT = {
-    "Angry": "Raiva",
-    "Disgust": "Nojo",
-    "Fear": "Medo",
-    "Happy": "Feliz",
-    "Sad": "Triste",
-    "Surprise": "Surpresa",
-    "Neutral": "Neutro",
-}
-
-ACTIVITY_PT = {
-    "Static": "Estatico",
-    "Moderate Movement": "Movimento Moderado",
-    "Rapid Movement": "Movimento Rapido",
-    "Unknown": "Desconhecido",
-}
-
-
-def parse_arguments():
-    """Parse command line arguments"""
+
+def parse_arguments(argv=None):
+    """
+    Parse command line arguments
+
+    Args:
+        argv: Arguments to parse (default: sys.argv[1:])
+    """
     parser = argparse.ArgumentParser(
         description="Sistema de Análise de Expressões Faciais em Vídeo"
     )
@@ -49,7 +73,10 @@ def parse_arguments():
         "--input",
         type=str,
         default=config.INPUT_VIDEO_PATH,
-        help=f"Caminho do vídeo de entrada (padrão: {config.INPUT_VIDEO_PATH})",
+        help=(
+            "Vídeo de entrada, diretório ou padrão glob com vários vídeos "
+            f"(padrão: {config.INPUT_VIDEO_PATH})"
+        ),
     )
     parser.add_argument(
         "--output",
@@ -62,78 +89,685 @@ def parse_arguments():
         action="store_true",
         help="Não gerar vídeo de saída anotado",
     )
+    parser.add_argument(
+        "--save-results",
+        action="store_true",
+        help=(
+            "Salvar os resultados por frame e por rosto em formato colunar "
+            "(diretório results/ na saída)"
+        ),
+    )
+    parser.add_argument(
+        "--identify-people",
+        action="store_true",
+        help=(
+            "Agrupar os rostos por pessoa ao longo de todo o vídeo e reportar "
+            "emoções e atividades de cada pessoa"
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=config.CHECKPOINT_EVERY_N_FRAMES,
+        help=(
+            "Salvar um checkpoint a cada N frames para poder retomar a análise "
+            "após uma interrupção (0 = sem checkpoints)"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Retomar a análise a partir do último checkpoint salvo no "
+            "diretório de saída"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help=(
+            "Expor métricas de processamento no formato Prometheus em "
+            "http://127.0.0.1:PORTA/metrics durante a execução"
+        ),
+    )
+    parser.add_argument(
+        "--detect-every",
+        type=int,
+        default=config.FACE_DETECT_EVERY_N_FRAMES,
+        help=(
+            "Executar o detector de rostos a cada N frames e rastrear entre eles "
+            f"(padrão: {config.FACE_DETECT_EVERY_N_FRAMES}; 1 = todos os frames)"
+        ),
+    )
+    parser.add_argument(
+        "--full-scan-every",
+        type=int,
+        default=config.FACE_FULL_SCAN_EVERY_N_FRAMES,
+        help=(
+            "Procurar rostos no frame inteiro pelo menos a cada N frames; nas demais "
+            "detecções, buscar apenas ao redor dos rostos conhecidos "
+            f"(padrão: {config.FACE_FULL_SCAN_EVERY_N_FRAMES}; 0 = sempre o frame inteiro)"
+        ),
+    )
+    parser.add_argument(
+        "--scene-threshold",
+        type=float,
+        default=config.SCENE_CUT_THRESHOLD,
+        help=(
+            "Distância entre os histogramas de cor de dois frames a partir da "
+            "qual um corte de cena é detectado; no corte, rastreamentos, "
+            "emoções em cache e o frame anterior do movimento são descartados "
+            f"(padrão: {config.SCENE_CUT_THRESHOLD}; 0 = desativado)"
+        ),
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help=(
+            "Modo adaptativo: em frames quase idênticos ao último frame analisado "
+            "por completo, reaproveitar rostos e emoções e calcular apenas o "
+            "movimento"
+        ),
+    )
+    parser.add_argument(
+        "--adaptive-threshold",
+        type=float,
+        default=config.ADAPTIVE_MOTION_THRESHOLD,
+        help=(
+            "Diferença média de cinza (0-255, no frame reduzido do movimento) "
+            "abaixo da qual o modo adaptativo considera o frame estático "
+            f"(padrão: {config.ADAPTIVE_MOTION_THRESHOLD})"
+        ),
+    )
+    parser.add_argument(
+        "--emotion-backend",
+        choices=EMOTION_BACKENDS,
+        default=config.EMOTION_BACKEND,
+        help=(
+            "Executor do classificador de emoções: deepface (TensorFlow), dnn "
+            "(pesos convertidos para ONNX executados pelo OpenCV, sem TensorFlow) "
+            "ou tflite (modelo TFLite, opcionalmente com precisão reduzida) "
+            f"(padrão: {config.EMOTION_BACKEND})"
+        ),
+    )
+    parser.add_argument(
+        "--emotion-model",
+        type=str,
+        default=None,
+        help=(
+            "Modelo convertido do classificador de emoções usado com "
+            "--emotion-backend dnn ou tflite, gerado com python -m "
+            "src.emotion_analyzer_dnn ou src.emotion_analyzer_tflite "
+            f"(padrão: {config.EMOTION_DNN_MODEL_PATH} ou "
+            f"{config.EMOTION_TFLITE_MODEL_PATH})"
+        ),
+    )
+    parser.add_argument(
+        "--emotion-refresh-every",
+        type=int,
+        default=config.EMOTION_REFRESH_EVERY_N_FRAMES,
+        help=(
+            "Reclassificar a emoção de cada rosto rastreado a cada N frames "
+            f"(padrão: {config.EMOTION_REFRESH_EVERY_N_FRAMES}; 1 = todos os frames)"
+        ),
+    )
+    parser.add_argument(
+        "--motion-engine",
+        choices=MOTION_ENGINES,
+        default=config.MOTION_ENGINE,
+        help=f"Método de análise de movimento (padrão: {config.MOTION_ENGINE})",
+    )
+    parser.add_argument(
+        "--motion-width",
+        type=int,
+        default=config.MOTION_WORKING_WIDTH,
+        help=(
+            "Largura em pixels usada na análise de movimento "
+            f"(padrão: {config.MOTION_WORKING_WIDTH}; 0 = resolução original)"
+        ),
+    )
+    parser.add_argument(
+        "--frame-stride",
+        type=int,
+        default=1,
+        help=(
+            "Analisar um a cada N frames; os demais repetem a última análise "
+            "(padrão: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--analysis-fps",
+        type=float,
+        default=None,
+        help="Número de frames analisados por segundo (substitui --frame-stride)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Executar decodificação, análise e codificação em estágios paralelos",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Número de processos que analisam trechos do vídeo em paralelo (padrão: 1)",
+    )
+    parser.add_argument(
+        "--video-workers",
+        type=int,
+        default=1,
+        help=(
+            "No modo em lote, número de processos que analisam vídeos em "
+            "paralelo; cada processo carrega os modelos uma vez (padrão: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=config.PIPELINE_QUEUE_SIZE,
+        help=(
+            "Número máximo de frames em espera entre estágios do pipeline "
+            f"(padrão: {config.PIPELINE_QUEUE_SIZE})"
+        ),
+    )
+    parser.add_argument(
+        "--encoder",
+        choices=VIDEO_ENCODERS,
+        default=config.VIDEO_ENCODER,
+        help=(
+            "Codificador do vídeo de saída: ffmpeg (processo ffmpeg local), "
+            "opencv (cv2.VideoWriter) ou auto (ffmpeg se instalado) "
+            f"(padrão: {config.VIDEO_ENCODER})"
+        ),
+    )
+    parser.add_argument(
+        "--video-codec",
+        type=str,
+        default=config.FFMPEG_CODEC,
+        help=f"Codec do ffmpeg (padrão: {config.FFMPEG_CODEC})",
+    )
+    parser.add_argument(
+        "--video-preset",
+        type=str,
+        default=config.FFMPEG_PRESET,
+        help=f"Preset de velocidade do ffmpeg (padrão: {config.FFMPEG_PRESET})",
+    )
+    parser.add_argument(
+        "--video-crf",
+        type=int,
+        default=config.FFMPEG_CRF,
+        help=(
+            "Qualidade constante (CRF) do ffmpeg; menor = melhor qualidade "
+            f"(padrão: {config.FFMPEG_CRF})"
+        ),
+    )
+    parser.add_argument(
+        "--encoder-threads",
+        type=int,
+        default=config.FFMPEG_THREADS,
+        help=(
+            "Threads de codificação do ffmpeg (0 = automático) "
+            f"(padrão: {config.FFMPEG_THREADS})"
+        ),
+    )
+
+    return parser.parse_args(argv)
+
+
+def create_encoder_settings(args):
+    """
+    Build the output video encoder settings from the command line
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        EncoderSettings
+    """
+    return EncoderSettings(
+        backend=args.encoder,
+        codec=args.video_codec,
+        preset=args.video_preset,
+        crf=args.video_crf,
+        threads=args.encoder_threads,
+    )
+
+
+def process_in_segments(
+    args,
+    video_info,
+    output_video_path,
+    frame_stride,
+    results_dir=None,
+    identities=None,
+    timer=None,
+):
+    """
+    Process the video in parallel frame ranges and merge the results
+
+    Args:
+        args: Parsed command line arguments
+        video_info: Video information from get_video_info
+        output_video_path: Path of the annotated output video (None = no video)
+        frame_stride: Analyze one frame out of every frame_stride frames
+        results_dir: Directory of the results store (None = no store)
+        identities: IdentityAggregator receiving the face tracks of every
+            segment (None = no identity clustering)
+        timer: StageTimer receiving the stage timings of every segment
+            (optional)
+
+    Returns:
+        SummaryAggregator with the merged counters of every segment
+    """
+    import os
+    import shutil
+
+    segment_dir = None
+    if output_video_path is not None:
+        segment_dir = os.path.join(args.output, "segments")
+        ensure_directory_exists(segment_dir)
+
+    logger.info(f"Processando o vídeo em {args.workers} processos paralelos...")
+    options = {
+        "detect_every_n": args.detect_every,
+        "full_scan_every_n": args.full_scan_every,
+        "scene_cut_threshold": args.scene_threshold,
+        "adaptive_threshold": adaptive_threshold(args),
+        "emotion_backend": args.emotion_backend,
+        "emotion_model_path": args.emotion_model,
+        "emotion_refresh_every_n": args.emotion_refresh_every,
+        "motion_engine": args.motion_engine,
+        "motion_working_width": args.motion_width,
+        "frame_stride": frame_stride,
+        "pipeline": args.pipeline,
+        "queue_size": args.queue_size,
+        "identify_people": identities is not None,
+        "encoder": create_encoder_settings(args),
+    }
+    segment_results_dir = None
+    if results_dir is not None:
+        segment_results_dir = os.path.join(args.output, "results_segments")
+        ensure_directory_exists(segment_results_dir)
+
+    segment_results = process_video_segments(
+        args.input,
+        video_info["total_frames"],
+        args.workers,
+        options,
+        segment_dir,
+        segment_results_dir,
+    )
+
+    aggregator = SummaryAggregator()
+    for seg in segment_results:
+        aggregator.merge(seg.aggregator)
+        if identities is not None:
+            identities.merge(seg.identities)
+        if timer is not None:
+            timer.merge(seg.timer)
+
+    if segment_dir is not None:
+        logger.info("Unindo os segmentos do vídeo de saída...")
+        concatenate_segment_videos(
+            [seg.video_path for seg in segment_results],
+            output_video_path,
+            video_info["fps"],
+            video_info["width"],
+            video_info["height"],
+            options["encoder"],
+        )
+        shutil.rmtree(segment_dir, ignore_errors=True)
+        logger.info("Vídeo de saída salvo com sucesso")
+
+    if segment_results_dir is not None:
+        merge_stores([seg.results_dir for seg in segment_results], results_dir)
+        shutil.rmtree(segment_results_dir, ignore_errors=True)
+
+    return aggregator
+
+
+def load_models(args):
+    """
+    Load the models used by the analysis, once for any number of videos
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Dictionary with face_cascade, emotion_model and embedding_model
+        (None unless --identify-people)
+    """
+    logger.info("Inicializando detector de rostos...")
+    face_cascade = initialize_detector()
+
+    logger.info("Inicializando analisador de emoções...")
+    emotion_model = load_emotion_backend(args.emotion_backend, args.emotion_model)
 
-    return parser.parse_args()
+    embedding_model = None
+    if args.identify_people:
+        logger.info("Inicializando modelo de identificação de pessoas...")
+        embedding_model = load_embedding_model()
 
+    return {
+        "face_cascade": face_cascade,
+        "emotion_model": emotion_model,
+        "embedding_model": embedding_model,
+    }
 
-def annotate_frame_with_faces(frame, faces, emotions, activity_info, frame_count):
-    for i, face in enumerate(faces):
-        bbox = face.bounding_box
-        x, y, w, h = bbox.x, bbox.y, bbox.width, bbox.height
 
-        cv2.rectangle(frame, (x, y), (x + w, y + h), config.BOX_COLOR, 2)
+def create_analysis_state(args, models=None):
+    """
+    Build the analysis state from the command line
 
-        if emotions and i < len(emotions):
-            emotion = emotions[i]
-            emotion_pt = EMOTION_PT.get(
-                emotion.emotion_label.value, emotion.emotion_label.value
+    Args:
+        args: Parsed command line arguments
+        models: Models from load_models (loaded here when not given)
+
+    Returns:
+        AnalysisState ready for the frame loop
+    """
+    if models is None:
+        models = load_models(args)
+
+    logger.info("Inicializando detector de atividades...")
+    activity_config = initialize_activity_detector(
+        args.motion_engine, args.motion_width
+    )
+
+    analysis_state = initialize_analysis_state(
+        detect_every_n=args.detect_every,
+        emotion_refresh_every_n=args.emotion_refresh_every,
+        face_cascade=models["face_cascade"],
+        emotion_model=models["emotion_model"],
+        activity_config=activity_config,
+        full_scan_every_n=args.full_scan_every,
+        scene_cut_threshold=args.scene_threshold,
+        adaptive_threshold=adaptive_threshold(args),
+    )
+
+    return analysis_state
+
+
+def checkpoint_settings_from_args(args, frame_stride):
+    """
+    Settings a resumed run must share with the run that saved the checkpoint
+
+    Every option that changes the analysis results or the layout of the
+    outputs is included; options that only affect speed are not.
+
+    Args:
+        args: Parsed command line arguments
+        frame_stride: Analyze one frame out of every frame_stride frames
+
+    Returns:
+        Dictionary saved with each checkpoint and compared on --resume
+    """
+    return {
+        "frame_stride": frame_stride,
+        "output_video": not args.no_output_video,
+        "save_results": args.save_results,
+        "identify_people": args.identify_people,
+        "detect_every": args.detect_every,
+        "full_scan_every": args.full_scan_every,
+        "scene_threshold": args.scene_threshold,
+        "adaptive_threshold": adaptive_threshold(args),
+        "emotion_backend": args.emotion_backend,
+        "emotion_model": args.emotion_model,
+        "emotion_refresh_every": args.emotion_refresh_every,
+        "motion_engine": args.motion_engine,
+        "motion_width": args.motion_width,
+        "encoder": args.encoder,
+        "video_codec": args.video_codec,
+        "video_preset": args.video_preset,
+        "video_crf": args.video_crf,
+    }
+
+
+def adaptive_threshold(args) -> float:
+    """
+    Motion threshold of the adaptive mode
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Threshold for initialize_analysis_state (0 = adaptive mode disabled)
+    """
+    return max(0.0, args.adaptive_threshold) if args.adaptive else 0.0
+
+
+def process_in_single_process(
+    args,
+    analysis_state,
+    video_capture,
+    video_info,
+    output_video_path,
+    frame_stride,
+    results_dir=None,
+    identities=None,
+    embedding_model=None,
+    checkpoint_settings=None,
+    checkpoint=None,
+    metrics=None,
+    interval=0,
+):
+    """
+    Process the whole video in this process
+
+    Args:
+        args: Parsed command line arguments
+        analysis_state: Analysis state from create_analysis_state
+        video_capture: Opened input video
+        video_info: Video information from get_video_info
+        output_video_path: Path of the annotated output video (None = no video)
+        frame_stride: Analyze one frame out of every frame_stride frames
+        results_dir: Directory of the results store (None = no store)
+        identities: IdentityAggregator receiving the face tracks (None = no
+            identity clustering)
+        embedding_model: Face embedding model used by identities
+        checkpoint_settings: Settings saved with each checkpoint, from
+            checkpoint_settings_from_args
+        checkpoint: Checkpoint to resume from (optional)
+        metrics: ProcessingMetrics exposed by the metrics endpoint (optional)
+        interval: Frames between checkpoints (0 = no checkpoints)
+
+    Returns:
+        SummaryAggregator with the counters of every frame
+    """
+    import os
+    import shutil
+    import time
+
+    run_start = time.time()
+    start_frame = checkpoint.next_frame if checkpoint is not None else 0
+
+    if checkpoint is not None:
+        analysis_state.tracker_state.next_track_id = checkpoint.next_track_id
+        if checkpoint.timer is not None:
+            analysis_state.timer = checkpoint.timer
+        seed_motion_state(video_capture, analysis_state, start_frame)
+
+    video_writer = None
+    encode = None
+    parts_dir = os.path.join(args.output, "video_parts")
+    encoder = create_encoder_settings(args)
+    if output_video_path is not None:
+        if interval:
+            # Parts closed at each checkpoint survive an interruption
+            video_writer = PartitionedVideoWriter(
+                parts_dir,
+                video_info["fps"],
+                video_info["width"],
+                video_info["height"],
+                interval,
+                checkpoint.video_parts if checkpoint is not None else None,
+                encoder,
             )
-            label = f"{emotion_pt}: {emotion.confidence:.2f}"
         else:
-            label = f"Rosto {face.face_id}"
-
-        cv2.putText(
-            frame,
-            label,
-            (x, y - 10),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            config.FONT_SCALE,
-            config.TEXT_COLOR,
-            config.FONT_THICKNESS,
+            video_writer = create_video_writer(
+                output_video_path,
+                video_info["fps"],
+                video_info["width"],
+                video_info["height"],
+                encoder,
+            )
+        # Identity clustering crops faces after encoding, from the original
+        encode = create_annotating_encoder(
+            video_writer, analysis_state.timer, in_place=identities is None
         )
 
-    if activity_info:
-        activity_pt = ACTIVITY_PT.get(activity_info, activity_info)
-        activity_text = f"Atividade: {activity_pt}"
-        cv2.putText(
-            frame,
-            activity_text,
-            (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.7,
-            (0, 255, 255),
-            2,
+    frame_pool = FramePool(
+        frame_pool_size(
+            encoder.buffer_size if video_writer is not None else 0,
+            args.queue_size if args.pipeline else None,
         )
+    )
+    frames = extract_frames(
+        video_capture,
+        start_frame=start_frame,
+        frame_stride=frame_stride,
+        decode_skipped=video_writer is not None,
+        frame_pool=frame_pool,
+    )
 
-    cv2.putText(
-        frame,
-        f"Quadro: {frame_count} | Rostos: {len(faces)}",
-        (10, 60),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        0.7,
-        (255, 255, 255),
-        2,
+    if args.pipeline:
+        logger.info(
+            f"Processando frames do vídeo em pipeline (fila: {args.queue_size})..."
+        )
+        results = run_pipelined(
+            frames,
+            analysis_state,
+            encode,
+            queue_size=args.queue_size,
+        )
+    else:
+        logger.info("Processando frames do vídeo...")
+        results = run_sequential(frames, analysis_state, encode)
+
+    results_writer = None
+    if results_dir is not None:
+        results_writer = ResultsWriter(
+            results_dir,
+            video_info,
+            os.path.basename(args.input),
+            resume_rows=checkpoint.results_rows if checkpoint is not None else None,
+        )
+
+    aggregator = (
+        checkpoint.aggregator if checkpoint is not None else SummaryAggregator()
+    )
+    meter = ThroughputMeter(
+        total_frames=video_info["total_frames"], start_frames=aggregator.total_frames
     )
+    if metrics is not None:
+        metrics.aggregator = aggregator
+        metrics.analysis_state = analysis_state
+        metrics.meter = meter
 
-    return frame
+    for result in results:
+        aggregator.update(frame_record(result))
+        if results_writer is not None:
+            results_writer.append(result)
+        if identities is not None:
+            identities.update(result, embedding_model)
+        if metrics is not None:
+            metrics.last_frame_faces = len(result.faces)
+        frame_count = aggregator.total_frames
 
+        if frame_count % config.LOG_EVERY_N_FRAMES == 0:
+            meter.update(frame_count)
+            eta = meter.eta_seconds
+            logger.info(
+                f"Processados {frame_count}/{video_info['total_frames']} frames | "
+                f"{meter.rolling_fps:.1f} frames/s (média {meter.average_fps:.1f}) | "
+                f"restante {format_timestamp(eta) if eta is not None else '--:--'} | "
+                f"{len(result.faces)} rostos neste frame"
+            )
 
-def main():
-    args = parse_arguments()
+        next_frame = result.frame.frame_number + 1
+        if interval and next_frame % interval == 0:
+            if identities is not None:
+                identities.flush(embedding_model)
+            if results_writer is not None:
+                results_writer.flush()
+            save_checkpoint(
+                args.output,
+                Checkpoint(
+                    input_path=args.input,
+                    settings=checkpoint_settings,
+                    interval=interval,
+                    next_frame=next_frame,
+                    elapsed_time=(
+                        (checkpoint.elapsed_time if checkpoint is not None else 0.0)
+                        + time.time()
+                        - run_start
+                    ),
+                    next_track_id=analysis_state.tracker_state.next_track_id,
+                    aggregator=aggregator,
+                    identities=identities,
+                    results_rows=(
+                        results_writer.row_counts()
+                        if results_writer is not None
+                        else None
+                    ),
+                    video_parts=(
+                        video_writer.wait_for_parts(next_frame // interval)
+                        if isinstance(video_writer, PartitionedVideoWriter)
+                        else []
+                    ),
+                    timer=analysis_state.timer,
+                ),
+            )
 
-    logger.info("=== Análise de Expressões Faciais ===")
-    logger.info("Iniciando processamento...")
+    if video_writer is not None:
+        video_writer.release()
+        if isinstance(video_writer, PartitionedVideoWriter):
+            logger.info("Unindo as partes do vídeo de saída...")
+            concatenate_segment_videos(
+                video_writer.completed_parts,
+                output_video_path,
+                video_info["fps"],
+                video_info["width"],
+                video_info["height"],
+                encoder,
+            )
+            shutil.rmtree(parts_dir, ignore_errors=True)
+        logger.info("Vídeo de saída salvo com sucesso")
+
+    if results_writer is not None:
+        results_writer.close()
+
+    if identities is not None:
+        identities.flush(embedding_model)
+
+    return aggregator
 
-    if not validate_file_exists(args.input):
-        logger.error(f"Erro: Arquivo de vídeo não encontrado: {args.input}")
-        logger.error(
-            "Por favor, coloque um arquivo de vídeo MP4 no caminho especificado."
-        )
-        sys.exit(1)
+
+def run_analysis(args, models=None, metrics=None):
+    """
+    Analyze one video and write its report to args.output
+
+    Args:
+        args: Parsed command line arguments (args.input is a single video)
+        models: Models from load_models, reused across videos (optional)
+        metrics: ProcessingMetrics updated with the progress of the run
+            (optional; created when --metrics-port is given)
+
+    Returns:
+        AnalysisSummary of the video
+
+    Raises:
+        FileNotFoundError: If the video does not exist
+        ValueError: If the video cannot be opened
+    """
+    import os
+    import time
 
     ensure_directory_exists(args.output)
     logger.info(f"Diretório de saída: {args.output}")
 
+    metrics_server = None
     try:
         logger.info(f"Carregando vídeo: {args.input}")
         video_capture = load_video(args.input)
@@ -148,117 +782,388 @@ def main():
         logger.info(f"  Duração: {video_info['duration']:.2f} segundos")
         logger.info("=" * 50)
 
-        logger.info("Inicializando detector de rostos...")
-        face_cascade = initialize_detector()
-
-        logger.info("Inicializando analisador de emoções...")
-        emotion_model = load_emotion_model()
-
-        logger.info("Inicializando detector de atividades...")
-        activity_config = initialize_activity_detector()
-
-        video_writer = None
+        output_video_path = None
         if not args.no_output_video:
-            import os
-
             output_video_path = os.path.join(args.output, "output_video.mp4")
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            video_writer = cv2.VideoWriter(
-                output_video_path,
-                fourcc,
-                video_info["fps"],
-                (video_info["width"], video_info["height"]),
-            )
             logger.info(f"Vídeo de saída será salvo em: {output_video_path}")
 
-        logger.info("Processando frames do vídeo...")
-        import time
+        frame_stride = compute_frame_stride(
+            video_info["fps"], args.frame_stride, args.analysis_fps
+        )
+        if frame_stride > 1:
+            logger.info(f"Analisando 1 a cada {frame_stride} frames")
 
-        start_time = time.time()
+        results_dir = None
+        if args.save_results:
+            results_dir = os.path.join(args.output, "results")
+            logger.info(f"Resultados por frame serão salvos em: {results_dir}")
 
-        frame_count = 0
-        total_faces_detected = 0
-        prev_frame_data = None
-        frames_data = []
+        identities = IdentityAggregator() if args.identify_people else None
 
-        for frame in extract_frames(video_capture):
-            frame_count += 1
+        if metrics is not None:
+            metrics.total_frames = video_info["total_frames"]
+        elif args.metrics_port is not None:
+            if args.workers > 1:
+                logger.warning(
+                    "Com --workers > 1 as métricas por frame só são atualizadas "
+                    "ao final de cada segmento"
+                )
+            metrics = ProcessingMetrics(total_frames=video_info["total_frames"])
+            metrics_server = start_metrics_server(args.metrics_port, metrics)
 
-            faces = detect_faces(frame.image_data, face_cascade)
-            total_faces_detected += len(faces)
+        checkpoint_settings = checkpoint_settings_from_args(args, frame_stride)
+        checkpoint = None
+        interval = checkpoint_interval(args.checkpoint_every, frame_stride)
 
-            emotions = []
-            if faces:
-                face_images = [face.face_image for face in faces]
-                emotions = batch_analyze_emotions(face_images, emotion_model)
+        if args.resume:
+            checkpoint = load_checkpoint(args.output, args.input, checkpoint_settings)
+            if checkpoint is None:
+                logger.info("Nenhum checkpoint encontrado, iniciando do começo")
+            else:
+                logger.info(f"Retomando a partir do frame {checkpoint.next_frame}")
+                if identities is not None:
+                    identities = checkpoint.identities
+                # The parts of the output video are cut at the checkpoint
+                # interval, so a resumed run keeps the interval it started with
+                if interval and interval != checkpoint.interval:
+                    logger.warning(
+                        f"Mantendo o intervalo de {checkpoint.interval} frames "
+                        "do checkpoint"
+                    )
+                interval = checkpoint.interval
+        if interval:
+            logger.info(f"Salvando checkpoint a cada {interval} frames")
 
-            avg_face_area = (
-                sum(f.bounding_box.width * f.bounding_box.height for f in faces)
-                / len(faces)
-                if faces
-                else 0.0
-            )
-            motion_analysis = analyze_motion(
-                prev_frame_data,
-                frame.image_data,
-                num_faces=len(faces),
-                avg_face_area=avg_face_area,
-                detector_config=activity_config,
-            )
-            activity_info = motion_analysis.activity_type.value
-
-            frames_data.append(
-                {
-                    "frame_number": frame_count,
-                    "num_faces": len(faces),
-                    "emotions": emotions,
-                    "activity": activity_info,
-                }
-            )
+        if args.workers > 1:
+            video_capture.release()
 
-            annotated_frame = annotate_frame_with_faces(
-                frame.image_data.copy(), faces, emotions, activity_info, frame_count
+            timer = StageTimer()
+            start_time = time.time()
+            aggregator = process_in_segments(
+                args,
+                video_info,
+                output_video_path,
+                frame_stride,
+                results_dir,
+                identities,
+                timer,
             )
+            if metrics is not None:
+                metrics.aggregator = aggregator
+        else:
+            if models is None:
+                models = load_models(args)
+            analysis_state = create_analysis_state(args, models)
+            embedding_model = models["embedding_model"]
 
-            prev_frame_data = frame.image_data.copy()
-
-            if video_writer is not None:
-                video_writer.write(annotated_frame)
-
-            if frame_count % config.LOG_EVERY_N_FRAMES == 0:
-                logger.info(
-                    f"Processados {frame_count} frames, {len(faces)} rostos detectados neste frame"
-                )
+            start_time = time.time()
+            aggregator = process_in_single_process(
+                args,
+                analysis_state,
+                video_capture,
+                video_info,
+                output_video_path,
+                frame_stride,
+                results_dir,
+                identities,
+                embedding_model,
+                checkpoint_settings,
+                checkpoint,
+                metrics,
+                interval,
+            )
+            timer = analysis_state.timer
 
-        if video_writer is not None:
-            video_writer.release()
-            logger.info("Vídeo de saída salvo com sucesso")
+        people = []
+        if identities is not None:
+            logger.info("Agrupando rostos por pessoa...")
+            people = identities.assign_people()
 
         processing_time = time.time() - start_time
+        if checkpoint is not None:
+            processing_time += checkpoint.elapsed_time
 
-        logger.info("Gerando relatório resumido...")
-        import os
+        if results_dir is not None:
+            set_processing_time(results_dir, processing_time)
 
-        summary = create_summary(
+        logger.info("Gerando relatório resumido...")
+        summary = aggregator.finalize(
             video_filename=os.path.basename(args.input),
-            total_frames=frame_count,
             duration=video_info["duration"],
             fps=video_info["fps"],
-            frames_data=frames_data,
             processing_time=processing_time,
         )
+        summary.people = people
+        summary.performance = timer.summary(processing_time)
 
         report_path = os.path.join(args.output, "relatorio.txt")
         generate_text_report(summary, report_path)
+        save_performance_sidecar(
+            summary, os.path.join(args.output, "relatorio_desempenho.json")
+        )
+        remove_checkpoint(args.output)
 
         logger.info("=" * 50)
         logger.info("PROCESSAMENTO CONCLUÍDO!")
-        logger.info(f"Total de frames processados: {frame_count}")
-        logger.info(f"Total de rostos detectados: {total_faces_detected}")
+        logger.info(f"Total de frames processados: {aggregator.total_frames}")
+        logger.info(f"Total de rostos detectados: {aggregator.total_faces}")
+        if identities is not None:
+            logger.info(f"Pessoas identificadas: {len(people)}")
         logger.info(f"Tempo de processamento: {processing_time:.1f}s")
         logger.info(f"Relatório salvo em: {report_path}")
         logger.info("=" * 50)
 
+        return summary
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+
+
+def find_input_videos(input_path):
+    """
+    Resolve --input into the list of videos to process
+
+    Args:
+        input_path: A video file, a directory or a glob pattern
+
+    Returns:
+        Sorted list of video paths (empty when nothing matches)
+    """
+    import os
+    import glob
+
+    if os.path.isfile(input_path):
+        return [input_path]
+
+    if os.path.isdir(input_path):
+        candidates = [os.path.join(input_path, name) for name in os.listdir(input_path)]
+    else:
+        candidates = glob.glob(input_path, recursive=True)
+
+    return sorted(
+        path
+        for path in candidates
+        if os.path.isfile(path)
+        and os.path.splitext(path)[1].lower() in config.VIDEO_EXTENSIONS
+    )
+
+
+def batch_output_dirs(videos, output_dir):
+    """
+    Give every video its own output directory, named after the file
+
+    Args:
+        videos: Video paths
+        output_dir: Base output directory
+
+    Returns:
+        Output directory of each video (names are made unique)
+    """
+    import os
+
+    used = set()
+    dirs = []
+    for video in videos:
+        stem = os.path.splitext(os.path.basename(video))[0]
+        name, suffix = stem, 2
+        while name in used:
+            name = f"{stem}_{suffix}"
+            suffix += 1
+        used.add(name)
+        dirs.append(os.path.join(output_dir, name))
+    return dirs
+
+
+# Models of a batch worker process, loaded once by _init_batch_worker
+_worker_models = None
+
+
+def _init_batch_worker(args):
+    """Load the models once in a batch worker process"""
+    global _worker_models
+    _worker_models = load_models(args)
+
+
+def analyze_batch_video(args, video_path, output_dir, models=None):
+    """
+    Analyze one video of a batch and describe the outcome for the index
+
+    Args:
+        args: Parsed command line arguments
+        video_path: Video to analyze
+        output_dir: Output directory of this video
+        models: Models from load_models (default: the worker's models)
+
+    Returns:
+        Index entry of the video
+    """
+    import os
+
+    video_args = argparse.Namespace(
+        **{**vars(args), "input": video_path, "output": output_dir}
+    )
+    entry = {
+        "video": video_path,
+        "output_dir": output_dir,
+        "status": "ok",
+    }
+
+    try:
+        summary = run_analysis(video_args, models or _worker_models)
+    except Exception as e:
+        logger.error(f"Erro ao processar {video_path}: {e}")
+        entry.update(status="error", error=str(e))
+        return entry
+
+    entry.update(
+        report=os.path.join(output_dir, "relatorio.txt"),
+        total_frames=summary.total_frames,
+        duration=summary.duration,
+        total_faces=summary.total_faces_detected,
+        emotion_distribution=summary.emotion_distribution,
+        activity_distribution=summary.activity_distribution,
+        processing_time=summary.processing_time,
+    )
+    return entry
+
+
+def write_batch_index(entries, output_dir, processing_time):
+    """
+    Write the consolidated index of a batch run
+
+    Args:
+        entries: Index entries from analyze_batch_video, in input order
+        output_dir: Base output directory
+        processing_time: Wall-clock time of the whole batch in seconds
+
+    Returns:
+        Path of the index file
+    """
+    import os
+    import json
+    from collections import Counter
+
+    succeeded = [entry for entry in entries if entry["status"] == "ok"]
+    emotions = Counter()
+    activities = Counter()
+    for entry in succeeded:
+        emotions.update(entry["emotion_distribution"])
+        activities.update(entry["activity_distribution"])
+
+    index = {
+        "videos": len(entries),
+        "succeeded": len(succeeded),
+        "failed": len(entries) - len(succeeded),
+        "total_frames": sum(entry["total_frames"] for entry in succeeded),
+        "total_faces": sum(entry["total_faces"] for entry in succeeded),
+        "emotion_distribution": dict(emotions),
+        "activity_distribution": dict(activities),
+        "processing_time": processing_time,
+        "entries": entries,
+    }
+
+    index_path = os.path.join(output_dir, "indice.json")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    return index_path
+
+
+def process_batch(args, videos):
+    """
+    Process several videos in one invocation, loading the models once per
+    worker process
+
+    Args:
+        args: Parsed command line arguments
+        videos: Videos to process
+
+    Returns:
+        Exit code (1 if any video failed)
+    """
+    import time
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    ensure_directory_exists(args.output)
+    output_dirs = batch_output_dirs(videos, args.output)
+    video_workers = max(1, min(args.video_workers, len(videos)))
+
+    logger.info(
+        f"Modo em lote: {len(videos)} vídeos, {video_workers} processo(s) de análise"
+    )
+    if video_workers > 1 and args.workers > 1:
+        logger.warning("--workers é ignorado quando --video-workers > 1")
+        args.workers = 1
+    if video_workers > 1 and args.metrics_port is not None:
+        logger.warning("--metrics-port é ignorado quando --video-workers > 1")
+        args.metrics_port = None
+
+    start_time = time.time()
+
+    if video_workers == 1:
+        models = load_models(args) if args.workers <= 1 else None
+        entries = [
+            analyze_batch_video(args, video, output_dir, models)
+            for video, output_dir in zip(videos, output_dirs)
+        ]
+    else:
+        # TensorFlow is not fork-safe, so workers start from a fresh interpreter
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=video_workers,
+            mp_context=context,
+            initializer=_init_batch_worker,
+            initargs=(args,),
+        ) as executor:
+            futures = [
+                executor.submit(analyze_batch_video, args, video, output_dir)
+                for video, output_dir in zip(videos, output_dirs)
+            ]
+            entries = [future.result() for future in futures]
+
+    processing_time = time.time() - start_time
+    index_path = write_batch_index(entries, args.output, processing_time)
+    failed = sum(1 for entry in entries if entry["status"] != "ok")
+
+    logger.info("=" * 50)
+    logger.info("LOTE CONCLUÍDO!")
+    logger.info(f"Vídeos processados: {len(entries) - failed} de {len(entries)}")
+    logger.info(f"Tempo total: {processing_time:.1f}s")
+    logger.info(f"Índice salvo em: {index_path}")
+    logger.info("=" * 50)
+
+    return 1 if failed else 0
+
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        from src.service import serve
+
+        return serve(sys.argv[2:])
+
+    args = parse_arguments()
+
+    logger.info("=== Análise de Expressões Faciais ===")
+    logger.info("Iniciando processamento...")
+
+    if (args.checkpoint_every > 0 or args.resume) and args.workers > 1:
+        logger.error("Checkpoints e --resume não são suportados com --workers > 1")
+        return 1
+
+    videos = find_input_videos(str(args.input))
+    if not videos:
+        logger.error(f"Erro: Arquivo de vídeo não encontrado: {args.input}")
+        logger.error(
+            "Por favor, coloque um arquivo de vídeo MP4 no caminho especificado."
+        )
+        sys.exit(1)
+
+    if not validate_file_exists(str(args.input)):
+        return process_batch(args, videos)
+
+    try:
+        run_analysis(args)
         return 0
 
     except FileNotFoundError as e:
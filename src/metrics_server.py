@@ -0,0 +1,225 @@
+"""
+Prometheus-style metrics endpoint
+
+A stdlib HTTP server on a daemon thread renders the current processing
+counters in the Prometheus text exposition format on every GET /metrics.
+The frame loop only keeps references to objects it already updates, so
+serving metrics adds no work per frame; all formatting happens on scrape.
+"""
+
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from src import config
+from src.utils import get_logger
+from src.performance import ThroughputMeter
+from src.summary_generator import SummaryAggregator
+
+logger = get_logger(__name__)
+
+METRIC_PREFIX = "video_analysis"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class ProcessingMetrics:
+    """Live references to the state of the running analysis"""
+
+    total_frames: int = 0
+    aggregator: Optional[SummaryAggregator] = None
+    analysis_state: Optional[object] = None
+    meter: Optional[ThroughputMeter] = None
+    last_frame_faces: int = 0
+
+
+def process_rss_bytes() -> int:
+    """
+    Resident set size of this process
+
+    Returns:
+        Current RSS in bytes on Linux, peak RSS elsewhere (0 if unknown)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def render_metrics(metrics: ProcessingMetrics) -> str:
+    """
+    Render the metrics in the Prometheus text exposition format
+
+    Args:
+        metrics: Live processing references
+
+    Returns:
+        Exposition text
+    """
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[Tuple]) -> None:
+        # samples are (labels, value) or (labels, value, name suffix)
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for sample in samples:
+            labels, value = sample[0], sample[1]
+            suffix = sample[2] if len(sample) > 2 else ""
+            label_text = _format_labels(labels)
+            lines.append(f"{full_name}{suffix}{label_text} {value}")
+
+    aggregator = metrics.aggregator
+    frames = aggregator.total_frames if aggregator is not None else 0
+    faces = aggregator.total_faces if aggregator is not None else 0
+
+    metric(
+        "frames_total",
+        "gauge",
+        "Number of frames in the input video",
+        [({}, metrics.total_frames)],
+    )
+    metric(
+        "frames_processed_total",
+        "counter",
+        "Frames processed so far",
+        [({}, frames)],
+    )
+    metric("faces_total", "counter", "Faces detected so far", [({}, faces)])
+    metric(
+        "faces_per_frame",
+        "gauge",
+        "Faces in the last processed frame",
+        [({}, metrics.last_frame_faces)],
+    )
+    metric(
+        "faces_per_frame_average",
+        "gauge",
+        "Average number of faces per processed frame",
+        [({}, faces / frames if frames else 0.0)],
+    )
+
+    meter = metrics.meter
+    if meter is not None:
+        metric(
+            "fps_current",
+            "gauge",
+            "Frames per second over the last seconds",
+            [({}, round(meter.rolling_fps, 3))],
+        )
+        metric(
+            "fps_average",
+            "gauge",
+            "Frames per second since the start of the run",
+            [({}, round(meter.average_fps, 3))],
+        )
+        eta = meter.eta_seconds
+        if eta is not None:
+            metric(
+                "eta_seconds",
+                "gauge",
+                "Estimated remaining processing time",
+                [({}, round(eta, 1))],
+            )
+
+    state = metrics.analysis_state
+    if state is not None:
+        timer = state.timer
+        samples = []
+        for stage, count in list(timer.counts.items()):
+            for q in QUANTILES:
+                samples.append(
+                    (
+                        {"stage": stage, "quantile": q},
+                        timer.percentile(stage, q * 100) / 1000.0,
+                    )
+                )
+            samples.append(({"stage": stage}, timer.totals[stage], "_sum"))
+            samples.append(({"stage": stage}, count, "_count"))
+        metric(
+            "stage_latency_seconds",
+            "summary",
+            "Latency of each stage of the frame loop",
+            samples,
+        )
+
+        metric(
+            "queue_depth",
+            "gauge",
+            "Frames waiting in each pipeline queue",
+            [
+                ({"queue": name}, stage_queue.qsize())
+                for name, stage_queue in list(state.stage_queues.items())
+            ],
+        )
+
+    metric(
+        "process_resident_memory_bytes",
+        "gauge",
+        "Resident memory of the analysis process",
+        [({}, process_rss_bytes())],
+    )
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Dict) -> str:
+    """Format labels as {name="value",...} (empty string without labels)"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def start_metrics_server(
+    port: int, metrics: ProcessingMetrics, host: str = config.METRICS_HOST
+) -> ThreadingHTTPServer:
+    """
+    Serve the metrics on http://host:port/metrics from a daemon thread
+
+    Args:
+        port: TCP port (0 = any free port)
+        metrics: Live processing references rendered on each request
+        host: Interface to bind
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics(metrics).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes are frequent; keep them out of the analysis log
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    logger.info(
+        f"Metrics available at http://{host}:{server.server_address[1]}/metrics"
+    )
+    return server
@@ -0,0 +1,220 @@
+"""
+Per-stage latency instrumentation
+
+Durations of each stage of the frame loop are collected in fixed
+log-spaced histograms, so memory does not grow with the number of frames
+and timers of different worker processes can be merged. Percentiles are
+read back from the histograms.
+"""
+
+import time
+import numpy as np
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+# Stages of the frame loop, in processing order
+STAGES = (
+    "decode",
+    "scene_detection",
+    "motion_gate",
+    "face_detection",
+    "emotion",
+    "motion",
+    "annotation",
+    "encode",
+)
+
+# 20 buckets per decade between 1 µs and 100 s (about 12% resolution)
+HISTOGRAM_EDGES_MS = np.logspace(-3, 5, 161)
+
+
+def _empty_histogram() -> np.ndarray:
+    return np.zeros(len(HISTOGRAM_EDGES_MS) + 1, dtype=np.int64)
+
+
+@dataclass
+class StageTimer:
+    """
+    Collects a latency histogram and total time per stage
+
+    Each stage must be recorded from a single thread (in the pipelined mode
+    decode, analysis and encoding stages each run on their own thread).
+    """
+
+    histograms: Dict[str, np.ndarray] = field(default_factory=dict)
+    totals: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Add one duration to a stage
+
+        Args:
+            stage: Name of the stage
+            seconds: Duration in seconds
+        """
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = _empty_histogram()
+            self.totals[stage] = 0.0
+            self.counts[stage] = 0
+
+        histogram[np.searchsorted(HISTOGRAM_EDGES_MS, seconds * 1000.0)] += 1
+        self.totals[stage] += seconds
+        self.counts[stage] += 1
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Time the body of a with block as one duration of the stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def merge(self, other: "StageTimer") -> None:
+        """
+        Add the durations of another timer (e.g. of another segment)
+
+        Args:
+            other: Timer to merge into this one
+        """
+        for stage, histogram in other.histograms.items():
+            if stage not in self.histograms:
+                self.histograms[stage] = _empty_histogram()
+                self.totals[stage] = 0.0
+                self.counts[stage] = 0
+            self.histograms[stage] += histogram
+            self.totals[stage] += other.totals[stage]
+            self.counts[stage] += other.counts[stage]
+
+    def percentile(self, stage: str, q: float) -> float:
+        """
+        Estimate a latency percentile of a stage from its histogram
+
+        Args:
+            stage: Name of the stage
+            q: Percentile between 0 and 100
+
+        Returns:
+            Latency in milliseconds (0.0 when the stage has no durations)
+        """
+        histogram = self.histograms.get(stage)
+        if histogram is None or self.counts[stage] == 0:
+            return 0.0
+
+        cumulative = np.cumsum(histogram)
+        rank = q / 100.0 * cumulative[-1]
+        bucket = int(np.searchsorted(cumulative, max(rank, 1)))
+
+        # Geometric midpoint of the bucket (edges clamp the open-ended ones)
+        low = HISTOGRAM_EDGES_MS[max(bucket - 1, 0)]
+        high = HISTOGRAM_EDGES_MS[min(bucket, len(HISTOGRAM_EDGES_MS) - 1)]
+        return float(np.sqrt(low * high))
+
+    def summary(self, wall_time: float) -> Dict[str, Dict[str, float]]:
+        """
+        Build the statistics of every recorded stage
+
+        Args:
+            wall_time: Wall-clock processing time the shares refer to (with
+                worker processes the totals add up across processes, so the
+                shares can exceed 1)
+
+        Returns:
+            Dictionary stage -> count, total_s, mean_ms, p50_ms, p95_ms,
+            p99_ms and share (fraction of wall_time), in STAGES order
+        """
+        ordered = [s for s in STAGES if s in self.counts]
+        ordered += [s for s in self.counts if s not in STAGES]
+
+        stats = {}
+        for stage in ordered:
+            count = self.counts[stage]
+            total = self.totals[stage]
+            stats[stage] = {
+                "count": count,
+                "total_s": total,
+                "mean_ms": total / count * 1000.0 if count else 0.0,
+                "p50_ms": self.percentile(stage, 50),
+                "p95_ms": self.percentile(stage, 95),
+                "p99_ms": self.percentile(stage, 99),
+                "share": total / wall_time if wall_time > 0 else 0.0,
+            }
+        return stats
+
+
+def timed_iterator(items: Iterator, timer: StageTimer, stage: str) -> Iterator:
+    """
+    Yield the items of an iterator, timing how long each one takes to produce
+
+    Args:
+        items: Iterator to wrap (e.g. extract_frames)
+        timer: Timer receiving the durations
+        stage: Name of the stage
+
+    Yields:
+        The items of the wrapped iterator
+    """
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        timer.record(stage, time.perf_counter() - start)
+        yield item
+
+
+@dataclass
+class ThroughputMeter:
+    """
+    Tracks average and rolling frames per second and the remaining time
+
+    The rolling rate covers the last window_seconds, so it follows
+    slowdowns that the average over the whole run would hide.
+    """
+
+    total_frames: int
+    window_seconds: float = 10.0
+    start_time: float = field(default_factory=time.perf_counter)
+    start_frames: int = 0
+    samples: Deque[Tuple[float, int]] = field(default_factory=deque)
+
+    def update(self, frames_done: int) -> None:
+        """
+        Record the number of frames processed so far
+
+        Args:
+            frames_done: Frames processed since the start of the run
+        """
+        now = time.perf_counter()
+        self.samples.append((now, frames_done))
+        while len(self.samples) > 2 and now - self.samples[1][0] > self.window_seconds:
+            self.samples.popleft()
+
+    @property
+    def average_fps(self) -> float:
+        if not self.samples:
+            return 0.0
+        now, frames_done = self.samples[-1]
+        elapsed = now - self.start_time
+        return (frames_done - self.start_frames) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def rolling_fps(self) -> float:
+        if len(self.samples) < 2:
+            return self.average_fps
+        (t0, f0), (t1, f1) = self.samples[0], self.samples[-1]
+        return (f1 - f0) / (t1 - t0) if t1 > t0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated remaining time at the rolling rate (None = unknown)"""
+        fps = self.rolling_fps
+        if not self.samples or fps <= 0 or self.total_frames <= 0:
+            return None
+        return max(0.0, (self.total_frames - self.samples[-1][1]) / fps)
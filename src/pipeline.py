@@ -0,0 +1,610 @@
+"""
+Frame analysis pipeline
+
+Runs face tracking, emotion and motion analysis on each frame, either
+sequentially or as decode / analyze / encode stages connected by bounded
+queues.
+"""
+
+import queue
+import threading
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src import config
+from src.utils import get_logger
+from src.video_processor import VideoFrame
+from src.face_detector import (
+    FaceRegion,
+    FaceTrackerState,
+    initialize_detector,
+    initialize_face_tracker,
+    reset_face_tracker,
+    track_faces,
+)
+from src.emotion_analyzer_deepface import EmotionClassification, load_emotion_model
+from src.emotion_analyzer_dnn import load_dnn_emotion_model
+from src.emotion_analyzer_tflite import load_tflite_emotion_model
+from src.emotion_cache import (
+    EmotionCache,
+    initialize_emotion_cache,
+    analyze_tracked_emotions,
+    clear_emotion_cache,
+)
+from src.activity_detector import (
+    MotionAnalysis,
+    initialize_activity_detector,
+    prepare_motion_frame,
+    analyze_motion,
+)
+from src.scene_detector import (
+    SceneDetectorState,
+    initialize_scene_detector,
+    seed_scene_detector,
+    detect_scene_cut,
+)
+from src.annotation import annotate_frame_with_faces
+from src.performance import StageTimer, timed_iterator
+
+logger = get_logger(__name__)
+
+_END_OF_STREAM = object()
+
+
+@dataclass
+class MotionGateState:
+    """
+    Decides when a frame is static enough to reuse the last faces and emotions
+
+    Frames are compared with the motion plane of the last fully analyzed
+    frame, not with the previous frame, so slow drift still adds up to a
+    full analysis.
+    """
+
+    threshold: float
+    max_reuse_frames: int
+    reference_plane: Optional[np.ndarray] = None
+    reference_frame_number: Optional[int] = None
+    reused_frames: int = 0
+
+
+@dataclass
+class AnalysisState:
+    """Models and cross-frame state used by the analysis stage"""
+
+    face_cascade: cv2.CascadeClassifier
+    tracker_state: FaceTrackerState
+    emotion_model: object
+    emotion_cache: EmotionCache
+    activity_config: Dict
+    scene_state: Optional[SceneDetectorState] = None
+    motion_gate: Optional[MotionGateState] = None
+    prev_motion_plane: Optional[np.ndarray] = None
+    prev_motion_frame_number: Optional[int] = None
+    last_result: Optional["FrameAnalysis"] = None
+    timer: StageTimer = field(default_factory=StageTimer)
+    stage_queues: Dict[str, queue.Queue] = field(default_factory=dict)
+
+
+@dataclass
+class FrameAnalysis:
+    """Represents the analysis result of a single frame"""
+
+    frame: VideoFrame
+    faces: List[FaceRegion]
+    emotions: List[EmotionClassification]
+    motion: MotionAnalysis
+    carried_forward: bool = False
+    scene_cut: bool = False
+    faces_reused: bool = False
+
+    @property
+    def activity(self) -> str:
+        """Activity label of the frame"""
+        return self.motion.activity_type.value
+
+
+EMOTION_BACKENDS = ("deepface", "dnn", "tflite")
+
+
+def load_emotion_backend(
+    backend: str = config.EMOTION_BACKEND, model_path: Optional[str] = None
+) -> object:
+    """
+    Load the emotion classifier of a backend
+
+    All backends run the same network and return scores in the same order,
+    so the rest of the pipeline does not depend on the choice.
+
+    Args:
+        backend: 'deepface' (Keras model through DeepFace and TensorFlow),
+            'dnn' (converted weights through cv2.dnn, no TensorFlow) or
+            'tflite' (converted, possibly reduced-precision model through
+            the TFLite interpreter)
+        model_path: Converted model of the 'dnn' and 'tflite' backends
+            (None = the backend's default path)
+
+    Returns:
+        Emotion model with a predict() method, for batch_analyze_emotions
+
+    Raises:
+        ValueError: If the backend is unknown
+        EmotionAnalysisError: If the model cannot be loaded
+    """
+    if backend == "deepface":
+        return load_emotion_model()
+    if backend == "dnn":
+        return load_dnn_emotion_model(model_path or config.EMOTION_DNN_MODEL_PATH)
+    if backend == "tflite":
+        return load_tflite_emotion_model(model_path or config.EMOTION_TFLITE_MODEL_PATH)
+    raise ValueError(
+        f"Unknown emotion backend '{backend}', expected one of {EMOTION_BACKENDS}"
+    )
+
+
+def initialize_analysis_state(
+    detect_every_n: int = config.FACE_DETECT_EVERY_N_FRAMES,
+    emotion_refresh_every_n: int = config.EMOTION_REFRESH_EVERY_N_FRAMES,
+    face_cascade: Optional[cv2.CascadeClassifier] = None,
+    emotion_model: object = None,
+    activity_config: Optional[Dict] = None,
+    first_track_id: int = 0,
+    motion_engine: str = config.MOTION_ENGINE,
+    motion_working_width: Optional[int] = config.MOTION_WORKING_WIDTH,
+    full_scan_every_n: int = config.FACE_FULL_SCAN_EVERY_N_FRAMES,
+    scene_cut_threshold: float = config.SCENE_CUT_THRESHOLD,
+    adaptive_threshold: float = 0.0,
+    emotion_backend: str = config.EMOTION_BACKEND,
+    emotion_model_path: Optional[str] = None,
+) -> AnalysisState:
+    """
+    Initialize the analysis state, loading any model that is not provided
+
+    Args:
+        detect_every_n: Run the face detector every N frames
+        emotion_refresh_every_n: Re-classify each face track every N frames
+        face_cascade: Already initialized face detector (optional)
+        emotion_model: Already loaded emotion model (optional)
+        activity_config: Already initialized activity detector (optional)
+        first_track_id: First face track ID to hand out
+        motion_engine: Motion engine used when activity_config is not provided
+        motion_working_width: Motion working width used when activity_config
+            is not provided
+        full_scan_every_n: Scan the whole frame for faces at least every N
+            frames, searching only around known faces in between
+        scene_cut_threshold: Histogram distance that marks a scene cut
+            (0 = scene-cut detection disabled)
+        adaptive_threshold: Mean gray-level difference below which a frame
+            reuses the faces and emotions of the last analyzed frame
+            (0 = every analyzed frame runs face and emotion analysis)
+        emotion_backend: Emotion backend used when emotion_model is not
+            provided
+        emotion_model_path: Converted model of the 'dnn' and 'tflite'
+            emotion backends (None = the backend's default path)
+
+    Returns:
+        AnalysisState ready for analyze_frame
+    """
+    if face_cascade is None:
+        face_cascade = initialize_detector()
+    if emotion_model is None:
+        emotion_model = load_emotion_backend(emotion_backend, emotion_model_path)
+    if activity_config is None:
+        activity_config = initialize_activity_detector(
+            motion_engine, motion_working_width
+        )
+
+    return AnalysisState(
+        face_cascade=face_cascade,
+        tracker_state=initialize_face_tracker(
+            detect_every_n, first_track_id, full_scan_every_n
+        ),
+        emotion_model=emotion_model,
+        emotion_cache=initialize_emotion_cache(emotion_refresh_every_n),
+        activity_config=activity_config,
+        scene_state=(
+            initialize_scene_detector(scene_cut_threshold)
+            if scene_cut_threshold > 0
+            else None
+        ),
+        motion_gate=(
+            MotionGateState(
+                threshold=adaptive_threshold,
+                max_reuse_frames=config.ADAPTIVE_MAX_REUSE_FRAMES,
+            )
+            if adaptive_threshold > 0
+            else None
+        ),
+    )
+
+
+def seed_motion_state(
+    video_capture: cv2.VideoCapture, state: AnalysisState, start_frame: int
+) -> None:
+    """
+    Use the frame before start_frame as the previous motion frame
+
+    The frame is decoded only as the previous frame of the optical-flow pair
+    and of the scene-cut comparison, so analysis starting mid-video gets the
+    same result for its first frame as a run from the beginning.
+
+    Args:
+        video_capture: Opened input video (left positioned after the frame)
+        state: Analysis state, updated in place
+        start_frame: First frame that will be analyzed
+    """
+    if start_frame <= 0:
+        return
+
+    video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame - 1)
+    ret, image = video_capture.read()
+    if ret:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        state.prev_motion_plane, _ = prepare_motion_frame(gray, state.activity_config)
+        state.prev_motion_frame_number = start_frame - 1
+        if state.scene_state is not None:
+            seed_scene_detector(image, state.scene_state)
+
+
+def analyze_frame(frame: VideoFrame, state: AnalysisState) -> FrameAnalysis:
+    """
+    Run face tracking, emotion and motion analysis on a frame
+
+    Frames not marked as analyzed reuse the result of the last analyzed
+    frame, so every frame of the timeline still gets a result. With the
+    motion gate, analyzed frames that barely differ from the last fully
+    analyzed one reuse its faces and emotions and only run motion analysis.
+
+    Args:
+        frame: Frame to analyze
+        state: Analysis state, updated in place
+
+    Returns:
+        FrameAnalysis for the frame
+    """
+    if not frame.analyzed and state.last_result is not None:
+        last = state.last_result
+        return FrameAnalysis(
+            frame=frame,
+            faces=last.faces,
+            emotions=last.emotions,
+            motion=last.motion,
+            carried_forward=True,
+        )
+
+    timer = state.timer
+
+    scene_cut = False
+    if state.scene_state is not None:
+        with timer.measure("scene_detection"):
+            scene_cut = detect_scene_cut(
+                frame.image_data, frame.frame_number, state.scene_state
+            )
+        if scene_cut:
+            start_new_shot(state)
+
+    motion_plane = None
+    faces_reused = False
+    if state.motion_gate is not None and state.last_result is not None:
+        with timer.measure("motion_gate"):
+            motion_plane, _ = prepare_motion_frame(frame.gray, state.activity_config)
+            faces_reused = is_static_frame(
+                state.motion_gate, motion_plane, frame.frame_number
+            )
+
+    if faces_reused:
+        faces = state.last_result.faces
+        emotions = state.last_result.emotions
+        state.motion_gate.reused_frames += 1
+    else:
+        with timer.measure("face_detection"):
+            faces = track_faces(
+                frame.image_data,
+                state.face_cascade,
+                state.tracker_state,
+                gray=frame.gray,
+            )
+
+        with timer.measure("emotion"):
+            emotions = analyze_tracked_emotions(
+                faces, frame.frame_number, state.emotion_cache, state.emotion_model
+            )
+
+    avg_face_area = (
+        sum(f.bounding_box.width * f.bounding_box.height for f in faces) / len(faces)
+        if faces
+        else 0.0
+    )
+    with timer.measure("motion"):
+        if motion_plane is None:
+            motion_plane, _ = prepare_motion_frame(frame.gray, state.activity_config)
+        motion = analyze_motion(
+            state.prev_motion_plane,
+            motion_plane,
+            num_faces=len(faces),
+            avg_face_area=avg_face_area,
+            detector_config=state.activity_config,
+            frame_width=frame.width,
+            frame_gap=(
+                frame.frame_number - state.prev_motion_frame_number
+                if state.prev_motion_frame_number is not None
+                else 1
+            ),
+        )
+
+    # Only the (downscaled) gray plane is kept for the next optical-flow pair
+    state.prev_motion_plane = motion_plane
+    state.prev_motion_frame_number = frame.frame_number
+
+    if state.motion_gate is not None and not faces_reused:
+        state.motion_gate.reference_plane = motion_plane
+        state.motion_gate.reference_frame_number = frame.frame_number
+
+    result = FrameAnalysis(
+        frame=frame,
+        faces=faces,
+        emotions=emotions,
+        motion=motion,
+        scene_cut=scene_cut,
+        faces_reused=faces_reused,
+    )
+    state.last_result = result
+    return result
+
+
+def start_new_shot(state: AnalysisState) -> None:
+    """
+    Drop the state carried over from the previous shot
+
+    Face tracks and cached emotions refer to faces of the previous shot, and
+    optical flow across a cut measures the cut, not movement. The first
+    frame of the shot gets a full-frame face detection and no motion.
+
+    Args:
+        state: Analysis state, updated in place
+    """
+    reset_face_tracker(state.tracker_state)
+    clear_emotion_cache(state.emotion_cache)
+    state.prev_motion_plane = None
+    state.prev_motion_frame_number = None
+    if state.motion_gate is not None:
+        state.motion_gate.reference_plane = None
+        state.motion_gate.reference_frame_number = None
+
+
+def is_static_frame(
+    gate: MotionGateState, motion_plane: np.ndarray, frame_number: int
+) -> bool:
+    """
+    Check whether a frame may reuse the faces and emotions of the last
+    fully analyzed frame
+
+    Args:
+        gate: Motion gate state
+        motion_plane: Downscaled gray plane of the frame (prepare_motion_frame)
+        frame_number: Index of the frame
+
+    Returns:
+        True if the mean absolute difference to the reference plane is below
+        the threshold and the reference is recent enough
+    """
+    reference = gate.reference_plane
+    if reference is None or reference.shape != motion_plane.shape:
+        return False
+    if frame_number - gate.reference_frame_number >= gate.max_reuse_frames:
+        return False
+    return float(cv2.absdiff(reference, motion_plane).mean()) < gate.threshold
+
+
+def frame_record(result: FrameAnalysis) -> Dict:
+    """
+    Build the per-frame dictionary used by the summary generator
+
+    Args:
+        result: Analysis result of a frame
+
+    Returns:
+        Dictionary with frame number, faces, emotions and activity
+    """
+    return {
+        "frame_number": result.frame.frame_number + 1,
+        "num_faces": len(result.faces),
+        "face_ids": [face.face_id for face in result.faces],
+        "emotions": result.emotions,
+        "activity": result.activity,
+        "scene_cut": result.scene_cut,
+        "faces_reused": result.faces_reused,
+    }
+
+
+def frame_pool_size(writer_buffer_size: int, queue_size: Optional[int] = None) -> int:
+    """
+    Number of frame buffers needed so no buffer is reused while in flight
+
+    Args:
+        writer_buffer_size: Frames the video writer can hold (0 = no
+            buffered writer)
+        queue_size: Size of the pipeline queues (None = sequential mode)
+
+    Returns:
+        Size of the FramePool ring
+    """
+    # The frame being decoded, analyzed and written, plus one spare
+    in_flight = writer_buffer_size + 3
+    if queue_size is not None:
+        # Both pipeline queues, and the frames held by the decode and
+        # encode threads while they wait on a full queue
+        in_flight += 2 * queue_size + 2
+    return in_flight
+
+
+def create_annotating_encoder(
+    video_writer: cv2.VideoWriter,
+    timer: Optional[StageTimer] = None,
+    in_place: bool = False,
+) -> Callable[[FrameAnalysis], None]:
+    """
+    Build an encode callback that annotates each result and writes it
+
+    Args:
+        video_writer: Writer of the annotated output video
+        timer: Timer receiving the annotation and encode durations (optional)
+        in_place: Draw on the decoded frame itself instead of a copy; only
+            safe when nothing reads the original pixels after encoding
+            (e.g. identity clustering crops faces from them)
+
+    Returns:
+        Callback to pass as encode to run_sequential or run_pipelined
+    """
+    timer = timer or StageTimer()
+
+    def encode(result: FrameAnalysis) -> None:
+        image = result.frame.image_data
+        with timer.measure("annotation"):
+            annotated_frame = annotate_frame_with_faces(
+                image if in_place else image.copy(),
+                result.faces,
+                result.emotions,
+                result.activity,
+                result.frame.frame_number + 1,
+            )
+        with timer.measure("encode"):
+            video_writer.write(annotated_frame)
+
+    return encode
+
+
+def run_sequential(
+    frames: Iterator[VideoFrame],
+    state: AnalysisState,
+    encode: Optional[Callable[[FrameAnalysis], None]] = None,
+) -> Iterator[FrameAnalysis]:
+    """
+    Analyze and encode frames one after another on the calling thread
+
+    Args:
+        frames: Decoded frames
+        state: Analysis state
+        encode: Callback that writes the annotated frame (optional)
+
+    Yields:
+        FrameAnalysis results in frame order
+    """
+    for frame in timed_iterator(frames, state.timer, "decode"):
+        result = analyze_frame(frame, state)
+        if encode is not None:
+            encode(result)
+        yield result
+
+
+def run_pipelined(
+    frames: Iterator[VideoFrame],
+    state: AnalysisState,
+    encode: Optional[Callable[[FrameAnalysis], None]] = None,
+    queue_size: int = config.PIPELINE_QUEUE_SIZE,
+) -> Iterator[FrameAnalysis]:
+    """
+    Run decoding, analysis and encoding as concurrent stages
+
+    Decoding runs on its own thread, analysis on the calling thread and
+    encoding on a third thread. The stages are connected by bounded FIFO
+    queues, so a slow stage applies backpressure to the one before it and
+    results keep the frame order.
+
+    Args:
+        frames: Decoded frames (consumed on the decode thread)
+        state: Analysis state
+        encode: Callback that writes the annotated frame (optional)
+        queue_size: Maximum number of frames waiting between two stages
+
+    Yields:
+        FrameAnalysis results in frame order
+
+    Raises:
+        Exception: The first error raised by any stage
+    """
+    decode_queue = queue.Queue(maxsize=queue_size)
+    encode_queue = queue.Queue(maxsize=queue_size)
+    # Exposed so queue depths can be monitored while the pipeline runs
+    state.stage_queues["decode"] = decode_queue
+    state.stage_queues["encode"] = encode_queue
+    stop = threading.Event()
+    errors = []
+
+    def decode_stage():
+        try:
+            for frame in timed_iterator(frames, state.timer, "decode"):
+                if not _put(decode_queue, frame, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(decode_queue, _END_OF_STREAM, stop)
+
+    def encode_stage():
+        try:
+            while True:
+                result = _get(encode_queue, stop)
+                if result is _END_OF_STREAM:
+                    return
+                encode(result)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=decode_stage, name="decode", daemon=True)]
+    if encode is not None:
+        threads.append(
+            threading.Thread(target=encode_stage, name="encode", daemon=True)
+        )
+    for thread in threads:
+        thread.start()
+
+    completed = False
+    try:
+        while True:
+            frame = _get(decode_queue, stop)
+            if frame is _END_OF_STREAM:
+                break
+
+            result = analyze_frame(frame, state)
+
+            if encode is not None and not _put(encode_queue, result, stop):
+                break
+            yield result
+
+        if encode is not None:
+            _put(encode_queue, _END_OF_STREAM, stop)
+        completed = True
+    finally:
+        if not completed:
+            stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _put(stage_queue: queue.Queue, item: object, stop: threading.Event) -> bool:
+    """Put an item on a bounded queue, giving up once the pipeline stops"""
+    while not stop.is_set():
+        try:
+            stage_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(stage_queue: queue.Queue, stop: threading.Event) -> object:
+    """Take an item from a queue, returning end of stream once the pipeline stops"""
+    while not stop.is_set():
+        try:
+            return stage_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END_OF_STREAM
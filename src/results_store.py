@@ -0,0 +1,508 @@
+"""
+Columnar per-frame results store
+
+Per-frame and per-face results are appended in chunks to one raw binary
+file per column, with a meta.json describing the columns. Stores are read
+back through memory maps, so reports can be regenerated or time ranges
+queried without touching the video.
+"""
+
+import os
+import json
+import shutil
+import argparse
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src import config
+from src.utils import (
+    get_logger,
+    setup_logging,
+    ensure_directory_exists,
+    VideoProcessingError,
+)
+from src.activity_detector import ActivityType
+from src.emotion_analyzer_deepface import EMOTION_LABELS
+from src.summary_generator import AnalysisSummary, generate_text_report
+
+logger = get_logger(__name__)
+
+STORE_VERSION = 1
+META_FILENAME = "meta.json"
+
+ACTIVITY_LABELS = [activity.value for activity in ActivityType]
+
+FRAME_COLUMNS = {
+    "frame_number": (np.int64, ()),
+    "timestamp": (np.float64, ()),
+    "num_faces": (np.int32, ()),
+    "activity": (np.int8, ()),
+    "magnitude_mean": (np.float32, ()),
+    "magnitude_std": (np.float32, ()),
+    "magnitude_max": (np.float32, ()),
+    "carried_forward": (np.bool_, ()),
+    "scene_cut": (np.bool_, ()),
+    "faces_reused": (np.bool_, ()),
+}
+
+FACE_COLUMNS = {
+    "frame_number": (np.int64, ()),
+    "face_id": (np.int64, ()),
+    "x": (np.int32, ()),
+    "y": (np.int32, ()),
+    "width": (np.int32, ()),
+    "height": (np.int32, ()),
+    "emotion": (np.int8, ()),
+    "confidence": (np.float32, ()),
+    "probabilities": (np.float32, (len(EMOTION_LABELS),)),
+}
+
+TABLES = {"frames": FRAME_COLUMNS, "faces": FACE_COLUMNS}
+
+
+class _ColumnTable:
+    """Chunk buffers and append-only column files of one table"""
+
+    def __init__(
+        self,
+        table_dir: str,
+        columns: Dict,
+        chunk_size: int,
+        resume_rows: Optional[int] = None,
+    ):
+        ensure_directory_exists(table_dir)
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.buffers = {
+            name: np.empty((chunk_size,) + shape, dtype=dtype)
+            for name, (dtype, shape) in columns.items()
+        }
+        # A fresh table starts empty even if a crashed run left column files
+        mode = "wb" if resume_rows is None else "ab"
+        self.files = {
+            name: open(os.path.join(table_dir, f"{name}.bin"), mode) for name in columns
+        }
+        if resume_rows is not None:
+            # Drop rows written after the point being resumed from (also
+            # when it had no rows yet)
+            for name, (dtype, shape) in columns.items():
+                row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=int))
+                self.files[name].truncate(resume_rows * row_bytes)
+        self.buffered = 0
+        self.rows = resume_rows or 0
+
+    def append(self, row: Dict) -> None:
+        for name, value in row.items():
+            self.buffers[name][self.buffered] = value
+        self.buffered += 1
+        self.rows += 1
+        if self.buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffered:
+            for name, buffer in self.buffers.items():
+                self.files[name].write(buffer[: self.buffered].tobytes())
+            self.buffered = 0
+        for column_file in self.files.values():
+            column_file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for column_file in self.files.values():
+            column_file.close()
+
+
+class ResultsWriter:
+    """
+    Streams frame analysis results into a columnar store
+
+    Rows are collected in fixed-size chunk buffers and appended to the
+    column files whenever a chunk is full, so memory use is constant. With
+    resume_rows an existing store is continued after that many rows per
+    table, e.g. when resuming from a checkpoint.
+    """
+
+    def __init__(
+        self,
+        store_dir: str,
+        video_info: Dict,
+        video_filename: str,
+        chunk_size: int = config.RESULTS_CHUNK_SIZE,
+        resume_rows: Optional[Dict[str, int]] = None,
+    ):
+        if resume_rows is None and os.path.isdir(store_dir):
+            # A fresh run replaces any previous store in the same directory,
+            # including one left without metadata by a run that crashed
+            # before its first flush
+            shutil.rmtree(store_dir)
+
+        self.store_dir = store_dir
+        self.meta = {
+            "version": STORE_VERSION,
+            "video_filename": video_filename,
+            "fps": video_info["fps"],
+            "duration": video_info["duration"],
+            "width": video_info["width"],
+            "height": video_info["height"],
+            "processing_time": None,
+            "emotion_labels": [emotion.value for emotion in EMOTION_LABELS],
+            "activity_labels": ACTIVITY_LABELS,
+        }
+        self.tables = {
+            name: _ColumnTable(
+                os.path.join(store_dir, name),
+                columns,
+                chunk_size,
+                resume_rows.get(name, 0) if resume_rows is not None else None,
+            )
+            for name, columns in TABLES.items()
+        }
+        self._emotion_codes = {emotion: i for i, emotion in enumerate(EMOTION_LABELS)}
+        self._activity_codes = {label: i for i, label in enumerate(ACTIVITY_LABELS)}
+
+    def append(self, result) -> None:
+        """
+        Append the result of one frame
+
+        Args:
+            result: FrameAnalysis of the frame
+        """
+        frame = result.frame
+        motion = result.motion
+
+        self.tables["frames"].append(
+            {
+                "frame_number": frame.frame_number,
+                "timestamp": frame.timestamp,
+                "num_faces": len(result.faces),
+                "activity": self._activity_codes[result.activity],
+                "magnitude_mean": motion.magnitude_mean,
+                "magnitude_std": motion.magnitude_std,
+                "magnitude_max": motion.magnitude_max,
+                "carried_forward": result.carried_forward,
+                "scene_cut": result.scene_cut,
+                "faces_reused": result.faces_reused,
+            }
+        )
+
+        for face, emotion in zip(result.faces, result.emotions):
+            bbox = face.bounding_box
+            self.tables["faces"].append(
+                {
+                    "frame_number": frame.frame_number,
+                    "face_id": face.face_id,
+                    "x": bbox.x,
+                    "y": bbox.y,
+                    "width": bbox.width,
+                    "height": bbox.height,
+                    "emotion": self._emotion_codes[emotion.emotion_label],
+                    "confidence": emotion.confidence,
+                    "probabilities": [
+                        emotion.probabilities.get(label, 0.0)
+                        for label in EMOTION_LABELS
+                    ],
+                }
+            )
+
+    def flush(self) -> None:
+        """Write buffered rows and the current row counts to disk"""
+        for table in self.tables.values():
+            table.flush()
+        _write_meta(self.store_dir, self.meta, self.row_counts())
+
+    def close(self, processing_time: Optional[float] = None) -> None:
+        """
+        Write the remaining rows and the final metadata
+
+        Args:
+            processing_time: Total processing time in seconds (optional)
+        """
+        self.meta["processing_time"] = processing_time
+        for table in self.tables.values():
+            table.close()
+        _write_meta(self.store_dir, self.meta, self.row_counts())
+        logger.info(f"Results store saved to {self.store_dir}")
+
+    def row_counts(self) -> Dict[str, int]:
+        """Number of rows appended to each table so far"""
+        return {name: table.rows for name, table in self.tables.items()}
+
+
+@dataclass
+class ResultsStore:
+    """Memory-mapped columns of a results store"""
+
+    store_dir: str
+    meta: Dict
+    frames: Dict[str, np.ndarray]
+    faces: Dict[str, np.ndarray]
+
+    def time_range(
+        self, start_time: Optional[float] = None, end_time: Optional[float] = None
+    ) -> Tuple[slice, slice]:
+        """
+        Find the rows of a time range
+
+        Args:
+            start_time: First timestamp in seconds (inclusive, default: start)
+            end_time: Last timestamp in seconds (exclusive, default: end)
+
+        Returns:
+            Tuple with the row slices of the frames and faces tables
+        """
+        timestamps = self.frames["timestamp"]
+        first = (
+            0 if start_time is None else int(np.searchsorted(timestamps, start_time))
+        )
+        last = (
+            len(timestamps)
+            if end_time is None
+            else int(np.searchsorted(timestamps, end_time))
+        )
+
+        face_frames = self.faces["frame_number"]
+        frame_numbers = self.frames["frame_number"]
+        face_first = (
+            int(np.searchsorted(face_frames, frame_numbers[first]))
+            if first < len(frame_numbers)
+            else len(face_frames)
+        )
+        face_last = (
+            int(np.searchsorted(face_frames, frame_numbers[last]))
+            if last < len(frame_numbers)
+            else len(face_frames)
+        )
+
+        return slice(first, last), slice(face_first, face_last)
+
+
+def load_results(store_dir: str) -> ResultsStore:
+    """
+    Open a results store with memory-mapped columns
+
+    Args:
+        store_dir: Directory of the store
+
+    Returns:
+        ResultsStore whose columns are read lazily from disk
+
+    Raises:
+        VideoProcessingError: If the directory is not a results store
+    """
+    meta_path = os.path.join(store_dir, META_FILENAME)
+    if not os.path.isfile(meta_path):
+        raise VideoProcessingError(f"Results store not found: {store_dir}")
+
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    tables = {}
+    for table_name, columns in meta["tables"].items():
+        rows = columns.pop("_rows")
+        tables[table_name] = {
+            name: _map_column(
+                os.path.join(store_dir, table_name, f"{name}.bin"),
+                np.dtype(spec["dtype"]),
+                (rows,) + tuple(spec["shape"]),
+            )
+            for name, spec in columns.items()
+        }
+
+    return ResultsStore(
+        store_dir=store_dir,
+        meta=meta,
+        frames=tables["frames"],
+        faces=tables["faces"],
+    )
+
+
+def summarize_results(
+    store: ResultsStore,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+) -> AnalysisSummary:
+    """
+    Rebuild the AnalysisSummary from a results store
+
+    Args:
+        store: Loaded results store
+        start_time: Only include frames from this timestamp on (optional)
+        end_time: Only include frames before this timestamp (optional)
+
+    Returns:
+        AnalysisSummary with the same counters as the original run
+    """
+    frame_rows, face_rows = store.time_range(start_time, end_time)
+    meta = store.meta
+
+    activity_codes = np.asarray(store.frames["activity"][frame_rows])
+    emotion_codes = np.asarray(store.faces["emotion"][face_rows])
+    num_faces = np.asarray(store.frames["num_faces"][frame_rows])
+
+    activity_counts = np.bincount(
+        activity_codes, minlength=len(meta["activity_labels"])
+    )
+    emotion_counts = np.bincount(emotion_codes, minlength=len(meta["emotion_labels"]))
+
+    full_video = start_time is None and end_time is None
+    total_frames = len(activity_codes)
+
+    scene_cuts = []
+    if "scene_cut" in store.frames:
+        cut_rows = np.flatnonzero(np.asarray(store.frames["scene_cut"][frame_rows]))
+        frame_numbers = np.asarray(store.frames["frame_number"][frame_rows])
+        scene_cuts = [int(frame_numbers[row]) + 1 for row in cut_rows]
+
+    reused_frames = 0
+    if "faces_reused" in store.frames:
+        reused_frames = int(np.count_nonzero(store.frames["faces_reused"][frame_rows]))
+
+    return AnalysisSummary(
+        video_filename=meta["video_filename"],
+        total_frames=total_frames,
+        duration=(
+            meta["duration"]
+            if full_video
+            else total_frames / meta["fps"] if meta["fps"] else 0.0
+        ),
+        fps=meta["fps"],
+        total_faces_detected=int(num_faces.sum()),
+        emotion_distribution={
+            label: int(count)
+            for label, count in zip(meta["emotion_labels"], emotion_counts)
+            if count
+        },
+        activity_distribution={
+            label: int(count)
+            for label, count in zip(meta["activity_labels"], activity_counts)
+            if count
+        },
+        processing_time=meta.get("processing_time") or 0.0,
+        unique_faces=int(np.unique(store.faces["face_id"][face_rows]).size),
+        scene_cuts=scene_cuts[: config.SUMMARY_MAX_SCENE_CUTS],
+        reused_frames=reused_frames,
+        num_scene_cuts=len(scene_cuts),
+    )
+
+
+def merge_stores(
+    store_dirs: List[str], output_dir: str, processing_time: Optional[float] = None
+) -> None:
+    """
+    Concatenate stores of consecutive segments into one store, in order
+
+    Args:
+        store_dirs: Segment store directories, in frame order
+        output_dir: Directory of the merged store
+        processing_time: Total processing time in seconds (optional)
+    """
+    if os.path.exists(os.path.join(output_dir, META_FILENAME)):
+        shutil.rmtree(output_dir)
+
+    stores = [load_results(store_dir) for store_dir in store_dirs]
+    meta = dict(stores[0].meta)
+    meta.pop("tables")
+    meta["processing_time"] = processing_time
+
+    for table_name, columns in TABLES.items():
+        table_dir = os.path.join(output_dir, table_name)
+        ensure_directory_exists(table_dir)
+        for name in columns:
+            with open(os.path.join(table_dir, f"{name}.bin"), "wb") as merged:
+                for store_dir in store_dirs:
+                    path = os.path.join(store_dir, table_name, f"{name}.bin")
+                    with open(path, "rb") as part:
+                        shutil.copyfileobj(part, merged)
+
+    row_counts = {
+        table_name: sum(
+            len(getattr(store, table_name)["frame_number"]) for store in stores
+        )
+        for table_name in TABLES
+    }
+    _write_meta(output_dir, meta, row_counts)
+
+
+def set_processing_time(store_dir: str, processing_time: float) -> None:
+    """
+    Record the total processing time in the metadata of a finished store
+
+    Args:
+        store_dir: Directory of the store
+        processing_time: Total processing time in seconds
+    """
+    store = load_results(store_dir)
+    meta = dict(store.meta)
+    meta.pop("tables")
+    meta["processing_time"] = processing_time
+    row_counts = {
+        table_name: len(getattr(store, table_name)["frame_number"])
+        for table_name in TABLES
+    }
+    _write_meta(store_dir, meta, row_counts)
+
+
+def _map_column(path: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+    """Memory-map a column file (empty columns cannot be mapped)"""
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def _write_meta(store_dir: str, meta: Dict, row_counts: Dict[str, int]) -> None:
+    """Atomically write meta.json with the column layout and row counts"""
+    meta = dict(meta)
+    meta["tables"] = {
+        table_name: {
+            "_rows": row_counts[table_name],
+            **{
+                name: {"dtype": np.dtype(dtype).str, "shape": list(shape)}
+                for name, (dtype, shape) in columns.items()
+            },
+        }
+        for table_name, columns in TABLES.items()
+    }
+
+    tmp_path = os.path.join(store_dir, META_FILENAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, META_FILENAME))
+
+
+def main():
+    """Regenerate the text report from a results store"""
+    parser = argparse.ArgumentParser(
+        description="Gerar o relatório a partir dos resultados salvos, sem o vídeo"
+    )
+    parser.add_argument("store", type=str, help="Diretório dos resultados salvos")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help=(
+            "Arquivo do relatório (padrão: relatorio_store.txt ao lado dos "
+            "resultados, sem substituir o relatorio.txt da análise)"
+        ),
+    )
+    parser.add_argument(
+        "--start", type=float, default=None, help="Início do trecho em segundos"
+    )
+    parser.add_argument(
+        "--end", type=float, default=None, help="Fim do trecho em segundos"
+    )
+    args = parser.parse_args()
+
+    store = load_results(args.store)
+    summary = summarize_results(store, args.start, args.end)
+
+    output_path = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(args.store)), "relatorio_store.txt"
+    )
+    generate_text_report(summary, output_path)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,141 @@
+"""
+Scene-cut detection
+
+Compares the color histogram of each analyzed frame, computed on a small
+downscaled copy, with the one of the previous analyzed frame. A large
+histogram distance marks the first frame of a new shot, where everything
+carried over from the previous frame (face tracks, cached emotions, the
+previous motion plane) is no longer valid.
+"""
+
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+
+from src import config
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class SceneDetectorState:
+    """Holds the histogram of the previous frame and the cut policy"""
+
+    threshold: float
+    working_width: int
+    bins: int
+    min_shot_frames: int
+    prev_histogram: Optional[np.ndarray] = None
+    last_cut_frame: Optional[int] = None
+    num_cuts: int = 0
+
+
+def initialize_scene_detector(
+    threshold: float = config.SCENE_CUT_THRESHOLD,
+    working_width: int = config.SCENE_WORKING_WIDTH,
+    bins: int = config.SCENE_HISTOGRAM_BINS,
+    min_shot_frames: int = config.SCENE_MIN_SHOT_FRAMES,
+) -> SceneDetectorState:
+    """
+    Initialize the scene-cut detector
+
+    Args:
+        threshold: Bhattacharyya distance between the histograms of two
+            frames above which a cut is reported (0 to 1)
+        working_width: Width frames are downscaled to before the histogram
+        bins: Histogram bins per color channel
+        min_shot_frames: Minimum number of frames between two cuts, so
+            flashes and fast pans do not produce a burst of cuts
+
+    Returns:
+        SceneDetectorState ready for detect_scene_cut
+    """
+    logger.info(
+        f"Scene-cut detector initialized: threshold {threshold}, "
+        f"minimum shot length {min_shot_frames} frames"
+    )
+    return SceneDetectorState(
+        threshold=threshold,
+        working_width=max(1, working_width),
+        bins=max(2, bins),
+        min_shot_frames=max(1, min_shot_frames),
+    )
+
+
+def frame_histogram(frame: np.ndarray, state: SceneDetectorState) -> np.ndarray:
+    """
+    Compute the normalized color histogram of a downscaled frame
+
+    Args:
+        frame: Frame (BGR or grayscale)
+        state: Scene detector state
+
+    Returns:
+        Histogram normalized to sum 1
+    """
+    height, width = frame.shape[:2]
+    if width > state.working_width:
+        small_height = max(1, int(round(height * state.working_width / width)))
+        frame = cv2.resize(
+            frame,
+            (state.working_width, small_height),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    if frame.ndim == 3:
+        histogram = cv2.calcHist(
+            [frame], [0, 1, 2], None, [state.bins] * 3, [0, 256] * 3
+        )
+    else:
+        histogram = cv2.calcHist([frame], [0], None, [state.bins], [0, 256])
+
+    histogram = histogram.ravel()
+    return histogram / max(float(histogram.sum()), 1.0)
+
+
+def seed_scene_detector(frame: np.ndarray, state: SceneDetectorState) -> None:
+    """
+    Use a frame as the previous frame without checking it for a cut
+
+    Args:
+        frame: Frame before the first analyzed one
+        state: Scene detector state, updated in place
+    """
+    state.prev_histogram = frame_histogram(frame, state)
+
+
+def detect_scene_cut(
+    frame: np.ndarray, frame_number: int, state: SceneDetectorState
+) -> bool:
+    """
+    Check whether a frame starts a new shot
+
+    Args:
+        frame: Frame (BGR or grayscale)
+        frame_number: Index of the frame
+        state: Scene detector state, updated in place
+
+    Returns:
+        True if the frame is the first frame of a new shot
+    """
+    histogram = frame_histogram(frame, state)
+    prev_histogram = state.prev_histogram
+    state.prev_histogram = histogram
+
+    if prev_histogram is None or prev_histogram.shape != histogram.shape:
+        return False
+    if (
+        state.last_cut_frame is not None
+        and frame_number - state.last_cut_frame < state.min_shot_frames
+    ):
+        return False
+
+    distance = cv2.compareHist(prev_histogram, histogram, cv2.HISTCMP_BHATTACHARYYA)
+    if distance <= state.threshold:
+        return False
+
+    state.last_cut_frame = frame_number
+    state.num_cuts += 1
+    return True
@@ -0,0 +1,332 @@
+"""
+Segment-parallel processing of a single video across worker processes
+
+The video is split into contiguous frame ranges. Each worker process seeks
+to its range, runs the full analysis pipeline on it and writes its own
+annotated segment; the parent then merges the results in frame order.
+"""
+
+import os
+import multiprocessing
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src import config
+from src.utils import get_logger, setup_logging, VideoProcessingError
+from src.video_processor import (
+    load_video,
+    extract_frames,
+    create_video_writer,
+    resolve_encoder_backend,
+    concatenate_with_ffmpeg,
+    EncoderSettings,
+    FramePool,
+)
+from src.summary_generator import SummaryAggregator
+from src.results_store import ResultsWriter
+from src.performance import StageTimer
+from src.identity_clusterer import IdentityAggregator, load_embedding_model
+from src.pipeline import (
+    initialize_analysis_state,
+    seed_motion_state,
+    run_sequential,
+    run_pipelined,
+    frame_record,
+    frame_pool_size,
+    create_annotating_encoder,
+)
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class SegmentResult:
+    """Represents the analysis result of one frame range"""
+
+    segment_index: int
+    start_frame: int
+    end_frame: int
+    aggregator: SummaryAggregator
+    video_path: Optional[str]
+    results_dir: Optional[str] = None
+    identities: Optional[IdentityAggregator] = None
+    timer: Optional[StageTimer] = None
+
+
+def split_frame_ranges(total_frames: int, num_segments: int) -> List[Tuple[int, int]]:
+    """
+    Split a video into contiguous frame ranges of similar length
+
+    Args:
+        total_frames: Number of frames reported for the video
+        num_segments: Number of ranges to create
+
+    Returns:
+        List of (start_frame, end_frame) tuples; the last range is open ended
+        (end_frame is -1) so frames beyond the reported count are not lost
+    """
+    num_segments = max(1, min(num_segments, total_frames))
+    bounds = [total_frames * i // num_segments for i in range(num_segments + 1)]
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(num_segments)]
+    ranges[-1] = (ranges[-1][0], -1)
+    return ranges
+
+
+def process_segment(
+    video_path: str,
+    segment_index: int,
+    start_frame: int,
+    end_frame: int,
+    options: Dict,
+    segment_video_path: Optional[str] = None,
+    segment_results_dir: Optional[str] = None,
+) -> SegmentResult:
+    """
+    Analyze one frame range of a video (worker process entry point)
+
+    The frame before start_frame is decoded too, but only used as the
+    previous frame of the optical-flow pair at the segment boundary.
+
+    Args:
+        video_path: Path to the input video
+        segment_index: Position of the segment in the video
+        start_frame: First frame of the segment
+        end_frame: Frame after the last one of the segment (-1 = end of video)
+        options: Analysis options (detect_every_n, full_scan_every_n,
+            emotion_refresh_every_n, motion_engine, motion_working_width,
+            frame_stride, pipeline, queue_size, identify_people)
+        segment_video_path: Where to write the annotated segment (optional)
+        segment_results_dir: Where to write the segment's results store
+            (optional)
+
+    Returns:
+        SegmentResult with the summary counters of the segment
+    """
+    setup_logging()
+
+    video_capture = load_video(video_path)
+    fps = video_capture.get(cv2.CAP_PROP_FPS)
+    width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    state = initialize_analysis_state(
+        detect_every_n=options["detect_every_n"],
+        emotion_refresh_every_n=options["emotion_refresh_every_n"],
+        first_track_id=segment_index * config.SEGMENT_TRACK_ID_STRIDE,
+        motion_engine=options["motion_engine"],
+        motion_working_width=options["motion_working_width"],
+        full_scan_every_n=options["full_scan_every_n"],
+        scene_cut_threshold=options.get(
+            "scene_cut_threshold", config.SCENE_CUT_THRESHOLD
+        ),
+        adaptive_threshold=options.get("adaptive_threshold", 0.0),
+        emotion_backend=options.get("emotion_backend", config.EMOTION_BACKEND),
+        emotion_model_path=options.get("emotion_model_path"),
+    )
+
+    seed_motion_state(video_capture, state, start_frame)
+
+    encoder = options.get("encoder") or EncoderSettings()
+    video_writer = None
+    encode = None
+    if segment_video_path is not None:
+        video_writer = create_video_writer(
+            segment_video_path, fps, width, height, encoder
+        )
+        encode = create_annotating_encoder(
+            video_writer, state.timer, in_place=not options.get("identify_people")
+        )
+
+    frame_pool = FramePool(
+        frame_pool_size(
+            encoder.buffer_size if video_writer is not None else 0,
+            options["queue_size"] if options.get("pipeline") else None,
+        )
+    )
+    frames = extract_frames(
+        video_capture,
+        start_frame=start_frame,
+        end_frame=None if end_frame < 0 else end_frame,
+        frame_stride=options["frame_stride"],
+        decode_skipped=segment_video_path is not None,
+        frame_pool=frame_pool,
+    )
+
+    if options.get("pipeline"):
+        results = run_pipelined(frames, state, encode, queue_size=options["queue_size"])
+    else:
+        results = run_sequential(frames, state, encode)
+
+    results_writer = None
+    if segment_results_dir is not None:
+        results_writer = ResultsWriter(
+            segment_results_dir,
+            {
+                "fps": fps,
+                "duration": total_frames / fps if fps > 0 else 0.0,
+                "width": width,
+                "height": height,
+            },
+            os.path.basename(video_path),
+        )
+
+    identities = None
+    embedding_model = None
+    if options.get("identify_people"):
+        identities = IdentityAggregator()
+        embedding_model = load_embedding_model()
+
+    aggregator = SummaryAggregator()
+    try:
+        for result in results:
+            aggregator.update(frame_record(result))
+            if results_writer is not None:
+                results_writer.append(result)
+            if identities is not None:
+                identities.update(result, embedding_model)
+
+            if aggregator.total_frames % config.LOG_EVERY_N_FRAMES == 0:
+                logger.info(
+                    f"Segment {segment_index}: {aggregator.total_frames} frames processed"
+                )
+    finally:
+        if video_writer is not None:
+            video_writer.release()
+        if results_writer is not None:
+            results_writer.close()
+
+    if identities is not None:
+        identities.flush(embedding_model)
+
+    last_frame = start_frame + aggregator.total_frames
+    logger.info(f"Segment {segment_index} done: frames {start_frame}-{last_frame - 1}")
+
+    return SegmentResult(
+        segment_index=segment_index,
+        start_frame=start_frame,
+        end_frame=last_frame,
+        aggregator=aggregator,
+        video_path=segment_video_path,
+        results_dir=segment_results_dir,
+        identities=identities,
+        timer=state.timer,
+    )
+
+
+def process_video_segments(
+    video_path: str,
+    total_frames: int,
+    workers: int,
+    options: Dict,
+    segment_dir: Optional[str] = None,
+    results_dir: Optional[str] = None,
+) -> List[SegmentResult]:
+    """
+    Analyze a video with one worker process per frame range
+
+    Args:
+        video_path: Path to the input video
+        total_frames: Number of frames reported for the video
+        workers: Number of worker processes
+        options: Analysis options passed to process_segment
+        segment_dir: Directory for the annotated segments (None = no video)
+        results_dir: Directory for the segment results stores (None = no store)
+
+    Returns:
+        SegmentResult list in frame order
+    """
+    ranges = split_frame_ranges(total_frames, workers)
+    logger.info(f"Processing {len(ranges)} segments with {workers} worker processes")
+
+    # TensorFlow is not fork-safe, so workers always start from a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = []
+        for index, (start, end) in enumerate(ranges):
+            segment_video_path = (
+                os.path.join(segment_dir, f"segment_{index:04d}.mp4")
+                if segment_dir is not None
+                else None
+            )
+            segment_results_dir = (
+                os.path.join(results_dir, f"segment_{index:04d}")
+                if results_dir is not None
+                else None
+            )
+            futures.append(
+                executor.submit(
+                    process_segment,
+                    video_path,
+                    index,
+                    start,
+                    end,
+                    options,
+                    segment_video_path,
+                    segment_results_dir,
+                )
+            )
+
+        results = [future.result() for future in futures]
+
+    return sorted(results, key=lambda result: result.segment_index)
+
+
+def concatenate_segment_videos(
+    segment_paths: List[str],
+    output_path: str,
+    fps: float,
+    width: int,
+    height: int,
+    encoder: Optional[EncoderSettings] = None,
+) -> int:
+    """
+    Join annotated segments into a single output video, in the given order
+
+    Segments encoded by ffmpeg are joined by ffmpeg without re-encoding;
+    otherwise every frame is decoded and written again.
+
+    Args:
+        segment_paths: Paths of the segment videos, in frame order
+        output_path: Path of the merged output video
+        fps: Frames per second
+        width: Frame width in pixels
+        height: Frame height in pixels
+        encoder: Encoder settings the segments were written with
+
+    Returns:
+        Number of frames written
+
+    Raises:
+        VideoProcessingError: If a segment cannot be read
+    """
+    encoder = encoder or EncoderSettings()
+
+    if resolve_encoder_backend(encoder) == "ffmpeg":
+        concatenate_with_ffmpeg(segment_paths, output_path)
+        merged = load_video(output_path)
+        frames_written = int(merged.get(cv2.CAP_PROP_FRAME_COUNT))
+        merged.release()
+        return frames_written
+
+    video_writer = create_video_writer(output_path, fps, width, height, encoder)
+    frame_pool = FramePool(frame_pool_size(encoder.buffer_size))
+    frames_written = 0
+
+    try:
+        for segment_path in segment_paths:
+            try:
+                segment_capture = load_video(segment_path)
+            except (FileNotFoundError, ValueError) as e:
+                raise VideoProcessingError(f"Cannot read segment video: {e}")
+
+            for frame in extract_frames(segment_capture, frame_pool=frame_pool):
+                video_writer.write(frame.image_data)
+                frames_written += 1
+    finally:
+        video_writer.release()
+
+    return frames_written
@@ -0,0 +1,525 @@
+"""
+Warm analysis service
+
+`python -m src.main serve` keeps the face detector and the emotion model
+loaded and analyzes videos submitted as jobs over localhost HTTP, so every
+job skips the TensorFlow / DeepFace cold start. Jobs wait in a bounded
+queue and a fixed number of worker threads runs them; the models are
+loaded once when the service starts. Finished jobs are forgotten after
+SERVICE_FINISHED_JOB_TTL seconds or beyond SERVICE_MAX_FINISHED_JOBS.
+
+Endpoints:
+    POST /jobs                 {"input": path, "output": dir, "options": {...}}
+    GET  /jobs                 status of every job
+    GET  /jobs/<id>            status and progress of one job
+    GET  /jobs/<id>/result     summary of a finished job
+    GET  /jobs/<id>/report     text report of a finished job
+    GET  /health               service status
+"""
+
+import os
+import json
+import queue
+import threading
+import time
+import uuid
+import argparse
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from src import config
+from src.utils import get_logger, validate_file_exists
+from src.metrics_server import ProcessingMetrics
+from src.summary_generator import AnalysisSummary
+from src.pipeline import EMOTION_BACKENDS
+
+logger = get_logger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Options a job cannot set: input / output are job fields and a job must
+# not start its own metrics server or batch process pool
+RESERVED_OPTIONS = (
+    "input",
+    "output",
+    "metrics_port",
+    "video_workers",
+    "emotion_backend",
+    "emotion_model",
+)
+
+
+class JobError(Exception):
+    """Raised when a job request is invalid"""
+
+    pass
+
+
+@dataclass
+class AnalysisJob:
+    """One video analysis submitted to the service"""
+
+    job_id: str
+    args: argparse.Namespace
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    summary: Optional[AnalysisSummary] = None
+    metrics: ProcessingMetrics = field(default_factory=ProcessingMetrics)
+
+    def describe(self) -> Dict:
+        """Status of the job as a JSON-serializable dictionary"""
+        description = {
+            "id": self.job_id,
+            "status": self.status,
+            "input": self.args.input,
+            "output": self.args.output,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            description["error"] = self.error
+
+        aggregator = self.metrics.aggregator
+        if self.status == RUNNING and aggregator is not None:
+            meter = self.metrics.meter
+            description["progress"] = {
+                "frames_processed": aggregator.total_frames,
+                "total_frames": self.metrics.total_frames,
+                "fps": round(meter.rolling_fps, 2) if meter is not None else None,
+                "eta_seconds": meter.eta_seconds if meter is not None else None,
+            }
+        return description
+
+
+class AnalysisService:
+    """
+    Job queue with a fixed number of warm analysis workers
+
+    Args:
+        output_dir: Base directory of the jobs that do not set an output
+        max_concurrent: Number of jobs analyzed at the same time
+        max_queued: Maximum number of jobs waiting to start
+        emotion_backend: Emotion backend loaded by every worker
+        emotion_model_path: Converted model of the 'dnn' and 'tflite'
+            emotion backends (None = the backend's default path)
+        finished_job_ttl: Seconds a finished job stays queryable
+        max_finished_jobs: Maximum number of finished jobs kept; the oldest
+            are forgotten first
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        max_concurrent: int,
+        max_queued: int,
+        emotion_backend: str = config.EMOTION_BACKEND,
+        emotion_model_path: Optional[str] = None,
+        finished_job_ttl: float = config.SERVICE_FINISHED_JOB_TTL,
+        max_finished_jobs: int = config.SERVICE_MAX_FINISHED_JOBS,
+    ):
+        self.output_dir = output_dir
+        self.finished_job_ttl = finished_job_ttl
+        self.max_finished_jobs = max(0, max_finished_jobs)
+        self.emotion_backend = emotion_backend
+        self.emotion_model_path = emotion_model_path
+        self.max_concurrent = max(1, max_concurrent)
+        self.jobs: Dict[str, AnalysisJob] = {}
+        self._queue: "queue.Queue[Optional[AnalysisJob]]" = queue.Queue(
+            maxsize=max(1, max_queued)
+        )
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._load_errors: List[Exception] = []
+
+    def start(self) -> None:
+        """
+        Start the workers and wait until all of them have loaded the models
+
+        Raises:
+            ModelLoadError: If a worker could not load the models
+        """
+        from src.main import load_models, parse_arguments
+
+        defaults = parse_arguments(["--emotion-backend", self.emotion_backend])
+        defaults.emotion_model = self.emotion_model_path
+        ready = threading.Barrier(self.max_concurrent + 1)
+
+        for index in range(self.max_concurrent):
+            worker = threading.Thread(
+                target=self._work,
+                args=(load_models, defaults, ready),
+                name=f"analysis-worker-{index}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+        ready.wait()
+        if self._load_errors:
+            self.stop()
+            raise self._load_errors[0]
+        logger.info(f"{self.max_concurrent} analysis workers ready")
+
+    def stop(self) -> None:
+        """Finish the queued jobs and stop the workers"""
+        for worker in self._workers:
+            if worker.is_alive():
+                self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def submit(self, request: Dict) -> AnalysisJob:
+        """
+        Validate a job request and queue it
+
+        Args:
+            request: {"input": video path, "output": optional directory,
+                "options": optional command line options by name}
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobError: If the request is invalid
+            queue.Full: If the queue is full
+        """
+        job_id = uuid.uuid4().hex[:12]
+        args = build_job_arguments(
+            request, os.path.join(self.output_dir, "jobs", job_id)
+        )
+        # Jobs run on the models the workers have loaded
+        args.emotion_backend = self.emotion_backend
+        args.emotion_model = self.emotion_model_path
+        job = AnalysisJob(job_id=job_id, args=args)
+
+        with self._lock:
+            self._evict_finished_jobs()
+            self._queue.put_nowait(job)
+            self.jobs[job_id] = job
+
+        logger.info(f"Job {job_id} queued: {args.input}")
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[AnalysisJob]:
+        with self._lock:
+            self._evict_finished_jobs()
+            return list(self.jobs.values())
+
+    def _evict_finished_jobs(self) -> None:
+        """Forget expired finished jobs and the oldest beyond the limit (under _lock)"""
+        finished = sorted(
+            (job for job in self.jobs.values() if job.status in (DONE, FAILED)),
+            key=lambda job: job.finished_at or 0.0,
+        )
+        expired_before = time.time() - self.finished_job_ttl
+        excess = len(finished) - self.max_finished_jobs
+        for index, job in enumerate(finished):
+            if index < excess or (job.finished_at or 0.0) < expired_before:
+                del self.jobs[job.job_id]
+
+    def health(self) -> Dict:
+        jobs = self.list()
+        return {
+            "status": "ok",
+            "workers": self.max_concurrent,
+            "queued": sum(1 for job in jobs if job.status == QUEUED),
+            "running": sum(1 for job in jobs if job.status == RUNNING),
+            "finished": sum(1 for job in jobs if job.status in (DONE, FAILED)),
+        }
+
+    def _work(self, load_models, defaults, ready: threading.Barrier) -> None:
+        from src.main import run_analysis
+        from src.identity_clusterer import load_embedding_model
+
+        # Each worker loads its own face detector and embedding model. The
+        # deepface emotion model is a process-wide singleton shared by all
+        # workers; EmotionModel.predict serializes access to it
+        try:
+            models = load_models(defaults)
+        except Exception as e:
+            self._load_errors.append(e)
+            return
+        finally:
+            ready.wait()
+
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            logger.info(f"Job {job.job_id} started")
+            try:
+                if job.args.identify_people and models["embedding_model"] is None:
+                    models["embedding_model"] = load_embedding_model()
+                job.summary = run_analysis(job.args, models, job.metrics)
+                job.status = DONE
+                logger.info(f"Job {job.job_id} finished")
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+                logger.error(f"Job {job.job_id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+
+
+def build_job_arguments(request: Dict, default_output: str) -> argparse.Namespace:
+    """
+    Turn a job request into the arguments of run_analysis
+
+    Options are given by their command line name, with dashes or
+    underscores (e.g. {"frame_stride": 3, "no-output-video": true}), and
+    are validated by the same parser as the command line.
+
+    Args:
+        request: Decoded JSON body of POST /jobs
+        default_output: Output directory used when the request sets none
+
+    Returns:
+        Parsed arguments of the job
+
+    Raises:
+        JobError: If the request is invalid
+    """
+    from src.main import parse_arguments
+
+    if not isinstance(request, dict):
+        raise JobError("Request body must be a JSON object")
+
+    video_path = request.get("input")
+    if not isinstance(video_path, str) or not validate_file_exists(video_path):
+        raise JobError(f"Video file not found: {video_path}")
+
+    options = request.get("options") or {}
+    if not isinstance(options, dict):
+        raise JobError("options must be a JSON object")
+
+    argv = []
+    for name, value in options.items():
+        key = name.replace("-", "_")
+        if key in RESERVED_OPTIONS:
+            raise JobError(f"Option not allowed in a job: {name}")
+        if value is None or value is False:
+            continue
+        argv.append("--" + key.replace("_", "-"))
+        if value is not True:
+            argv.append(str(value))
+
+    try:
+        args = parse_arguments(argv)
+    except SystemExit:
+        raise JobError(f"Invalid options: {options}")
+
+    if (args.checkpoint_every > 0 or args.resume) and args.workers > 1:
+        raise JobError("Checkpoints and resume are not supported with workers > 1")
+
+    args.input = video_path
+    args.output = request.get("output") or default_output
+    return args
+
+
+def start_service_server(
+    service: AnalysisService, port: int, host: str = config.SERVICE_HOST
+) -> ThreadingHTTPServer:
+    """
+    Create the HTTP server of the service
+
+    Args:
+        service: Started AnalysisService
+        port: TCP port (0 = any free port)
+        host: Interface to bind
+
+    Returns:
+        Server ready for serve_forever()
+    """
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+            if parts == ["health"]:
+                self._send_json(200, service.health())
+                return
+            if parts == ["jobs"]:
+                self._send_json(200, [job.describe() for job in service.list()])
+                return
+            if len(parts) < 2 or parts[0] != "jobs" or len(parts) > 3:
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            job = service.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": f"Unknown job: {parts[1]}"})
+                return
+            if len(parts) == 2:
+                self._send_json(200, job.describe())
+                return
+            if job.status != DONE:
+                self._send_json(409, job.describe())
+                return
+
+            if parts[2] == "result":
+                self._send_json(200, {**job.describe(), "summary": asdict(job.summary)})
+            elif parts[2] == "report":
+                report_path = os.path.join(job.args.output, "relatorio.txt")
+                if not os.path.isfile(report_path):
+                    self._send_json(404, {"error": "Report not found"})
+                    return
+                with open(report_path, "rb") as f:
+                    self._send(200, f.read(), "text/plain; charset=utf-8")
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path.split("?")[0].rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                job = service.submit(json.loads(self.rfile.read(length) or b"{}"))
+            except (ValueError, JobError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except queue.Full:
+                self._send_json(503, {"error": "Job queue is full"})
+                return
+
+            self._send_json(202, job.describe())
+
+        def _send_json(self, status: int, body) -> None:
+            self._send(status, json.dumps(body).encode("utf-8"), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Status polling is frequent; keep it out of the analysis log
+            pass
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_service_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line of the serve command"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main serve",
+        description="Serviço de análise com modelos pré-carregados",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=config.SERVICE_HOST,
+        help=f"Interface de rede do serviço (padrão: {config.SERVICE_HOST})",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=config.SERVICE_PORT,
+        help=f"Porta HTTP do serviço (padrão: {config.SERVICE_PORT})",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=config.OUTPUT_DIR,
+        help=(
+            "Diretório base das saídas; cada job sem saída própria usa "
+            f"<saída>/jobs/<id> (padrão: {config.OUTPUT_DIR})"
+        ),
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=config.SERVICE_MAX_CONCURRENT_JOBS,
+        help=(
+            "Número de jobs analisados ao mesmo tempo; cada um mantém seu "
+            "próprio detector de rostos, e o modelo de emoções do deepface é "
+            "compartilhado entre eles "
+            f"(padrão: {config.SERVICE_MAX_CONCURRENT_JOBS})"
+        ),
+    )
+    parser.add_argument(
+        "--max-queued",
+        type=int,
+        default=config.SERVICE_MAX_QUEUED_JOBS,
+        help=(
+            "Número máximo de jobs aguardando na fila; acima dele novos jobs "
+            f"são recusados (padrão: {config.SERVICE_MAX_QUEUED_JOBS})"
+        ),
+    )
+    parser.add_argument(
+        "--emotion-backend",
+        choices=EMOTION_BACKENDS,
+        default=config.EMOTION_BACKEND,
+        help=(
+            "Executor do classificador de emoções carregado pelos workers: "
+            "deepface (TensorFlow), dnn (pesos ONNX executados pelo OpenCV) ou "
+            "tflite (modelo TFLite, opcionalmente com precisão reduzida) "
+            f"(padrão: {config.EMOTION_BACKEND})"
+        ),
+    )
+    parser.add_argument(
+        "--emotion-model",
+        type=str,
+        default=None,
+        help=(
+            "Modelo convertido do classificador de emoções usado com "
+            "--emotion-backend dnn ou tflite (padrão: o do executor)"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def serve(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the warm analysis service until interrupted
+
+    Args:
+        argv: Arguments after "serve"
+
+    Returns:
+        Exit code
+    """
+    args = parse_service_arguments(argv)
+
+    service = AnalysisService(
+        args.output,
+        args.max_concurrent,
+        args.max_queued,
+        args.emotion_backend,
+        args.emotion_model,
+    )
+    service.start()
+
+    server = start_service_server(service, args.port, args.host)
+    logger.info(
+        f"Analysis service listening on http://{args.host}:{server.server_address[1]}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down analysis service")
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
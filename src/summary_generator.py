@@ -2,14 +2,38 @@
 Summary report generation module
 """
 
-from dataclasses import dataclass
-from typing import List, Dict
+import json
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
 from collections import Counter
 
+from src import config
 from src.utils import get_logger
 
 logger = get_logger(__name__)
 
+STAGE_PT = {
+    "decode": "Decodificação",
+    "scene_detection": "Detecção de cenas",
+    "motion_gate": "Filtro de movimento",
+    "face_detection": "Detecção de rostos",
+    "emotion": "Emoções",
+    "motion": "Movimento",
+    "annotation": "Anotação",
+    "encode": "Codificação",
+}
+
+
+@dataclass
+class PersonSummary:
+    """Represents one person identified across the video"""
+
+    person_id: int
+    track_ids: List[int]
+    num_frames: int
+    emotion_distribution: Dict[str, int]
+    activity_distribution: Dict[str, int]
+
 
 @dataclass
 class AnalysisSummary:
@@ -23,6 +47,136 @@ class AnalysisSummary:
     emotion_distribution: Dict[str, int]
     activity_distribution: Dict[str, int]
     processing_time: float
+    unique_faces: int = 0
+    people: List[PersonSummary] = field(default_factory=list)
+    performance: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    scene_cuts: List[int] = field(default_factory=list)
+    reused_frames: int = 0
+    num_scene_cuts: int = 0
+
+
+@dataclass
+class SummaryAggregator:
+    """
+    Accumulates the report counters frame by frame
+
+    Only running counters are kept, so memory does not grow with the
+    number of frames. Track IDs increase within the ID range of each
+    segment, so distinct faces are counted from the lowest and highest ID
+    seen per range, and only the first SUMMARY_MAX_SCENE_CUTS scene cuts
+    are listed next to their total count.
+    """
+
+    total_frames: int = 0
+    total_faces: int = 0
+    face_id_ranges: Dict[int, List[int]] = field(default_factory=dict)
+    emotion_counts: Counter = field(default_factory=Counter)
+    activity_counts: Counter = field(default_factory=Counter)
+    scene_cuts: List[int] = field(default_factory=list)
+    num_scene_cuts: int = 0
+    reused_frames: int = 0
+
+    @property
+    def unique_faces(self) -> int:
+        """Number of distinct face track IDs seen"""
+        return sum(high - low + 1 for low, high in self.face_id_ranges.values())
+
+    def _add_face_id_range(self, segment: int, low: int, high: int) -> None:
+        bounds = self.face_id_ranges.get(segment)
+        if bounds is None:
+            self.face_id_ranges[segment] = [low, high]
+        else:
+            bounds[0] = min(bounds[0], low)
+            bounds[1] = max(bounds[1], high)
+
+    def update(self, frame_result: Dict) -> None:
+        """
+        Add one frame to the counters
+
+        Args:
+            frame_result: Dictionary with num_faces, face_ids, emotions,
+                activity, scene_cut and faces_reused of the frame
+        """
+        self.total_frames += 1
+        self.total_faces += frame_result.get("num_faces", 0)
+        for face_id in frame_result.get("face_ids", []):
+            segment = face_id // config.SEGMENT_TRACK_ID_STRIDE
+            self._add_face_id_range(segment, face_id, face_id)
+
+        for emotion in frame_result.get("emotions", []):
+            if hasattr(emotion, "emotion_label"):
+                self.emotion_counts[emotion.emotion_label.value] += 1
+
+        activity = frame_result.get("activity", None)
+        if activity:
+            self.activity_counts[activity] += 1
+
+        if frame_result.get("scene_cut"):
+            self.num_scene_cuts += 1
+            if len(self.scene_cuts) < config.SUMMARY_MAX_SCENE_CUTS:
+                self.scene_cuts.append(frame_result["frame_number"])
+        if frame_result.get("faces_reused"):
+            self.reused_frames += 1
+
+    def merge(self, other: "SummaryAggregator") -> None:
+        """
+        Add the counters of another aggregator (e.g. of another segment)
+
+        Args:
+            other: Aggregator to merge into this one
+        """
+        self.total_frames += other.total_frames
+        self.total_faces += other.total_faces
+        for segment, (low, high) in other.face_id_ranges.items():
+            self._add_face_id_range(segment, low, high)
+        self.emotion_counts.update(other.emotion_counts)
+        self.activity_counts.update(other.activity_counts)
+        self.scene_cuts = sorted(self.scene_cuts + other.scene_cuts)[
+            : config.SUMMARY_MAX_SCENE_CUTS
+        ]
+        self.num_scene_cuts += other.num_scene_cuts
+        self.reused_frames += other.reused_frames
+
+    def finalize(
+        self,
+        video_filename: str,
+        duration: float,
+        fps: float,
+        processing_time: float,
+        total_frames: Optional[int] = None,
+    ) -> AnalysisSummary:
+        """
+        Build the analysis summary from the counters
+
+        Args:
+            video_filename: Name of the video file
+            duration: Video duration in seconds
+            fps: Frames per second
+            processing_time: Total processing time in seconds
+            total_frames: Total number of frames (default: frames aggregated)
+
+        Returns:
+            AnalysisSummary object
+        """
+        summary = AnalysisSummary(
+            video_filename=video_filename,
+            total_frames=(
+                total_frames if total_frames is not None else self.total_frames
+            ),
+            duration=duration,
+            fps=fps,
+            total_faces_detected=self.total_faces,
+            emotion_distribution=dict(self.emotion_counts),
+            activity_distribution=dict(self.activity_counts),
+            processing_time=processing_time,
+            unique_faces=self.unique_faces,
+            scene_cuts=list(self.scene_cuts),
+            num_scene_cuts=self.num_scene_cuts,
+            reused_frames=self.reused_frames,
+        )
+
+        logger.info("Analysis summary created successfully")
+        return summary
 
 
 def create_summary(
@@ -47,38 +201,18 @@ def create_summary(
     Returns:
         AnalysisSummary object
     """
-    # Count total faces
-    total_faces = sum(frame.get("num_faces", 0) for frame in frames_data)
-
-    # Aggregate emotion statistics
-    emotion_counts = Counter()
+    aggregator = SummaryAggregator()
     for frame in frames_data:
-        emotions = frame.get("emotions", [])
-        for emotion in emotions:
-            if hasattr(emotion, "emotion_label"):
-                emotion_counts[emotion.emotion_label.value] += 1
+        aggregator.update(frame)
 
-    # Aggregate activity statistics
-    activity_counts = Counter()
-    for frame in frames_data:
-        activity = frame.get("activity", None)
-        if activity:
-            activity_counts[activity] += 1
-
-    summary = AnalysisSummary(
+    return aggregator.finalize(
         video_filename=video_filename,
-        total_frames=total_frames,
         duration=duration,
         fps=fps,
-        total_faces_detected=total_faces,
-        emotion_distribution=dict(emotion_counts),
-        activity_distribution=dict(activity_counts),
         processing_time=processing_time,
+        total_frames=total_frames,
     )
 
-    logger.info("Analysis summary created successfully")
-    return summary
-
 
 def generate_text_report(summary: AnalysisSummary, output_path: str) -> None:
     """
@@ -106,6 +240,8 @@ def generate_text_report(summary: AnalysisSummary, output_path: str) -> None:
     # Face detection statistics
     lines.append("--- DETECÇÃO FACIAL ---")
     lines.append(f"Total de Rostos Detectados: {summary.total_faces_detected}")
+    if summary.unique_faces:
+        lines.append(f"Rostos Distintos (rastreados): {summary.unique_faces}")
     lines.append("")
 
     # Emotion analysis statistics
@@ -132,6 +268,56 @@ def generate_text_report(summary: AnalysisSummary, output_path: str) -> None:
             lines.append(f"{activity}: {count} frames ({percentage:.1f}%)")
         lines.append("")
 
+    # Shot boundaries
+    if summary.num_scene_cuts:
+        lines.append("--- MUDANÇAS DE CENA ---")
+        lines.append(f"Cortes Detectados: {summary.num_scene_cuts}")
+        for frame_number in summary.scene_cuts:
+            timestamp = (frame_number - 1) / summary.fps if summary.fps > 0 else 0.0
+            lines.append(f"Quadro {frame_number} ({format_timestamp(timestamp)})")
+        if summary.num_scene_cuts > len(summary.scene_cuts):
+            lines.append(
+                f"(apenas os primeiros {len(summary.scene_cuts)} cortes listados)"
+            )
+        lines.append("")
+
+    # Per-person statistics
+    if summary.people:
+        lines.append("--- PESSOAS IDENTIFICADAS ---")
+        lines.append(f"Total de Pessoas: {len(summary.people)}")
+        for person in summary.people:
+            lines.append("")
+            lines.append(
+                f"Pessoa {person.person_id}: {person.num_frames} frames "
+                f"({len(person.track_ids)} rastreamentos)"
+            )
+            lines.append(
+                "  Emoções: " + _format_distribution(person.emotion_distribution)
+            )
+            lines.append(
+                "  Atividades: " + _format_distribution(person.activity_distribution)
+            )
+        lines.append("")
+
+    # Per-stage latency
+    if summary.performance:
+        lines.append("--- DESEMPENHO POR ETAPA ---")
+        if summary.processing_time > 0:
+            lines.append(
+                f"Taxa média: {summary.total_frames / summary.processing_time:.1f} frames/s"
+            )
+        for stage, stats in summary.performance.items():
+            lines.append(
+                f"{STAGE_PT.get(stage, stage)}: {stats['total_s']:.1f}s "
+                f"({stats['share'] * 100:.1f}%) | p50 {stats['p50_ms']:.1f} ms | "
+                f"p95 {stats['p95_ms']:.1f} ms | p99 {stats['p99_ms']:.1f} ms"
+            )
+        if summary.reused_frames:
+            lines.append(
+                f"Frames estáticos (rostos reaproveitados): {summary.reused_frames}"
+            )
+        lines.append("")
+
     # Processing information
     lines.append(f"Tempo de Processamento: {summary.processing_time:.1f} segundos")
     lines.append("")
@@ -148,6 +334,47 @@ def generate_text_report(summary: AnalysisSummary, output_path: str) -> None:
         logger.error(f"Erro ao salvar relatório: {e}")
 
 
+def save_performance_sidecar(summary: AnalysisSummary, output_path: str) -> None:
+    """
+    Save the per-stage latency statistics as JSON next to the text report
+
+    Args:
+        summary: AnalysisSummary object with performance statistics
+        output_path: Path to save the JSON file
+    """
+    sidecar = {
+        "video_filename": summary.video_filename,
+        "total_frames": summary.total_frames,
+        "processing_time": summary.processing_time,
+        "average_fps": (
+            summary.total_frames / summary.processing_time
+            if summary.processing_time > 0
+            else 0.0
+        ),
+        "stages": summary.performance,
+    }
+
+    try:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, indent=2)
+        logger.info(f"Desempenho salvo em: {output_path}")
+    except Exception as e:
+        logger.error(f"Erro ao salvar desempenho: {e}")
+
+
+def _format_distribution(distribution: Dict[str, int]) -> str:
+    """Format counts as 'Label: N (P%)' items, most frequent first"""
+    total = sum(distribution.values())
+    if total == 0:
+        return "-"
+    return ", ".join(
+        f"{label}: {count} ({count / total * 100:.1f}%)"
+        for label, count in sorted(
+            distribution.items(), key=lambda x: x[1], reverse=True
+        )
+    )
+
+
 def format_timestamp(seconds: float) -> str:
     """
     Format seconds to MM:SS.s format
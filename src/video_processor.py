@@ -2,12 +2,19 @@
 Video processing module for frame extraction and video information
 """
 
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
 import cv2
-from typing import Iterator, Dict
-from dataclasses import dataclass
+from typing import Iterator, Dict, List, Optional
+from dataclasses import dataclass, field
 import numpy as np
 
-from src.utils import get_logger
+from src import config
+from src.utils import get_logger, VideoProcessingError
 
 logger = get_logger(__name__)
 
@@ -18,9 +25,20 @@ class VideoFrame:
 
     frame_number: int
     timestamp: float
-    image_data: np.ndarray
+    image_data: Optional[np.ndarray]
     width: int
     height: int
+    analyzed: bool = True
+    _gray: Optional[np.ndarray] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale plane of the frame, converted once on first access"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.image_data, cv2.COLOR_BGR2GRAY)
+        return self._gray
 
 
 def load_video(video_path: str) -> cv2.VideoCapture:
@@ -89,12 +107,86 @@ def get_video_info(video_capture: cv2.VideoCapture) -> Dict[str, float]:
     return video_info
 
 
-def extract_frames(video_capture: cv2.VideoCapture) -> Iterator[VideoFrame]:
+def compute_frame_stride(
+    fps: float, frame_stride: int = 1, analysis_fps: Optional[float] = None
+) -> int:
+    """
+    Compute how many frames apart analysed frames are
+
+    Args:
+        fps: Frames per second of the video
+        frame_stride: Explicit stride (used when analysis_fps is not given)
+        analysis_fps: Target number of analysed frames per second (optional)
+
+    Returns:
+        Stride of at least 1
+    """
+    if analysis_fps:
+        return max(1, int(round(fps / analysis_fps))) if fps > 0 else 1
+    return max(1, frame_stride)
+
+
+class FramePool:
+    """
+    Ring of preallocated frame buffers that extract_frames decodes into
+
+    A buffer is handed out again size frames later, so size must exceed the
+    number of frames alive at once (waiting in queues, being analyzed or
+    waiting to be encoded); see pipeline.frame_pool_size.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._buffers: List[np.ndarray] = []
+        self._index = 0
+
+    def next_buffer(self, shape: tuple) -> np.ndarray:
+        """
+        Return the next buffer of the ring, allocating it on first use
+
+        Args:
+            shape: (height, width, 3) of the decoded frames
+
+        Returns:
+            uint8 array of the given shape
+        """
+        if len(self._buffers) < self.size:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._buffers.append(buffer)
+            return buffer
+
+        buffer = self._buffers[self._index]
+        if buffer.shape != shape:
+            buffer = self._buffers[self._index] = np.empty(shape, dtype=np.uint8)
+        self._index = (self._index + 1) % self.size
+        return buffer
+
+
+def extract_frames(
+    video_capture: cv2.VideoCapture,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    frame_stride: int = 1,
+    decode_skipped: bool = True,
+    frame_pool: Optional[FramePool] = None,
+) -> Iterator[VideoFrame]:
     """
     Extract frames from video sequentially as a generator
 
+    Every frame_stride-th frame (counted from start_frame) is marked as
+    analyzed. The other frames are still yielded to keep the timeline
+    complete, but when decode_skipped is False they are only grabbed, not
+    decoded, and carry no image data.
+
     Args:
         video_capture: OpenCV VideoCapture object
+        start_frame: Index of the first frame to extract (seeks when > 0)
+        end_frame: Index after the last frame to extract (None = end of video)
+        frame_stride: Analyze one frame out of every frame_stride frames
+        decode_skipped: Decode frames that are not analyzed (needed to write
+            them to the output video)
+        frame_pool: Buffers to decode into instead of allocating a new
+            array per frame (optional)
 
     Yields:
         VideoFrame objects containing frame data and metadata
@@ -102,19 +194,42 @@ def extract_frames(video_capture: cv2.VideoCapture) -> Iterator[VideoFrame]:
     Raises:
         VideoProcessingError: If frame extraction fails
     """
-    frame_number = 0
+    frame_number = start_frame
     fps = video_capture.get(cv2.CAP_PROP_FPS)
+    frame_shape = (
+        int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        3,
+    )
+    if frame_pool is not None and 0 in frame_shape:
+        frame_pool = None
 
     if fps <= 0:
         fps = 30.0  # Default fallback
 
-    while True:
-        ret, frame = video_capture.read()
+    width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    if start_frame > 0 and video_capture.get(cv2.CAP_PROP_POS_FRAMES) != start_frame:
+        video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    while end_frame is None or frame_number < end_frame:
+        analyzed = (frame_number - start_frame) % frame_stride == 0
+
+        if analyzed or decode_skipped:
+            if frame_pool is not None:
+                ret, frame = video_capture.read(frame_pool.next_buffer(frame_shape))
+            else:
+                ret, frame = video_capture.read()
+        else:
+            # grab() advances without retrieving and converting the BGR image
+            ret, frame = video_capture.grab(), None
 
         if not ret:
             break
 
-        height, width = frame.shape[:2]
+        if frame is not None:
+            height, width = frame.shape[:2]
         timestamp = frame_number / fps
 
         video_frame = VideoFrame(
@@ -123,10 +238,290 @@ def extract_frames(video_capture: cv2.VideoCapture) -> Iterator[VideoFrame]:
             image_data=frame,
             width=width,
             height=height,
+            analyzed=analyzed,
         )
 
         yield video_frame
         frame_number += 1
 
     video_capture.release()
-    logger.info(f"Frame extraction complete. Total frames extracted: {frame_number}")
+    logger.info(
+        f"Frame extraction complete. Total frames extracted: {frame_number - start_frame}"
+    )
+
+
+# Backends of the annotated output video
+VIDEO_ENCODERS = ("auto", "ffmpeg", "opencv")
+
+_ffmpeg_fallback_logged = False
+
+
+@dataclass
+class EncoderSettings:
+    """Settings of the annotated output video encoder"""
+
+    backend: str = config.VIDEO_ENCODER
+    codec: str = config.FFMPEG_CODEC
+    preset: str = config.FFMPEG_PRESET
+    crf: int = config.FFMPEG_CRF
+    threads: int = config.FFMPEG_THREADS
+    buffer_size: int = config.VIDEO_WRITER_BUFFER_SIZE
+
+
+def find_ffmpeg() -> Optional[str]:
+    """
+    Locate the ffmpeg executable
+
+    Returns:
+        Path of ffmpeg, or None when it is not installed
+    """
+    return shutil.which(config.FFMPEG_BINARY)
+
+
+def resolve_encoder_backend(encoder: EncoderSettings) -> str:
+    """
+    Pick the backend that will actually encode the output video
+
+    Args:
+        encoder: Encoder settings
+
+    Returns:
+        "ffmpeg" or "opencv" (ffmpeg falls back to opencv when absent)
+    """
+    if encoder.backend == "opencv":
+        return "opencv"
+    if find_ffmpeg() is not None:
+        return "ffmpeg"
+    global _ffmpeg_fallback_logged
+    if encoder.backend == "ffmpeg" and not _ffmpeg_fallback_logged:
+        logger.warning("ffmpeg not found, falling back to cv2.VideoWriter")
+        _ffmpeg_fallback_logged = True
+    return "opencv"
+
+
+class FFmpegVideoWriter:
+    """
+    Streams raw BGR frames into an ffmpeg subprocess
+
+    It has the write() / release() interface of cv2.VideoWriter.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        fps: float,
+        width: int,
+        height: int,
+        encoder: EncoderSettings,
+    ):
+        self.output_path = output_path
+        self.shape = (height, width, 3)
+
+        command = [
+            find_ffmpeg() or config.FFMPEG_BINARY,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            f"{fps}",
+            "-i",
+            "-",
+            "-an",
+            "-c:v",
+            encoder.codec,
+            "-preset",
+            encoder.preset,
+            "-crf",
+            str(encoder.crf),
+            "-threads",
+            str(encoder.threads),
+            "-pix_fmt",
+            "yuv420p",
+        ]
+        if width % 2 or height % 2:
+            # yuv420p needs even dimensions
+            command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        command += ["-movflags", "+faststart", output_path]
+
+        # stderr goes to a file so a chatty ffmpeg can never block the pipe
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stderr=self._stderr
+        )
+
+    def isOpened(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def write(self, image: np.ndarray) -> None:
+        if image.shape != self.shape:
+            raise VideoProcessingError(
+                f"Frame of shape {image.shape} does not match the video {self.shape}"
+            )
+        try:
+            self._process.stdin.write(np.ascontiguousarray(image).data)
+        except (BrokenPipeError, OSError) as e:
+            raise VideoProcessingError(f"ffmpeg stopped accepting frames: {e}")
+
+    def release(self) -> None:
+        if self._process is None:
+            return
+
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self._process.wait()
+        self._process = None
+
+        self._stderr.seek(0)
+        errors = self._stderr.read().decode("utf-8", errors="replace").strip()
+        self._stderr.close()
+        if returncode != 0:
+            raise VideoProcessingError(
+                f"ffmpeg failed writing {self.output_path} ({returncode}): {errors}"
+            )
+
+
+class BufferedVideoWriter:
+    """
+    Runs a video writer on its own thread behind a bounded frame buffer
+
+    write() only queues the frame, so encoding overlaps with the frame loop;
+    when the encoder falls behind, write() waits for a free slot. Frames must
+    not be modified after write(). It has the write() / release() interface
+    of cv2.VideoWriter.
+    """
+
+    def __init__(self, writer: object, buffer_size: int):
+        self.writer = writer
+        self._queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(
+            maxsize=max(1, buffer_size)
+        )
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(
+            target=self._run, name="video-writer", daemon=True
+        )
+        self._thread.start()
+
+    def isOpened(self) -> bool:
+        return self._thread.is_alive() and self.writer.isOpened()
+
+    def write(self, image: np.ndarray) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put(image)
+
+    def release(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.writer.release()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        while True:
+            image = self._queue.get()
+            if image is None:
+                return
+            if self._error is not None:
+                # Keep draining so write() never blocks on a dead writer
+                continue
+            try:
+                self.writer.write(image)
+            except Exception as e:
+                self._error = e
+
+
+def create_video_writer(
+    output_path: str,
+    fps: float,
+    width: int,
+    height: int,
+    encoder: Optional[EncoderSettings] = None,
+) -> object:
+    """
+    Create an MP4 video writer for the annotated output
+
+    With ffmpeg available, frames are piped to ffmpeg (H.264 by default);
+    otherwise cv2.VideoWriter writes MPEG-4 Part 2 ("mp4v"). Unless the
+    buffer size is 0, the writer runs on its own thread.
+
+    Args:
+        output_path: Path of the output video file
+        fps: Frames per second
+        width: Frame width in pixels
+        height: Frame height in pixels
+        encoder: Encoder settings (default: EncoderSettings())
+
+    Returns:
+        Writer with the write() / release() interface of cv2.VideoWriter
+    """
+    encoder = encoder or EncoderSettings()
+
+    if resolve_encoder_backend(encoder) == "ffmpeg":
+        writer = FFmpegVideoWriter(output_path, fps, width, height, encoder)
+    else:
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+
+    if encoder.buffer_size > 0:
+        writer = BufferedVideoWriter(writer, encoder.buffer_size)
+    return writer
+
+
+def concatenate_with_ffmpeg(video_paths: List[str], output_path: str) -> None:
+    """
+    Join videos encoded with identical settings without re-encoding them
+
+    Args:
+        video_paths: Videos to join, in order
+        output_path: Path of the joined video
+
+    Raises:
+        VideoProcessingError: If ffmpeg fails
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", dir=os.path.dirname(output_path) or ".", delete=False
+    ) as list_file:
+        for path in video_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+
+    try:
+        completed = subprocess.run(
+            [
+                find_ffmpeg() or config.FFMPEG_BINARY,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-y",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                list_file.name,
+                "-c",
+                "copy",
+                "-movflags",
+                "+faststart",
+                output_path,
+            ],
+            capture_output=True,
+        )
+    finally:
+        os.remove(list_file.name)
+
+    if completed.returncode != 0:
+        raise VideoProcessingError(
+            f"ffmpeg failed joining {output_path}: "
+            f"{completed.stderr.decode('utf-8', errors='replace').strip()}"
+        )